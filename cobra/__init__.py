@@ -17,6 +17,7 @@ import types
 import queue
 import socket
 import struct
+import asyncio
 import urllib.request
 import traceback
 
@@ -36,6 +37,7 @@ import pickle as pickle
 
 from threading import currentThread, Thread, RLock, Timer, Lock, Event
 from socketserver import ThreadingTCPServer, BaseRequestHandler
+from concurrent.futures import ThreadPoolExecutor
 
 daemon = None
 verbose = False
@@ -56,6 +58,12 @@ COBRA_GOODBYE = 5
 COBRA_AUTH = 6
 COBRA_NEWOBJ = 7  # Used to return object references
 
+# Multiplexed messages set COBRA_MUX in the message type and carry
+# their request id in the upper bits ( mtype | COBRA_MUX | (id << 8) )
+COBRA_MUX = 0x80
+COBRA_MTYPE_MASK = 0x7f
+COBRA_MUXID_MAX = 0xffffff
+
 SFLAG_MSGPACK = 0x0001
 SFLAG_JSON = 0x0002
 
@@ -176,8 +184,8 @@ class CobraMethod:
         name = self.proxy._cobra_name
         if verbose: print("CALLING:", name, self.methname, repr(args)[:20], repr(kwargs)[:20])
 
-        async = kwargs.pop('_cobra_async', None)
-        if async:
+        isasync = kwargs.pop('_cobra_async', None)
+        if isasync:
             csock = self.proxy._cobra_getsock()
             return csock.cobraAsyncTransaction(COBRA_CALL, name, (self.methname, args, kwargs))
 
@@ -214,6 +222,7 @@ class CobraSocket:
     def __init__(self, socket, sflags=0):
         self.sflags = sflags
         self.socket = socket
+        self.sendlock = Lock()
         self.dumps = pickledumps
         self.loads = pickle.loads
 
@@ -240,11 +249,14 @@ class CobraSocket:
     def getPeerName(self):
         return self.socket.getpeername()
 
-    def sendMessage(self, mtype, objname, data):
+    def sendMessage(self, mtype, objname, data, muxid=None):
         """
         Send message is responsable for transmission of cobra messages,
         and socket reconnection in the event that the send fails for network
         reasons.
+
+        Specify muxid to send the message as part of a multiplexed
+        request ( replies are matched to requests by muxid ).
         """
 
         # NOTE: for errors while using msgpack, we must send only the str
@@ -256,6 +268,9 @@ class CobraSocket:
         except Exception as e:
             raise CobraPickleException("The arguments/attributes must be serializable: %s" % e)
 
+        if muxid is not None:
+            mtype |= COBRA_MUX | (muxid << 8)
+
         objname = toUtf8(objname)
         self.sendExact(struct.pack("<III", mtype, len(objname), len(buf)) + objname + buf)
 
@@ -267,30 +282,53 @@ class CobraSocket:
         Client side uses of the CobraSocket object should use cobraTransaction
         to ensure re-tranmission of the request on reception errors.
         """
-        s = self.socket
+        return self.recvMuxMessage()[1:]
+
+    def recvMuxMessage(self):
+        """
+        Returns tuple of muxid, mtype, objname, and data
+        ( muxid is None unless the message was multiplexed )
+        """
         hdr = self.recvExact(12)
         mtype, nsize, dsize = struct.unpack("<III", hdr)
         name = self.recvExact(nsize)
-        data = self.loads(self.recvExact(dsize))
+        return self.loadMessage(mtype, name, self.recvExact(dsize))
+
+    def loadMessage(self, mtype, name, buf):
+        """
+        Decode the parts of a received message into a tuple of
+        muxid, mtype, objname, and data.
+        """
+        muxid = None
+        if mtype & COBRA_MUX:
+            muxid = mtype >> 8
+            mtype &= COBRA_MTYPE_MASK
+
+        data = self.loads(buf)
 
         # NOTE: for errors while using msgpack, we must send only the str
         if mtype == COBRA_ERROR and self.sflags & (SFLAG_MSGPACK | SFLAG_JSON):
             data = CobraErrorException(data)
 
-        return (mtype, name, data)
+        return (muxid, mtype, name.decode('utf8'), data)
 
     def recvExact(self, size):
-        buf = b""
+        # Receive into one preallocated buffer rather than re-copying
+        # the accumulated bytes for every chunk of a large message.
+        buf = bytearray(size)
+        view = memoryview(buf)
         s = self.socket
-        while len(buf) != size:
-            x = s.recv(size - len(buf))
-            if len(x) == 0:
+        offset = 0
+        while offset != size:
+            x = s.recv_into(view[offset:])
+            if x == 0:
                 raise CobraClosedException("Socket closed in recvExact...")
-            buf += x
+            offset += x
         return buf
 
     def sendExact(self, buf):
-        self.socket.sendall(buf)
+        with self.sendlock:
+            self.socket.sendall(buf)
 
 
 class SocketBuilder:
@@ -480,8 +518,181 @@ class CobraClientSocket(CobraSocket):
                 self.reConnect()
 
 
+class CobraMuxTrans:
+    """
+    A request in flight on a CobraMuxClientSocket.  Any number of these
+    may be outstanding on one connection at once; wait() for the result.
+
+    Example:
+        t1 = csock.cobraAsyncTransaction(COBRA_CALL, name, ('readMemory', (va1, 16), {}))
+        t2 = csock.cobraAsyncTransaction(COBRA_CALL, name, ('readMemory', (va2, 16), {}))
+        bytes1 = t1.wait()
+        bytes2 = t2.wait()
+    """
+
+    def __init__(self, csock, mtype, objname, data):
+        self.data = data
+        self.csock = csock
+        self.mtype = mtype
+        self.objname = objname
+
+        self.reply = None
+        self.error = None
+        self.done = Event()
+
+        # Issue the call..
+        self.csock.muxSend(self)
+
+    def setReply(self, reply):
+        self.reply = reply
+        self.done.set()
+
+    def setError(self, error):
+        self.error = error
+        self.done.set()
+
+    def waitMessage(self):
+        """
+        Wait for the reply and return the tuple of mtype, objname, and
+        data.  Like cobraTransaction, the request is re-sent if the
+        connection is lost before the reply arrives.
+        """
+        while True:
+            if not self.done.wait(self.csock.muxtimeout):
+                self.csock.muxDrop(self.csock.muxsock, socket.timeout('timed out'))
+                continue
+
+            if self.error is None:
+                return self.reply
+
+            if not isinstance(self.error, (socket.error, CobraClosedException)):
+                raise self.error
+
+            self.reply = None
+            self.error = None
+            self.done.clear()
+            self.csock.muxSend(self)
+
+    def wait(self):
+        mtype, name, data = self.waitMessage()
+        if mtype == COBRA_CALL:
+            return data
+        raise data
+
+
+class CobraMuxClientSocket(CobraClientSocket):
+    """
+    A client socket which multiplexes requests from any number of
+    threads over one connection.  Each request carries an id which the
+    server echoes in its reply, so requests may be pipelined rather
+    than paying a round trip each.  A reader thread routes replies back
+    to the waiting CobraMuxTrans.
+    """
+
+    def __init__(self, sockctor, retrymax=cobra_retrymax, sflags=0, authinfo=None, pool=None):
+        CobraClientSocket.__init__(self, sockctor, retrymax=retrymax, sflags=sflags, authinfo=authinfo, pool=pool)
+        self.muxid = 0
+        self.muxsock = None
+        self.muxlock = Lock()
+        self.muxconnlock = Lock()
+        self.muxpending = {}
+        self.muxtimeout = self.socket.gettimeout()
+        self._muxStart()
+
+    def _muxStart(self):
+        # The reader blocks indefinitely, timeouts are per request
+        self.socket.settimeout(None)
+        self.muxsock = self.socket
+        thr = Thread(target=self._muxReader, args=(self.socket,), name='CobraMuxReader')
+        thr.setDaemon(True)
+        thr.start()
+
+    def _muxReader(self, sock):
+        # Read through a private CobraSocket so a reconnect can never
+        # leave two readers on the same connection.
+        rsock = CobraSocket(sock, sflags=self.sflags)
+        while True:
+            try:
+                muxid, mtype, name, data = rsock.recvMuxMessage()
+            except Exception as e:
+                self.muxDrop(sock, CobraClosedException(str(e)))
+                return
+
+            if muxid is None:
+                # The server does not understand multiplexed requests
+                self.muxDrop(sock, CobraException('Server does not support multiplexing: %s' % (data,)))
+                return
+
+            with self.muxlock:
+                trans = self.muxpending.pop(muxid, None)
+
+            if trans is not None:
+                trans.setReply((mtype, name, data))
+
+    def muxConnect(self):
+        """
+        Make sure there is a live connection ( and reader ) to send on.
+        """
+        with self.muxconnlock:
+            if self.muxsock is not None:
+                return
+            self.reConnect()
+            self._muxStart()
+
+    def muxDrop(self, sock, error):
+        """
+        Declare the connection sock dead and fail every request which is
+        waiting on it with error.
+        """
+        with self.muxlock:
+            if sock is None or sock is not self.muxsock:
+                return
+            self.muxsock = None
+            pending = self.muxpending
+            self.muxpending = {}
+
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+            sock.close()
+        except Exception:
+            pass
+
+        for trans in pending.values():
+            trans.setError(error)
+
+    def muxSend(self, trans):
+        sock = None
+        while sock is None:
+            self.muxConnect()
+            with self.muxlock:
+                sock = self.muxsock
+                if sock is None:
+                    continue
+                muxid = self.muxid
+                self.muxid = (muxid + 1) & COBRA_MUXID_MAX
+                self.muxpending[muxid] = trans
+
+        try:
+            self.sendMessage(trans.mtype, trans.objname, trans.data, muxid=muxid)
+
+        except CobraPickleException:
+            with self.muxlock:
+                self.muxpending.pop(muxid, None)
+            raise
+
+        except (socket.error, CobraClosedException) as e:
+            self.muxDrop(sock, e)
+
+    def cobraAsyncTransaction(self, mtype, objname, data):
+        return CobraMuxTrans(self, mtype, objname, data)
+
+    def cobraTransaction(self, mtype, objname, data):
+        return CobraMuxTrans(self, mtype, objname, data).waitMessage()
+
+
 class CobraDaemon(ThreadingTCPServer):
-    def __init__(self, host="", port=COBRA_PORT, sslcrt=None, sslkey=None, sslca=None, msgpack=False, json=False):
+    def __init__(self, host="", port=COBRA_PORT, sslcrt=None, sslkey=None, sslca=None, msgpack=False, json=False,
+                 muxthreads=32):
         """
         Construct a cobra daemon object.
 
@@ -489,6 +700,7 @@ class CobraDaemon(ThreadingTCPServer):
         host        - Optional hostname/ip to bind the service to (default: inaddr_any)
         port        - The port to bind (Default: COBRA_PORT)
         msgpack     - Use msgpack serialization
+        muxthreads  - Max threads servicing multiplexed requests (Default: 32)
 
         # SSL Options
         sslcrt / sslkey     - Specify sslcrt and sslkey to enable SSL server side
@@ -505,6 +717,7 @@ class CobraDaemon(ThreadingTCPServer):
         self.refcnts = {}
         self.authmod = None
         self.sflags = 0
+        self.muxpool = ThreadPoolExecutor(max_workers=muxthreads, thread_name_prefix='CobraMux')
 
         if msgpack and json:
             raise Exception('CobraDaemon can not use both msgpack *and* json!')
@@ -572,8 +785,10 @@ class CobraDaemon(ThreadingTCPServer):
 
     def stopServer(self):
         self.run = False
+        self.shutdown()
         self.server_close()
         self.thr.join()
+        self.muxpool.shutdown(wait=False)
 
     def serve_forever(self):
         try:
@@ -710,10 +925,27 @@ class CobraRequestHandler(BaseRequestHandler):
         c.handleClient()
 
 
+class CobraMuxReply:
+    """
+    Stands in for the CobraSocket given to the message handlers of a
+    multiplexed request so that the reply carries the request's muxid.
+    """
+
+    def __init__(self, csock, muxid):
+        self.csock = csock
+        self.muxid = muxid
+
+    def sendMessage(self, mtype, objname, data):
+        self.csock.sendMessage(mtype, objname, data, muxid=self.muxid)
+
+
 class CobraConnectionHandler:
     def __init__(self, daemon, socket):
         self.daemon = daemon
         self.socket = socket
+        self.peer = None
+        self.me = None
+        self.authuser = None
         self.handlers = (
             self.handleHello,
             self.handleCall,
@@ -749,85 +981,125 @@ class CobraConnectionHandler:
         if self.daemon.recvtimeout:
             sock.settimeout(self.daemon.recvtimeout)
 
-        authuser = None
-
         csock = CobraSocket(sock, sflags=self.daemon.sflags)
 
+        self.peer = peer
+        self.me = me
         setCallerInfo(peer)
         setLocalInfo(me)
 
         # If we have an authmod, they must send an auth message first
         if self.daemon.authmod:
-            mtype, name, data = csock.recvMessage()
-            if mtype != COBRA_AUTH:
-                csock.sendMessage(COBRA_ERROR, '', CobraAuthException('Authentication Required!'))
-                return
-
-            authuser = self.daemon.authmod.authCobraUser(data)
-            if not authuser:
-                csock.sendMessage(COBRA_ERROR, '', CobraAuthException('Authentication Failed!'))
+            muxid, mtype, name, data = csock.recvMuxMessage()
+            if not self.handleFirstAuth(self.getReplySocket(csock, muxid), mtype, data):
                 return
 
-            csock.sendMessage(COBRA_AUTH, '', authuser)
-            setUserInfo(authuser)
-
         while True:
 
             try:
-                mtype, name, data = csock.recvMessage()
+                muxid, mtype, name, data = csock.recvMuxMessage()
             except CobraClosedException:
                 break
             except socket.error:
                 if verbose: traceback.print_exc()
                 break
 
-            # If they re-auth ( app layer ) later, lets handle it...
-            if mtype == COBRA_AUTH and self.daemon.authmod:
-                authuser = self.daemon.authmod.authCobraUser(data)
-                if not authuser:
-                    csock.sendMessage(COBRA_ERROR, '', CobraAuthException('Authentication Failed!'))
-                    continue
-
-                setUserInfo(authuser)
-                csock.sendMessage(COBRA_AUTH, '', authuser)
+            if muxid is None:
+                self.handleMessage(csock, mtype, name, data)
                 continue
 
-            if self.daemon.authmod and not self.daemon.authmod.checkUserAccess(authuser, name):
-                csock.sendMessage(COBRA_ERROR, name, Exception('Access Denied For User: %s' % authuser))
-                continue
+            # Multiplexed requests run concurrently and reply by muxid
+            self.daemon.muxpool.submit(self.handleMuxMessage, CobraMuxReply(csock, muxid), mtype, name, data)
 
-            obj = self.daemon.getSharedObject(name)
-            if verbose: print("MSG FOR:", name, type(obj))
+    def getReplySocket(self, csock, muxid):
+        if muxid is None:
+            return csock
+        return CobraMuxReply(csock, muxid)
 
-            if obj == None:
-                try:
-                    csock.sendMessage(COBRA_ERROR, name, Exception("Unknown object requested: %s" % name))
-                except CobraClosedException:
-                    pass
-                if verbose: print("WARNING: Got request for unknown object", name)
-                continue
+    def handleFirstAuth(self, csock, mtype, data):
+        """
+        Authenticate the first message from a client ( when the daemon
+        has an authmod ) and return True if they may continue.
+        """
+        if mtype != COBRA_AUTH:
+            csock.sendMessage(COBRA_ERROR, '', CobraAuthException('Authentication Required!'))
+            return False
+
+        authuser = self.daemon.authmod.authCobraUser(data)
+        if not authuser:
+            csock.sendMessage(COBRA_ERROR, '', CobraAuthException('Authentication Failed!'))
+            return False
 
+        self.authuser = authuser
+        csock.sendMessage(COBRA_AUTH, '', authuser)
+        setUserInfo(authuser)
+        return True
+
+    def handleMuxMessage(self, csock, mtype, name, data):
+        # We are on a pool thread, give it this connection's info
+        setCallerInfo(self.peer)
+        setLocalInfo(self.me)
+        setUserInfo(self.authuser)
+        try:
+            self.handleMessage(csock, mtype, name, data)
+        except (CobraClosedException, socket.error):
+            pass
+        except Exception:
+            if verbose: traceback.print_exc()
+
+    def handleMessage(self, csock, mtype, name, data):
+        """
+        Dispatch one received message to its handler and send the reply
+        ( or error ) back over csock.
+        """
+        # If they re-auth ( app layer ) later, lets handle it...
+        if mtype == COBRA_AUTH and self.daemon.authmod:
+            authuser = self.daemon.authmod.authCobraUser(data)
+            if not authuser:
+                csock.sendMessage(COBRA_ERROR, '', CobraAuthException('Authentication Failed!'))
+                return
+
+            self.authuser = authuser
+            setUserInfo(authuser)
+            csock.sendMessage(COBRA_AUTH, '', authuser)
+            return
+
+        if self.daemon.authmod and not self.daemon.authmod.checkUserAccess(self.authuser, name):
+            csock.sendMessage(COBRA_ERROR, name, Exception('Access Denied For User: %s' % self.authuser))
+            return
+
+        obj = self.daemon.getSharedObject(name)
+        if verbose: print("MSG FOR:", name, type(obj))
+
+        if obj == None:
             try:
-                handler = self.handlers[mtype]
-            except:
-                try:
-                    csock.sendMessage(COBRA_ERROR, name, Exception("Invalid Message Type"))
-                except CobraClosedException:
-                    pass
-                if verbose: print("WARNING: Got Invalid Message Type: %d for %s" % (mtype, data))
-                continue
+                csock.sendMessage(COBRA_ERROR, name, Exception("Unknown object requested: %s" % name))
+            except CobraClosedException:
+                pass
+            if verbose: print("WARNING: Got request for unknown object", name)
+            return
 
+        try:
+            handler = self.handlers[mtype]
+        except:
             try:
-                handler(csock, name, obj, data)
-            except Exception as e:
-                if verbose: traceback.print_exc()
-                try:
-                    csock.sendMessage(COBRA_ERROR, name, e)
-                except TypeError as typee:
-                    # Probably about pickling...
-                    csock.sendMessage(COBRA_ERROR, name, Exception(str(e)))
-                except CobraClosedException:
-                    pass
+                csock.sendMessage(COBRA_ERROR, name, Exception("Invalid Message Type"))
+            except CobraClosedException:
+                pass
+            if verbose: print("WARNING: Got Invalid Message Type: %d for %s" % (mtype, data))
+            return
+
+        try:
+            handler(csock, name, obj, data)
+        except Exception as e:
+            if verbose: traceback.print_exc()
+            try:
+                csock.sendMessage(COBRA_ERROR, name, e)
+            except TypeError as typee:
+                # Probably about pickling...
+                csock.sendMessage(COBRA_ERROR, name, Exception(str(e)))
+            except CobraClosedException:
+                pass
 
     def handleError(self, csock, oname, obj, data):
         print("THIS SHOULD NEVER HAPPEN")
@@ -899,6 +1171,122 @@ class CobraConnectionHandler:
             pass
 
 
+class CobraStreamSocket(CobraSocket):
+    """
+    A CobraSocket over asyncio streams.  Messages are read from the event
+    loop while replies may be sent from any thread.
+    """
+
+    def __init__(self, loop, reader, writer, sflags=0):
+        CobraSocket.__init__(self, writer.get_extra_info('socket'), sflags=sflags)
+        self.loop = loop
+        self.reader = reader
+        self.writer = writer
+
+    async def recvMuxMessageAsync(self):
+        hdr = await self.reader.readexactly(12)
+        mtype, nsize, dsize = struct.unpack("<III", hdr)
+        name = await self.reader.readexactly(nsize)
+        buf = await self.reader.readexactly(dsize)
+        return self.loadMessage(mtype, name, buf)
+
+    def sendExact(self, buf):
+        self.loop.call_soon_threadsafe(self.writer.write, buf)
+
+
+class CobraAsyncDaemon(CobraDaemon):
+    """
+    A CobraDaemon which services every connection from one asyncio event
+    loop rather than a thread per client.  Requests run on the muxpool
+    threads, so idle clients cost no threads at all.  Plain requests from
+    a client are still answered one at a time ( in order ) while
+    multiplexed requests run concurrently.
+
+    Example:
+        daemon = CobraAsyncDaemon(port=0, muxthreads=64)
+        daemon.shareObject(obj, 'obj')
+        daemon.fireThread()
+    """
+
+    def __init__(self, *args, **kwargs):
+        CobraDaemon.__init__(self, *args, **kwargs)
+        self.loop = asyncio.new_event_loop()
+        self.stopfut = self.loop.create_future()
+        self.clients = set()
+
+    def getSslContext(self):
+        if not self.sslkey:
+            return None
+
+        import ssl
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(self.sslcrt, self.sslkey)
+        # If they specify a CA key, require valid client certs
+        if self.sslca:
+            ctx.load_verify_locations(self.sslca)
+            ctx.verify_mode = ssl.CERT_REQUIRED
+        return ctx
+
+    def serve_forever(self):
+        try:
+            self.loop.run_until_complete(self._serveClients())
+        finally:
+            self.loop.close()
+
+    def stopServer(self):
+        self.run = False
+        self.loop.call_soon_threadsafe(self._stopServing)
+        self.thr.join()
+        self.server_close()
+        self.muxpool.shutdown(wait=False)
+
+    def _stopServing(self):
+        if not self.stopfut.done():
+            self.stopfut.set_result(None)
+
+    async def _serveClients(self):
+        server = await asyncio.start_server(self._serveClient, sock=self.socket, ssl=self.getSslContext())
+        try:
+            await self.stopfut
+        finally:
+            server.close()
+            for task in list(self.clients):
+                task.cancel()
+            await asyncio.gather(*self.clients, return_exceptions=True)
+
+    async def _serveClient(self, reader, writer):
+        task = asyncio.current_task()
+        self.clients.add(task)
+
+        csock = CobraStreamSocket(self.loop, reader, writer, sflags=self.sflags)
+        conn = CobraConnectionHandler(self, csock.socket)
+        conn.peer = writer.get_extra_info('peername')
+        conn.me = writer.get_extra_info('sockname')
+        if verbose: print("GOT A CONNECTIONN", conn.peer)
+
+        try:
+            # If we have an authmod, they must send an auth message first
+            if self.authmod:
+                muxid, mtype, name, data = await csock.recvMuxMessageAsync()
+                reply = conn.getReplySocket(csock, muxid)
+                if not await self.loop.run_in_executor(self.muxpool, conn.handleFirstAuth, reply, mtype, data):
+                    return
+
+            while True:
+                muxid, mtype, name, data = await csock.recvMuxMessageAsync()
+                reply = conn.getReplySocket(csock, muxid)
+                fut = self.loop.run_in_executor(self.muxpool, conn.handleMuxMessage, reply, mtype, name, data)
+                if muxid is None:
+                    await fut
+
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass
+
+        finally:
+            self.clients.discard(task)
+            writer.close()
+
+
 def isCobraUri(uri):
     try:
         x = urllib.request.Request(uri)
@@ -950,10 +1338,13 @@ class CobraProxy:
                       ( but it can be auth module specific )
         msgpack     - Use msgpack serialization
         sockpool    - Fixed sized pool of cobra sockets (not socket per thread) 
+        mux         - Multiplex all threads' requests over one connection
+                      ( and allow pipelined calls with _cobra_async=True )
 
     Also, the following protocol options may be passed through the URI:
 
     msgpack=1
+    mux=1
     authinfo=<base64( json( <authinfo dict> ))>
     """
 
@@ -976,6 +1367,9 @@ class CobraProxy:
         self._cobra_sflags = 0
         self._cobra_spoolcnt = int(urlparams.get('sockpool', 0))
         self._cobra_sockpool = None
+        self._cobra_mux = int(urlparams.get('mux', kwargs.get('mux', 0)))
+        self._cobra_muxsock = None
+        self._cobra_muxlock = Lock()
 
         if self._cobra_timeout != None:
             self._cobra_timeout = int(self._cobra_timeout)
@@ -1047,6 +1441,20 @@ class CobraProxy:
         return False
 
     def _cobra_getsock(self, thr=None):
+        if self._cobra_mux:
+            with self._cobra_muxlock:
+                sock = self._cobra_muxsock
+                if sock is None or sock.trashed:
+                    sock = self._cobra_newsock()
+                    # If we have authinfo lets authenticate
+                    authinfo = self._cobra_kwargs.get('authinfo')
+                    if authinfo != None:
+                        mtype, rver, data = sock.cobraTransaction(COBRA_AUTH, '', authinfo)
+                        if mtype != COBRA_AUTH:
+                            raise CobraAuthException('Authentication Failed!')
+                    self._cobra_muxsock = sock
+                return sock
+
         if self._cobra_spoolcnt:
             sock = self._cobra_sockpool.get()
         else:
@@ -1092,6 +1500,9 @@ class CobraProxy:
             addSocketBuilder(host, port, builder)
 
         authinfo = self._cobra_kwargs.get('authinfo')
+        if self._cobra_mux:
+            return CobraMuxClientSocket(builder, retrymax=retrymax, sflags=self._cobra_sflags, authinfo=authinfo)
+
         return CobraClientSocket(builder, retrymax=retrymax, sflags=self._cobra_sflags, authinfo=authinfo,
                                  pool=self._cobra_sockpool)
 
@@ -1102,10 +1513,17 @@ class CobraProxy:
         return list(self._cobra_methods.keys())
 
     def __getstate__(self):
-        return self.__dict__
+        state = dict(self.__dict__)
+        # The multiplexed connection is not part of the proxy's state
+        state.pop('_cobra_muxsock', None)
+        state.pop('_cobra_muxlock', None)
+        return state
 
     def __setstate__(self, sdict):
         self.__dict__.update(sdict)
+        self.__dict__.setdefault('_cobra_mux', 0)
+        self.__dict__['_cobra_muxsock'] = None
+        self.__dict__['_cobra_muxlock'] = Lock()
 
     def __hash__(self):
         return hash(self._cobra_uri)
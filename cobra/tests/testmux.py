@@ -0,0 +1,120 @@
+import threading
+import unittest
+
+import cobra
+import cobra.auth as c_auth
+
+import cobra.tests as c_tests
+
+
+class MuxTestObject(c_tests.TestObject):
+
+    def __init__(self):
+        c_tests.TestObject.__init__(self)
+        self.gate = threading.Event()
+
+    def echo(self, x):
+        return x
+
+    def waitGate(self):
+        return self.gate.wait(10)
+
+    def openGate(self):
+        self.gate.set()
+
+
+class CobraMuxTest(unittest.TestCase):
+
+    def test_cobra_mux(self):
+        testobj = MuxTestObject()
+
+        daemon = cobra.CobraDaemon(port=60620)
+        objname = daemon.shareObject(testobj)
+        daemon.fireThread()
+
+        t = cobra.CobraProxy('cobra://localhost:60620/%s?mux=1' % objname)
+        c_tests.accessTestObject(t)
+
+        # Pipeline many calls on the one connection
+        csock = t._cobra_getsock()
+        trans = [t.echo(i, _cobra_async=True) for i in range(100)]
+        self.assertEqual([x.wait() for x in trans], list(range(100)))
+        self.assertEqual(csock.muxpending, {})
+
+        # Large replies
+        bigbuf = b'A' * (1024 * 1024 * 4)
+        self.assertEqual(t.echo(bigbuf), bigbuf)
+
+        # A blocked call does not hold up other threads sharing the connection
+        waiter = t.waitGate(_cobra_async=True)
+        thr = threading.Thread(target=t.openGate)
+        thr.start()
+        thr.join(10)
+        self.assertTrue(waiter.wait())
+        self.assertIs(t._cobra_getsock(), csock)
+
+        # Errors come back to the matching request
+        self.assertRaises(TypeError, t.echo, 1, 2, 3)
+        self.assertEqual(t.echo('woot'), 'woot')
+
+        daemon.stopServer()
+
+    def test_cobra_mux_reconnect(self):
+        testobj = MuxTestObject()
+
+        daemon = cobra.CobraDaemon(port=60621)
+        objname = daemon.shareObject(testobj)
+        daemon.fireThread()
+
+        t = cobra.CobraProxy('cobra://localhost:60621/%s' % objname, mux=True)
+        self.assertEqual(t.echo(10), 10)
+
+        # Drop the connection out from under the proxy
+        csock = t._cobra_getsock()
+        csock.muxsock.shutdown(cobra.socket.SHUT_RDWR)
+        self.assertEqual(t.echo(20), 20)
+
+        daemon.stopServer()
+
+    def test_cobra_async_daemon(self):
+        testobj = MuxTestObject()
+
+        daemon = cobra.CobraAsyncDaemon(port=60622)
+        objname = daemon.shareObject(testobj)
+        daemon.fireThread()
+
+        t = cobra.CobraProxy('cobra://localhost:60622/%s' % objname)
+        c_tests.accessTestObject(t)
+
+        m = cobra.CobraProxy('cobra://localhost:60622/%s?mux=1' % objname)
+        trans = [m.echo(i, _cobra_async=True) for i in range(100)]
+        self.assertEqual([x.wait() for x in trans], list(range(100)))
+
+        # Neither connection holds a thread while it waits
+        waiter = m.waitGate(_cobra_async=True)
+        t.openGate()
+        self.assertTrue(waiter.wait())
+
+        daemon.stopServer()
+
+    def test_cobra_async_daemon_auth(self):
+        testobj = MuxTestObject()
+
+        daemon = cobra.CobraAsyncDaemon(port=60623)
+        daemon.setAuthModule(c_auth.CobraAuthenticator())
+        objname = daemon.shareObject(testobj)
+        daemon.fireThread()
+
+        self.assertRaises(cobra.CobraAuthException, cobra.CobraProxy,
+                          'cobra://localhost:60623/%s?mux=1' % objname)
+
+        authinfo = {'user': 'invisigoth', 'passwd': 'secret'}
+        t = cobra.CobraProxy('cobra://localhost:60623/%s?mux=1' % objname, authinfo=authinfo)
+        c_tests.accessTestObject(t)
+        self.assertEqual(t.getUser(), 'invisigoth')
+
+        daemon.stopServer()
+
+
+if __name__ == '__main__':
+    unittest.main()
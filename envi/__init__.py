@@ -3,6 +3,7 @@ The Envi framework allows architecture abstraction through the use of the
 ArchitectureModule, Opcode, Operand, and Emulator objects.
 """
 
+import array
 import types
 import struct
 import platform
@@ -92,6 +93,51 @@ class ArchitectureModule:
         """
         raise ArchNotImplemented('archParseOpcode')
 
+    def archParseOpcodes(self, bytez, offset=0, va=0, size=None, maxcount=None, skipinvalid=False, opervals=False):
+        """
+        Linear sweep disassemble the given bytes and return an OpcodeBatch
+        of columnar results (va, size, iflags, mnemonic and branches for
+        each instruction) rather than a list of Opcode objects.
+
+        offset      - Offset into bytes to begin the sweep
+        va          - Virtual address of the first instruction
+        size        - Number of bytes to sweep (default to the end of bytes)
+        maxcount    - Maximum number of instructions to decode
+        skipinvalid - Skip a byte (rather than stop) on invalid instructions
+        opervals    - Also collect the (emulator-less) non-deref operand values
+
+        Example:
+            batch = a.archParseOpcodes(bytez, va=0x41414141)
+            for i in range(len(batch)):
+                if batch.iflags[i] & IF_CALL:
+                    print('0x%.8x %s' % (batch.vas[i], batch.getMnemonic(i)))
+        """
+        batch = OpcodeBatch(self, bytez, offset, va, opervals=opervals)
+
+        endoff = len(bytez)
+        if size is not None:
+            endoff = min(endoff, offset + size)
+
+        start = offset
+        while offset < endoff:
+
+            if maxcount is not None and len(batch) >= maxcount:
+                break
+
+            try:
+                op = self.archParseOpcode(bytez, offset, va + (offset - start))
+            except InvalidInstruction:
+                if not skipinvalid:
+                    break
+                offset += 1
+                continue
+
+            batch.addOpcode(op, offset)
+            offset += op.size
+
+        batch.endoff = offset
+        return batch
+
     def archGetRegisterGroups(self):
         """
         Returns a tuple of tuples of registers for different register groups.
@@ -504,7 +550,133 @@ class Opcode:
         return list(self.opers)
 
 
-class Emulator(e_reg.RegisterContext, e_mem.MemoryObject):
+class OpcodeBatch:
+    """
+    The columnar results of a linear sweep ( see archParseOpcodes() ).
+
+    For the instruction at index i:
+
+    vas[i]              - The virtual address
+    offsets[i]          - The offset into bytez
+    sizes[i]            - The size in bytes
+    iflags[i]           - The envi IF_FOO instruction flags
+    mnems[mnemids[i]]   - The mnemonic
+    brvas/brflags[brindex[i]:brindex[i+1]] - The branches (see getBranches())
+    opvals/opimmed[opindex[i]:opindex[i+1]] - The operand values (if
+                                              collected, see getOperValues())
+
+    Full Opcode objects are only decoded again by getOpcode().
+    """
+
+    def __init__(self, arch, bytez, offset, va, opervals=False):
+        self.arch = arch
+        self.bytez = bytez
+        self.offset = offset
+        self.va = va
+        self.endoff = offset
+
+        self.vas = array.array('Q')
+        self.offsets = array.array('Q')
+        self.sizes = array.array('H')
+        self.iflags = array.array('Q')
+        self.mnemids = array.array('L')
+        self.mnems = []
+        self._mnemidx = {}
+
+        # Branch targets may be None (dynamic) so they are a list
+        self.brindex = array.array('L', [0])
+        self.brvas = []
+        self.brflags = array.array('L')
+
+        self.opervals = opervals
+        self.opindex = array.array('L', [0])
+        self.opvals = []
+        self.opimmed = array.array('B')
+
+    def __len__(self):
+        return len(self.vas)
+
+    def addOpcode(self, op, offset):
+        """
+        Add the columns for an Opcode decoded from the given offset (used
+        by archParseOpcodes()).
+        """
+        mnemid = self._mnemidx.get(op.mnem)
+        if mnemid is None:
+            mnemid = len(self.mnems)
+            self.mnems.append(op.mnem)
+            self._mnemidx[op.mnem] = mnemid
+
+        self.vas.append(op.va)
+        self.offsets.append(offset)
+        self.sizes.append(op.size)
+        self.iflags.append(op.iflags)
+        self.mnemids.append(mnemid)
+
+        for bva, bflags in op.getBranches():
+            self.brvas.append(bva)
+            self.brflags.append(bflags)
+        self.brindex.append(len(self.brvas))
+
+        if self.opervals:
+            for oper in op.opers:
+                if oper.isDeref():
+                    continue
+
+                val = oper.getOperValue(op, None)
+                if val is None:
+                    continue
+
+                self.opvals.append(val)
+                self.opimmed.append(oper.isImmed())
+
+            self.opindex.append(len(self.opvals))
+
+    def getMnemonic(self, idx):
+        """
+        Return the mnemonic for the instruction at the given index.
+        """
+        return self.mnems[self.mnemids[idx]]
+
+    def getBranches(self, idx):
+        """
+        Return a list of (bva, bflags) tuples for the instruction at the
+        given index ( like Opcode.getBranches() ).
+        """
+        begin = self.brindex[idx]
+        end = self.brindex[idx + 1]
+        return list(zip(self.brvas[begin:end], self.brflags[begin:end]))
+
+    def getOperValues(self, idx):
+        """
+        Return a list of (value, isimmed) tuples for the non-deref operands
+        of the instruction at the given index which have a value without
+        an emulator (requires archParseOpcodes(..., opervals=True)).
+        """
+        if not self.opervals:
+            raise Exception('Operand values were not collected (use opervals=True)')
+
+        begin = self.opindex[idx]
+        end = self.opindex[idx + 1]
+        return [(val, bool(imm)) for val, imm in zip(self.opvals[begin:end], self.opimmed[begin:end])]
+
+    def getOpcode(self, idx):
+        """
+        Decode (again) and return the full Opcode object for the instruction
+        at the given index.
+        """
+        offset = self.offsets[idx]
+        return self.arch.archParseOpcode(self.bytez, offset, self.va + (offset - self.offset))
+
+    def iterOpcodes(self):
+        """
+        Yield the full Opcode objects for the instructions ( see getOpcode() ).
+        """
+        for idx in range(len(self)):
+            yield self.getOpcode(idx)
+
+
+class Emulator(e_reg.RegisterContext, e_mem.PagedMemoryObject):
     """
     The Emulator class is mostly "Abstract" in the java
     Interface sense.  The emulator should be able to
@@ -522,7 +694,7 @@ class Emulator(e_reg.RegisterContext, e_mem.MemoryObject):
     def __init__(self, archmod=None):
 
         self.metadata = {}
-        e_mem.MemoryObject.__init__(self, arch=archmod._arch_id)
+        e_mem.PagedMemoryObject.__init__(self, arch=archmod._arch_id)
         e_reg.RegisterContext.__init__(self)
 
         self._emu_segments = [(0, 0xffffffff), ]
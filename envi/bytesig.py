@@ -5,6 +5,11 @@ signature matching.
 
 Currently used by vivisect function entry sig db and others.
 """
+import array
+import pickle
+
+# The longest exact byte run of a signature to use as its automaton anchor
+AUTOMATON_ANCHOR_MAX = 16
 
 
 class SignatureTree:
@@ -24,6 +29,7 @@ class SignatureTree:
     def __init__(self):
         self.basenode = (0, [], [None] * 256)
         self.sigs = {}  # track duplicates
+        self._automaton = None
 
     def _addChoice(self, siginfo, node):
 
@@ -90,6 +96,7 @@ class SignatureTree:
 
         siginfo = (bytes, masks, val)
         self._addChoice(siginfo, self.basenode)
+        self._automaton = None
 
     def isSignature(self, bytes, offset=0):
         return self.getSignature(bytes, offset=offset) is not None
@@ -105,7 +112,7 @@ class SignatureTree:
                 sbytes, smasks, sobj = sigs[0]
                 for i in range(depth, len(sbytes)):
                     realoff = offset + i
-                    masked = ord(bytes[realoff]) & smasks[i]
+                    masked = bytes[realoff] & smasks[i]
                     if masked != sbytes[i]:
                         return None
                 return sobj
@@ -123,3 +130,235 @@ class SignatureTree:
             # We failed to make our next choice
             if node is None:
                 return None
+
+    def getAutomaton(self):
+        """
+        Return a SignatureAutomaton compiled from the signatures in this
+        tree (compiled on first use after signatures are added).
+        """
+        if self._automaton is None:
+            self._automaton = SignatureAutomaton(self.basenode[1])
+        return self._automaton
+
+    def scan(self, bytes, offset=0, size=None):
+        """
+        Find *all* the signatures which match anywhere in the bytes in one
+        pass ( see SignatureAutomaton.scan() ).
+
+        Example:
+            for off, val in sigtree.scan(mapbytes):
+                print('0x%.8x %r' % (mapva + off, val))
+        """
+        return self.getAutomaton().scan(bytes, offset=offset, size=size)
+
+
+class SignatureAutomaton:
+    """
+    An Aho-Corasick automaton compiled from a list of (bytes, masks, val)
+    signatures for finding all the signature matches in a buffer in one
+    pass (rather than walking the SignatureTree at every offset).
+
+    The automaton matches an "anchor" from each signature (its longest
+    run of fully unmasked bytes) and then checks the whole (masked)
+    signature where an anchor is found.  Signatures which are masked
+    everywhere have no anchor and are checked at every offset.
+
+    The transition and output tables are flat arrays, so an automaton
+    may be saved with dumps() and loaded again quickly with loads().
+    """
+
+    def __init__(self, siginfos=()):
+        self.sigbytes = []
+        self.sigmasks = []
+        self.sigvals = []
+        self.anchoroffs = array.array('I')
+        self.anchorlens = array.array('I')
+        self.unanchored = array.array('I')
+
+        # The full DFA (state * 256 + byte) and the sigs found by state
+        self.trans = array.array('I', [0] * 256)
+        self.outindex = array.array('I', [0, 0])
+        self.outsigs = array.array('I')
+
+        siginfos = list(siginfos)
+        if siginfos:
+            self._compile(siginfos)
+
+        self._initMatchInfo()
+
+    def _compile(self, siginfos):
+        goto = [{}]
+        outs = [[]]
+
+        for sigidx, (sbytes, smasks, sval) in enumerate(siginfos):
+            sbytes = bytes(sbytes)
+            smasks = bytes(smasks)
+            self.sigbytes.append(sbytes)
+            self.sigmasks.append(smasks)
+            self.sigvals.append(sval)
+
+            aoff, alen = self._getAnchor(smasks)
+            self.anchoroffs.append(aoff)
+            self.anchorlens.append(alen)
+            if not alen:
+                self.unanchored.append(sigidx)
+                continue
+
+            state = 0
+            for b in sbytes[aoff:aoff + alen]:
+                nstate = goto[state].get(b)
+                if nstate is None:
+                    nstate = len(goto)
+                    goto[state][b] = nstate
+                    goto.append({})
+                    outs.append([])
+                state = nstate
+
+            outs[state].append(sigidx)
+
+        # Breadth first fill in the failure transitions for a full DFA
+        nstates = len(goto)
+        trans = array.array('I', [0] * (nstates * 256))
+        fails = [0] * nstates
+
+        todo = []
+        for b, nstate in goto[0].items():
+            trans[b] = nstate
+            todo.append(nstate)
+
+        while todo:
+            ntodo = []
+            for state in todo:
+                fstate = fails[state]
+                outs[state].extend(outs[fstate])
+                sbase = state * 256
+                fbase = fstate * 256
+                trans[sbase:sbase + 256] = trans[fbase:fbase + 256]
+                for b, nstate in goto[state].items():
+                    fails[nstate] = trans[fbase + b]
+                    trans[sbase + b] = nstate
+                    ntodo.append(nstate)
+            todo = ntodo
+
+        self.trans = trans
+        self.outindex = array.array('I', [0])
+        for sigidxs in outs:
+            self.outsigs.extend(sigidxs)
+            self.outindex.append(len(self.outsigs))
+
+    def _getAnchor(self, smasks):
+        # The (offset, length) of the longest run of 0xff masks
+        bestoff = bestlen = 0
+        runoff = 0
+        for i, m in enumerate(smasks):
+            if m != 0xff:
+                runoff = i + 1
+                continue
+
+            runlen = min(i + 1 - runoff, AUTOMATON_ANCHOR_MAX)
+            if runlen > bestlen:
+                bestoff = runoff
+                bestlen = runlen
+
+        return bestoff, bestlen
+
+    def _initMatchInfo(self):
+        # Per-sig (length, mask int, bytes int) to check with and how far
+        # back from the end of its anchor a signature begins
+        self._sigchecks = []
+        self._sigbacks = array.array('I')
+        reach = 0
+        for sigidx, sbytes in enumerate(self.sigbytes):
+            smasks = self.sigmasks[sigidx]
+            self._sigchecks.append((len(sbytes),
+                                    int.from_bytes(smasks, 'little'),
+                                    int.from_bytes(sbytes, 'little')))
+            self._sigbacks.append(max(0, self.anchoroffs[sigidx] + self.anchorlens[sigidx] - 1))
+            reach = max(reach, len(sbytes))
+
+        self._maxreach = reach
+        self._final = bytearray(len(self.outindex) - 1)
+        for state in range(len(self._final)):
+            if self.outindex[state] != self.outindex[state + 1]:
+                self._final[state] = 1
+
+    def __len__(self):
+        return len(self.sigbytes)
+
+    def _checkSig(self, bytez, sigidx, soff):
+        slen, smask, sint = self._sigchecks[sigidx]
+        if soff < 0 or soff + slen > len(bytez):
+            return False
+        return int.from_bytes(bytez[soff:soff + slen], 'little') & smask == sint
+
+    def scan(self, bytez, offset=0, size=None):
+        """
+        Return a list of (offset, val) tuples (sorted by offset) for every
+        signature which matches at an offset in bytez between offset and
+        offset + size (the signature itself may extend past the range).
+
+        Example:
+            for off, val in auto.scan(mapbytes):
+                print('0x%.8x %r' % (mapva + off, val))
+        """
+        endoff = len(bytez)
+        if size is not None:
+            endoff = min(endoff, offset + size)
+
+        hits = []
+        if offset >= endoff:
+            return hits
+
+        trans = self.trans
+        final = self._final
+        outindex = self.outindex
+        outsigs = self.outsigs
+        sigbacks = self._sigbacks
+        checksig = self._checkSig
+
+        stop = min(len(bytez), endoff + self._maxreach)
+        mview = memoryview(bytez)[offset:stop]
+
+        state = 0
+        for i, b in enumerate(mview, offset):
+            state = trans[(state << 8) | b]
+            if not final[state]:
+                continue
+
+            for oidx in range(outindex[state], outindex[state + 1]):
+                sigidx = outsigs[oidx]
+                soff = i - sigbacks[sigidx]
+                if offset <= soff < endoff and checksig(bytez, sigidx, soff):
+                    hits.append((soff, sigidx))
+
+        for sigidx in self.unanchored:
+            for soff in range(offset, endoff):
+                if checksig(bytez, sigidx, soff):
+                    hits.append((soff, sigidx))
+
+        hits.sort()
+        return [(soff, self.sigvals[sigidx]) for soff, sigidx in hits]
+
+    def dumps(self):
+        """
+        Serialize the compiled automaton to bytes ( see loads() ).
+        """
+        return pickle.dumps((self.sigbytes, self.sigmasks, self.sigvals,
+                             self.anchoroffs, self.anchorlens, self.unanchored,
+                             self.trans, self.outindex, self.outsigs),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(bytez):
+    """
+    Load a SignatureAutomaton serialized with SignatureAutomaton.dumps().
+
+    Example:
+        auto = loads(open('sigs.auto', 'rb').read())
+    """
+    auto = SignatureAutomaton()
+    (auto.sigbytes, auto.sigmasks, auto.sigvals,
+     auto.anchoroffs, auto.anchorlens, auto.unanchored,
+     auto.trans, auto.outindex, auto.outsigs) = pickle.loads(bytez)
+    auto._initMatchInfo()
+    return auto
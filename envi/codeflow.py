@@ -42,11 +42,12 @@ class CodeFlowContext(object):
         # A few options to the codeflow object
         self._cf_persist = None
         if persist:
-            self._cf_persist = {}
+            self._cf_persist = set()
 
         self._cf_recurse = recurse
         self._cf_exptable = exptable
         self._cf_blocks = []
+        self._cf_blockrefs = {}  # va -> count of entries in _cf_blocks
         self._dynamic_branch_handlers = []
 
     def _cb_opcode(self, va, op, branches):
@@ -122,20 +123,72 @@ class CodeFlowContext(object):
         """
         self._fcalls[fva] = calls_from
 
-    def addCodeFlow(self, va, arch=envi.ARCH_DEFAULT):
+    def _pushBlock(self, va):
+        # add block as part of our call stack
+        self._cf_blocks.append(va)
+        self._cf_blockrefs[va] = self._cf_blockrefs.get(va, 0) + 1
+
+    def _popBlock(self):
+        va = self._cf_blocks.pop()
+        refs = self._cf_blockrefs[va] - 1
+        if refs:
+            self._cf_blockrefs[va] = refs
+        else:
+            self._cf_blockrefs.pop(va)
+
+    def _runFlow(self, flow):
         """
-        Do code flow disassembly from the specified address.  Returns a list
-        of the procedural branch targets discovered during code flow...
+        Drive the given code flow generator (and any entry points it
+        discovers) to completion and return its result.
+
+        Rather than recursing, each flow generator yields (va, arch) for
+        every entry point it wants analyzed before it continues.  Those
+        are pushed onto an explicit work stack so the most recently (and
+        most deeply) discovered function always completes first, exactly
+        matching the callback order of a depth first recursive descent
+        without using the python stack.
+        """
+        stack = [flow]
+        retval = None
+        exc = None
+        while stack:
+            try:
+                if exc is not None:
+                    e, exc = exc, None
+                    req = stack[-1].throw(e)
+                else:
+                    req = stack[-1].send(None)
+
+            except StopIteration as e:
+                stack.pop()
+                retval = e.value
+                continue
 
-        Set persist=True to store 'opdone' and never disassemble the same thing twice
+            except BaseException as e:
+                # Unwind into the parent flow as a recursive call would
+                stack.pop()
+                if not stack:
+                    raise
+                exc = e
+                continue
+
+            stack.append(self._entryFlow(*req))
+
+        return retval
+
+    def _codeFlow(self, va, arch):
         """
-        opdone = {}
+        The code flow generator used by addCodeFlow().  Yields (va, arch)
+        for nested entry points and returns the list of procedural branch
+        targets.
+        """
+        opdone = set()
         if self._cf_persist is not None:
             opdone = self._cf_persist
 
         calls_from = {}
         optodo = [((0, va), arch), ]
-        self._cf_blocks.append(va)
+        self._pushBlock(va)
         cf_eps = set()
         while len(optodo):
 
@@ -146,10 +199,10 @@ class CodeFlowContext(object):
                 continue
 
             pva, va = todo
-            if opdone.get(va):
+            if va in opdone:
                 continue
 
-            opdone[va] = True
+            opdone.add(va)
 
             try:
                 op = self._mem.parseOpcode(va, arch=arch)
@@ -170,7 +223,7 @@ class CodeFlowContext(object):
                     self._cb_dynamic_branch(va, op, bflags, branches)
 
                 # add block as part of our call stack
-                self._cf_blocks.append(bva)
+                self._pushBlock(bva)
 
                 try:
                     # Handle a table branch by adding more branches...
@@ -178,14 +231,14 @@ class CodeFlowContext(object):
                         if self._cf_exptable:
                             ptrbase = bva
                             bdest = self._mem.readMemoryFormat(ptrbase, '<P')[0]
-                            tabdone = {}
+                            tabdone = set()
                             while self._mem.isValidPointer(bdest):
 
                                 if self._cb_branchtable(bva, ptrbase, bdest) is False:
                                     break
 
-                                if not tabdone.get(bdest):
-                                    tabdone[bdest] = True
+                                if bdest not in tabdone:
+                                    tabdone.add(bdest)
                                     branches.append((bdest, envi.BR_COND))
 
                                 ptrbase += self._mem.psize
@@ -216,13 +269,13 @@ class CodeFlowContext(object):
 
                             # Now we decend so we do deepest func callbacks first!
                             if self._cf_recurse:
-                                if bva in self._cf_blocks:
+                                if bva in self._cf_blockrefs:
                                     # the function that we want to make prodcedural
                                     # called us so we can't call to make it procedural
                                     # until its done
                                     cf_eps.add(bva)
                                 else:
-                                    self.addEntryPoint(bva)
+                                    yield bva, envi.ARCH_DEFAULT
 
                             if self._cf_noret.get(bva):
                                 # then our next va is noflow!
@@ -233,28 +286,23 @@ class CodeFlowContext(object):
                             # We only go up to procedural branches, not across
                             continue
                 finally:
-                    self._cf_blocks.pop()
+                    self._popBlock()
 
-                if not opdone.get(bva):
+                if bva not in opdone:
                     optodo.append(((va, bva), bflags))
 
         # remove our local blocks from global block stack
-        self._cf_blocks.pop()
+        self._popBlock()
         while cf_eps:
             fva = cf_eps.pop()
             if not self._mem.isFunction(fva):
-                self.addEntryPoint(fva, arch=arch)
+                yield fva, arch
 
         return list(calls_from.keys())
 
-    def addEntryPoint(self, va, arch=envi.ARCH_DEFAULT):
+    def _entryFlow(self, va, arch):
         """
-        Analyze the given procedure entry point and flow downward
-        to find all subsequent code blocks and procedure edges.
-
-        Example:
-            cf.addEntryPoint( 0x77c70308 )
-            ... callbacks flow along ...
+        The generator used by addEntryPoint() (see _codeFlow()).
         """
         # Check if this is already a known function.
         if self._funcs.get(va) is not None:
@@ -262,12 +310,35 @@ class CodeFlowContext(object):
 
         # Add this function to known functions
         self._funcs[va] = True
-        calls_from = self.addCodeFlow(va, arch=arch)
+        calls_from = yield from self._codeFlow(va, arch)
         self._fcalls[va] = calls_from
 
         # Finally, notify the callback of a new function
         self._cb_function(va, {'CallsFrom': calls_from})
 
+    def addCodeFlow(self, va, arch=envi.ARCH_DEFAULT):
+        """
+        Do code flow disassembly from the specified address.  Returns a list
+        of the procedural branch targets discovered during code flow...
+
+        Set persist=True to store 'opdone' and never disassemble the same thing twice
+
+        Nested functions are analyzed from an explicit work stack (see
+        _runFlow()) so deep call chains do not recurse.
+        """
+        return self._runFlow(self._codeFlow(va, arch))
+
+    def addEntryPoint(self, va, arch=envi.ARCH_DEFAULT):
+        """
+        Analyze the given procedure entry point and flow downward
+        to find all subsequent code blocks and procedure edges.
+
+        Example:
+            cf.addEntryPoint( 0x77c70308 )
+            ... callbacks flow along ...
+        """
+        self._runFlow(self._entryFlow(va, arch))
+
     def addDynamicBranchHandler(self, cb):
         """
         Add a callback handler for dynamic branches the code-flow resolver
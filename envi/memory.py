@@ -3,8 +3,12 @@ A module containing memory utilities and the definition of the
 memory access API used by all vtoys trace/emulators/workspaces.
 """
 
+import os
 import re
+import mmap
+import bisect
 import struct
+import hashlib
 import traceback
 
 import envi
@@ -397,6 +401,48 @@ class MemoryObject(IMemory):
         """
         IMemory.__init__(self, arch=arch)
         self._map_defs = []
+        self._initMapIndex()
+
+    def _initMapIndex(self):
+        """
+        (Re)build the sorted map index used to find the map def for a va.
+
+        _map_defs stays in insertion order (that's what getMemoryMaps()
+        returns) while _map_index holds the same map def lists sorted by
+        base address with _map_starts as the bisect key.
+        """
+        self._map_index = sorted(self._map_defs, key=lambda mdef: mdef[0])
+        self._map_starts = [mdef[0] for mdef in self._map_index]
+        self._map_overlap = False
+        for i in range(1, len(self._map_index)):
+            if self._map_index[i][0] < self._map_index[i - 1][1]:
+                self._map_overlap = True
+        self._map_last = None
+
+    def _getMapDef(self, va):
+        """
+        Return the [va, maxva, mmap, bytes] map def which contains va
+        (or None).
+        """
+        mdef = self._map_last
+        if mdef is not None and mdef[0] <= va < mdef[1]:
+            return mdef
+
+        if self._map_overlap:
+            # Overlapping maps resolve to the first one added
+            for mdef in self._map_defs:
+                if mdef[0] <= va < mdef[1]:
+                    return mdef
+            return None
+
+        idx = bisect.bisect_right(self._map_starts, va) - 1
+        if idx >= 0:
+            mdef = self._map_index[idx]
+            if va < mdef[1]:
+                self._map_last = mdef
+                return mdef
+
+        return None
 
     # FIXME MemoryObject: def allocateMemory(self, size, perms=MM_RWX, suggestaddr=0):
 
@@ -408,8 +454,31 @@ class MemoryObject(IMemory):
         mmap = (va, msize, perms, fname)
         hlpr = [va, va + msize, mmap, bytez]
         self._map_defs.append(hlpr)
+
+        idx = bisect.bisect_right(self._map_starts, va)
+        if idx > 0 and self._map_index[idx - 1][1] > va:
+            self._map_overlap = True
+        if idx < len(self._map_starts) and self._map_starts[idx] < va + msize:
+            self._map_overlap = True
+
+        self._map_starts.insert(idx, va)
+        self._map_index.insert(idx, hlpr)
+        self._map_last = None
         return
 
+    def delMemoryMap(self, va):
+        """
+        Remove the memory map which contains va.
+
+        Example: mem.delMemoryMap(0x41410000)
+        """
+        mdef = self._getMapDef(va)
+        if mdef is None:
+            raise envi.SegmentationViolation(va)
+
+        self._map_defs.remove(mdef)
+        self._initMapIndex()
+
     def getMemorySnap(self):
         """
         Take a memory snapshot which may be restored later.
@@ -425,43 +494,47 @@ class MemoryObject(IMemory):
         Example: mem.setMemorySnap(snap)
         """
         self._map_defs = [list(md) for md in snap]
+        self._initMapIndex()
 
     def getMemoryMap(self, va):
         """
         Get the va,size,perms,fname tuple for this memory map
         """
         if va is not None:
-            for mva, mmaxva, mmap, mbytes in self._map_defs:
-                if mva <= va < mmaxva:
-                    return mmap
+            mdef = self._getMapDef(va)
+            if mdef is not None:
+                return mdef[2]
         return None
 
+    def isValidPointer(self, va):
+        if va is None:
+            return False
+        return self._getMapDef(va) is not None
+
     def getMemoryMaps(self):
         return [mmap for mva, mmaxva, mmap, mbytes in self._map_defs]
 
     def readMemory(self, va, size):
+        mdef = self._getMapDef(va)
+        if mdef is None:
+            raise envi.SegmentationViolation(va)
 
-        for mva, mmaxva, mmap, mbytes in self._map_defs:
-            if mva <= va < mmaxva:
-                mva, msize, mperms, mfname = mmap
-                if not mperms & MM_READ:
-                    raise envi.SegmentationViolation(va)
-                offset = va - mva
-                return mbytes[offset:offset + size]
-        raise envi.SegmentationViolation(va)
+        mva, mmaxva, mmap, mbytes = mdef
+        if not mmap[2] & MM_READ:
+            raise envi.SegmentationViolation(va)
+        offset = va - mva
+        return mbytes[offset:offset + size]
 
     def writeMemory(self, va, bytes):
-        for mapdef in self._map_defs:
-            mva, mmaxva, mmap, mbytes = mapdef
-            if mva <= va < mmaxva:
-                mva, msize, mperms, mfname = mmap
-                if not mperms & MM_WRITE:
-                    raise envi.SegmentationViolation(va)
-                offset = va - mva
-                mapdef[3] = mbytes[:offset] + bytes + mbytes[offset + len(bytes):]
-                return
-
-        raise envi.SegmentationViolation(va)
+        mapdef = self._getMapDef(va)
+        if mapdef is None:
+            raise envi.SegmentationViolation(va)
+
+        mva, mmaxva, mmap, mbytes = mapdef
+        if not mmap[2] & MM_WRITE:
+            raise envi.SegmentationViolation(va)
+        offset = va - mva
+        mapdef[3] = mbytes[:offset] + bytes + mbytes[offset + len(bytes):]
 
     def getByteDef(self, va):
         """
@@ -471,12 +544,185 @@ class MemoryObject(IMemory):
         buffer.  Used internally for optimized memory
         handling.  Returns (offset, bytes)
         """
-        for mapdef in self._map_defs:
-            mva, mmaxva, mmap, mbytes = mapdef
-            if mva <= va < mmaxva:
-                offset = va - mva
-                return offset, mbytes
-        raise envi.SegmentationViolation(va)
+        mapdef = self._getMapDef(va)
+        if mapdef is None:
+            raise envi.SegmentationViolation(va)
+        return va - mapdef[0], mapdef[3]
+
+
+class PagedMemoryObject(MemoryObject):
+    """
+    A MemoryObject which keeps the bytes handed to addMemoryMap() as an
+    immutable (and shared) base, and holds writes in page sized bytearray
+    copies.  Snapshots only reference the dirty pages, so getMemorySnap()
+    and setMemorySnap() cost O(dirty pages) and pages are only copied
+    again once written to after a snapshot (copy on write).
+    """
+
+    def __init__(self, arch=None, pagesize=4096):
+        self._page_size = pagesize  # must be binary multiplicative
+        self._page_mask = ~ (pagesize - 1)
+        self._page_dirty = {}
+        self._page_owned = set()
+        MemoryObject.__init__(self, arch=arch)
+
+    def getMemorySnap(self):
+        """
+        Take a memory snapshot which may be restored later.
+
+        Example: snap = mem.getMemorySnap()
+        """
+        # Every page is now shared with the snap, so the next write
+        # to any of them must make a copy first.
+        self._page_owned = set()
+        return list(self._map_defs), dict(self._page_dirty)
+
+    def setMemorySnap(self, snap):
+        """
+        Restore a previously saved memory snapshot.
+
+        Example: mem.setMemorySnap(snap)
+        """
+        mapdefs, pages = snap
+        if mapdefs != self._map_defs:
+            self._map_defs = list(mapdefs)
+            self._initMapIndex()
+
+        self._page_dirty = dict(pages)
+        self._page_owned = set()
+
+    def delMemoryMap(self, va):
+        mdef = self._getMapDef(va)
+        MemoryObject.delMemoryMap(self, va)
+        for pageva in range(mdef[0], mdef[1], self._page_size):
+            self._page_dirty.pop(pageva, None)
+            self._page_owned.discard(pageva)
+
+    def getDirtyPages(self):
+        """
+        Returns a list of (pageva, pagebytes) tuples for the pages which
+        have been written to.
+
+        NOTE: pages are aligned to the base of their memory map.
+        """
+        return [(pageva, bytes(page)) for pageva, page in self._page_dirty.items()]
+
+    def isDirtyMemory(self, va, size=1):
+        """
+        Returns True if any of the size bytes at va (within its memory
+        map) are in a page which has been written to.
+        """
+        dirty = self._page_dirty
+        if not dirty:
+            return False
+
+        mdef = self._getMapDef(va)
+        if mdef is None:
+            return False
+
+        mva = mdef[0]
+        pageoff = (va - mva) & self._page_mask
+        endoff = min(va + size, mdef[1]) - mva
+        while pageoff < endoff:
+            if mva + pageoff in dirty:
+                return True
+            pageoff += self._page_size
+
+        return False
+
+    def readMemory(self, va, size):
+        mdef = self._getMapDef(va)
+        if mdef is None:
+            raise envi.SegmentationViolation(va)
+
+        mva, mmaxva, mmap, mbytes = mdef
+        if not mmap[2] & MM_READ:
+            raise envi.SegmentationViolation(va)
+
+        return self._readMapBytes(mdef, va - mva, size)
+
+    def _readMapBytes(self, mdef, offset, size):
+        mva, mmaxva, mmap, mbytes = mdef
+        dirty = self._page_dirty
+        if not dirty:
+            return mbytes[offset:offset + size]
+
+        pagesize = self._page_size
+        pagemask = self._page_mask
+        size = min(size, len(mbytes) - offset)
+
+        ret = []
+        while size > 0:
+            pageoff = offset & pagemask
+            chunkoff = offset - pageoff
+            chunk = min(pagesize - chunkoff, size)
+
+            page = dirty.get(mva + pageoff)
+            if page is None:
+                ret.append(mbytes[offset:offset + chunk])
+            else:
+                ret.append(bytes(page[chunkoff:chunkoff + chunk]))
+
+            offset += chunk
+            size -= chunk
+
+        return b''.join(ret)
+
+    def writeMemory(self, va, bytez):
+        mdef = self._getMapDef(va)
+        if mdef is None:
+            raise envi.SegmentationViolation(va)
+
+        mva, mmaxva, mmap, mbytes = mdef
+        if not mmap[2] & MM_WRITE:
+            raise envi.SegmentationViolation(va)
+
+        pagesize = self._page_size
+        pagemask = self._page_mask
+        dirty = self._page_dirty
+        owned = self._page_owned
+
+        bytez = memoryview(bytez).cast('B')
+        offset = va - mva
+        size = min(len(bytez), mmaxva - va)
+        boff = 0
+        while boff < size:
+            pageoff = offset & pagemask
+            chunkoff = offset - pageoff
+            chunk = min(pagesize - chunkoff, size - boff)
+
+            pageva = mva + pageoff
+            page = dirty.get(pageva)
+            if pageva not in owned:
+                # copy on write (from the base bytes or a shared page)
+                if page is None:
+                    page = bytearray(mbytes[pageoff:pageoff + pagesize])
+                else:
+                    page = bytearray(page)
+                dirty[pageva] = page
+                owned.add(pageva)
+
+            page[chunkoff:chunkoff + chunk] = bytez[boff:boff + chunk]
+
+            offset += chunk
+            boff += chunk
+
+        # Writes which run off the end of the map continue in the next
+        if boff < len(bytez):
+            self.writeMemory(mva + offset, bytez[boff:].tobytes())
+
+    def getByteDef(self, va):
+        mdef = self._getMapDef(va)
+        if mdef is None:
+            raise envi.SegmentationViolation(va)
+
+        mva, mmaxva, mmap, mbytes = mdef
+        for pageva in self._page_dirty:
+            if mva <= pageva < mmaxva:
+                # The map has been written to, hand back a current copy
+                return va - mva, self._readMapBytes(mdef, 0, mmaxva - mva)
+
+        return va - mva, mbytes
 
 
 class MemoryFile:
@@ -502,6 +748,161 @@ class MemoryFile:
         self.offset += len(bytes)
 
 
+# (filename, size, mtime) -> md5 of the files FileBytes have verified
+_file_hashes = {}
+
+
+def _checkFileHash(filename, md5sum):
+    st = os.stat(filename)
+    fkey = (filename, st.st_size, st.st_mtime)
+    fhash = _file_hashes.get(fkey)
+    if fhash is None:
+        d = hashlib.md5()
+        with open(filename, 'rb') as f:
+            buf = f.read(0x100000)
+            while buf:
+                d.update(buf)
+                buf = f.read(0x100000)
+        fhash = d.hexdigest()
+        _file_hashes[fkey] = fhash
+
+    if fhash != md5sum:
+        raise Exception('File %s does not match hash %s (got %s)' % (filename, md5sum, fhash))
+
+
+class FileBytes:
+    """
+    A read-only, bytes like view of size bytes at offset in a file
+    (followed by padsize zero bytes) backed by a page aligned mmap of
+    the file rather than a copy.  It may be used as the bytes for
+    addMemoryMap() and pickles as only the file reference and hash, so
+    saved workspaces do not grow with the size of the input file.
+
+    The file is mapped (and checked against md5sum if given) on first
+    access.
+
+    Example:
+        fbytes = FileBytes('/bins/huge.exe', 0x400, 0x1000000, md5sum=md5)
+        memobj.addMemoryMap(0x41410000, e_mem.MM_READ, 'huge', fbytes)
+    """
+
+    def __init__(self, filename, offset, size, padsize=0, md5sum=None):
+        self.filename = filename
+        self.offset = offset
+        self.size = size
+        self.padsize = padsize
+        self.md5sum = md5sum
+
+        self._fb_len = size + padsize
+        self._fb_map = None
+        self._fb_delta = 0
+
+    def __reduce__(self):
+        return (FileBytes, (self.filename, self.offset, self.size, self.padsize, self.md5sum))
+
+    def _getMap(self):
+        if self._fb_map is not None:
+            return self._fb_map
+
+        if self.md5sum is not None:
+            _checkFileHash(self.filename, self.md5sum)
+
+        if self.size == 0:
+            self._fb_map = b''
+            return self._fb_map
+
+        # mmap offsets must be allocation granularity (page) aligned
+        mapoff = self.offset - (self.offset % mmap.ALLOCATIONGRANULARITY)
+        with open(self.filename, 'rb') as f:
+            self._fb_map = mmap.mmap(f.fileno(), self.offset - mapoff + self.size,
+                                     access=mmap.ACCESS_READ, offset=mapoff)
+        self._fb_delta = self.offset - mapoff
+        return self._fb_map
+
+    def _readBytes(self, start, stop):
+        ret = b''
+        if start < self.size:
+            mm = self._getMap()
+            delta = self._fb_delta
+            ret = mm[delta + start:delta + min(stop, self.size)]
+
+        if stop > self.size:
+            ret += b'\x00' * (stop - max(start, self.size))
+
+        return ret
+
+    def __len__(self):
+        return self._fb_len
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self._fb_len)
+            if step != 1:
+                return bytes(self)[idx]
+            if stop <= start:
+                return b''
+            return self._readBytes(start, stop)
+
+        if idx < 0:
+            idx += self._fb_len
+
+        if idx < 0 or idx >= self._fb_len:
+            raise IndexError('FileBytes index out of range')
+
+        if idx >= self.size:
+            return 0
+
+        mm = self._fb_map
+        if mm is None:
+            mm = self._getMap()
+        return mm[self._fb_delta + idx]
+
+    def __bytes__(self):
+        return self._readBytes(0, self._fb_len)
+
+    def __iter__(self):
+        return iter(bytes(self))
+
+    def __eq__(self, other):
+        if isinstance(other, FileBytes):
+            other = bytes(other)
+        return bytes(self) == other
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return bytes(self) + bytes(other)
+
+    def __radd__(self, other):
+        return bytes(other) + bytes(self)
+
+    def __repr__(self):
+        return 'FileBytes(%r, 0x%.8x, 0x%.8x, padsize=0x%.8x)' % (self.filename, self.offset, self.size, self.padsize)
+
+    def find(self, sub, start=0, end=None):
+        if end is None:
+            end = self._fb_len
+        start, end, step = slice(start, end).indices(self._fb_len)
+
+        # Search the file backed part in place
+        if start < self.size:
+            mm = self._getMap()
+            delta = self._fb_delta
+            foff = mm.find(sub, delta + start, delta + min(end, self.size))
+            if foff != -1:
+                return foff - delta
+
+        if end <= self.size:
+            return -1
+
+        # And whatever spans (or lands in) the zero padding
+        tstart = max(start, self.size - len(sub) + 1)
+        foff = self._readBytes(tstart, end).find(sub)
+        if foff == -1:
+            return -1
+        return foff + tstart
+
+
 def memdiff(bytes1, bytes2):
     """
     Return a list of (offset, size) tuples showing any memory
@@ -3,6 +3,8 @@ A home for the page lookup construct.  Basically it is a
 python object which implements a similar lookup mechanism
 to the i386 page table lookups...
 """
+import array
+import bisect
 import collections
 
 
@@ -62,6 +64,10 @@ class MapLookup:
                 return
         raise Exception('Address (0x%.8x) not in maps!' % va)
 
+    def setMapLookups(self, items):
+        for va, size, obj in items:
+            self.setMapLookup(va, size, obj)
+
     def getMapLookup(self, va):
         if va is not None:
             for mva, mvamax, marray in self._maps_list:
@@ -71,3 +77,158 @@ class MapLookup:
 
     def __getslice__(self, start, end):
         print('GET SLICE')
+
+
+class IntervalLookup:
+    """
+    A drop-in replacement for MapLookup which stores the objects as
+    sorted, non-overlapping [start, end) intervals rather than one list
+    slot per byte.  Memory use scales with the number of objects set
+    rather than the size of the maps, and lookups are a bisect over an
+    array of start addresses.
+    """
+
+    def __init__(self):
+        # The memory map ranges (sorted by start)
+        self._map_starts = array.array('Q')
+        self._map_ends = array.array('Q')
+
+        # The object intervals (sorted by start, never overlapping)
+        self._iv_starts = array.array('Q')
+        self._iv_ends = array.array('Q')
+        self._iv_objs = []
+
+    def initMapLookup(self, va, size, obj=None):
+        idx = bisect.bisect_right(self._map_starts, va)
+        self._map_starts.insert(idx, va)
+        self._map_ends.insert(idx, va + size)
+        if obj is not None:
+            self._setInterval(va, va + size, obj)
+
+    def _getMapEnd(self, va):
+        idx = bisect.bisect_right(self._map_starts, va) - 1
+        # Maps may overlap, so check back until one contains va
+        while idx >= 0:
+            if va < self._map_ends[idx]:
+                return self._map_ends[idx]
+            idx -= 1
+        return None
+
+    def setMapLookup(self, va, size, obj):
+        mvamax = self._getMapEnd(va)
+        if mvamax is None:
+            raise Exception('Address (0x%.8x) not in maps!' % va)
+        self._setInterval(va, min(va + size, mvamax), obj)
+
+    def _setInterval(self, va, vamax, obj):
+        starts = self._iv_starts
+        ends = self._iv_ends
+        objs = self._iv_objs
+
+        # Find the span of intervals which overlap [va, vamax)
+        lo = bisect.bisect_right(starts, va) - 1
+        if lo < 0 or ends[lo] <= va:
+            lo += 1
+        hi = bisect.bisect_left(starts, vamax, lo)
+
+        new_starts = []
+        new_ends = []
+        new_objs = []
+
+        if lo < hi:
+            # Keep the un-overwritten head/tail of partial overlaps
+            if starts[lo] < va:
+                new_starts.append(starts[lo])
+                new_ends.append(va)
+                new_objs.append(objs[lo])
+
+            if obj is not None:
+                new_starts.append(va)
+                new_ends.append(vamax)
+                new_objs.append(obj)
+
+            if ends[hi - 1] > vamax:
+                new_starts.append(vamax)
+                new_ends.append(ends[hi - 1])
+                new_objs.append(objs[hi - 1])
+
+        elif obj is not None:
+            new_starts.append(va)
+            new_ends.append(vamax)
+            new_objs.append(obj)
+
+        starts[lo:hi] = array.array('Q', new_starts)
+        ends[lo:hi] = array.array('Q', new_ends)
+        objs[lo:hi] = new_objs
+
+    def setMapLookups(self, items):
+        """
+        Bulk version of setMapLookup() for (va, size, obj) tuples.  Building
+        into an empty lookup from non-overlapping items is a single sort
+        rather than an array insert per item.
+        """
+        items = list(items)
+
+        starts = array.array('Q')
+        ends = array.array('Q')
+        objs = []
+
+        lastend = 0
+        for va, size, obj in sorted(items, key=lambda item: item[0]):
+            mvamax = self._getMapEnd(va)
+            if mvamax is None:
+                raise Exception('Address (0x%.8x) not in maps!' % va)
+
+            if obj is None or va < lastend or self._iv_objs:
+                # Overlaps (or existing entries) need the slow path
+                for va, size, obj in items:
+                    self.setMapLookup(va, size, obj)
+                return
+
+            lastend = min(va + size, mvamax)
+            starts.append(va)
+            ends.append(lastend)
+            objs.append(obj)
+
+        self._iv_starts = starts
+        self._iv_ends = ends
+        self._iv_objs = objs
+
+    def getMapLookup(self, va):
+        if va is None or va < 0:
+            return None
+        idx = bisect.bisect_right(self._iv_starts, va) - 1
+        if idx >= 0 and va < self._iv_ends[idx]:
+            return self._iv_objs[idx]
+        return None
+
+    def getMapLookupPrev(self, va):
+        """
+        Return the nearest object whose interval ends at or before va
+        (or None).
+        """
+        idx = bisect.bisect_right(self._iv_starts, va) - 1
+        while idx >= 0:
+            if self._iv_ends[idx] <= va:
+                return self._iv_objs[idx]
+            idx -= 1
+        return None
+
+    def getMapLookupRanges(self, va, size):
+        """
+        Return (starts, ends) arrays for the intervals which overlap
+        [va, va + size) in address order.
+        """
+        lo = bisect.bisect_right(self._iv_starts, va) - 1
+        if lo < 0 or self._iv_ends[lo] <= va:
+            lo += 1
+        hi = bisect.bisect_left(self._iv_starts, va + size, lo)
+        return self._iv_starts[lo:hi], self._iv_ends[lo:hi]
+
+    def getMapLookups(self):
+        """
+        Yield (va, size, obj) tuples for each interval in address order.
+        """
+        for i in range(len(self._iv_objs)):
+            start = self._iv_starts[i]
+            yield start, self._iv_ends[i] - start, self._iv_objs[i]
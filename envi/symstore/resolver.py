@@ -1,5 +1,6 @@
-import types
-import collections
+import bisect
+
+import envi.symstore.symfile as e_symfile
 
 # Symbol Type Constants ( for serialization )
 SYMSTOR_SYM_SYMBOL = 0
@@ -7,6 +8,10 @@ SYMSTOR_SYM_FUNCTION = 1
 SYMSTOR_SYM_SECTION = 2
 SYMSTOR_SYM_MODULE = 3
 
+# How far past a symbol with no size getSymByAddr(exact=False) will still
+# resolve to it (or to a sized symbol which does not contain the address)
+SYMSTOR_NEAR_MAX = 8192
+
 
 class Symbol:
     symtype = SYMSTOR_SYM_SYMBOL
@@ -79,6 +84,11 @@ class SymbolResolver:
     """
     NOTE: Nothing should reach directly into a SymbolResolver!
     """
+    # ( SymbolFile, baseaddr, fname ) tuples imported without unpacking
+    # them (see impSymCache()) for address and name lookups.
+    _sym_addrfiles = ()
+    _sym_namefiles = ()
+    _symaddr_index = None
 
     def __init__(self, width=4, casesens=True, baseaddr=0):
         self.width = width
@@ -86,12 +96,6 @@ class SymbolResolver:
         self.casesens = casesens
         self.baseaddr = baseaddr  # Set if this is an RVA sym resolver
 
-        # Lets use 4096 byte buckets for now
-        self.bucketsize = 4096
-        self.bucketmask = self.widthmask ^ (self.bucketsize - 1)
-
-        self.buckets = collections.defaultdict(list)
-
         # holds tuples by name/addr, instantiated on demand and subsequently
         # stored in symobjsbyaddr and symobjsbyname
         self.symnames = {}
@@ -101,15 +105,40 @@ class SymbolResolver:
         self.symobjsbyaddr = {}
         self.symobjsbyname = {}
 
+        # sorted addresses (and running max symbol end) of symaddrs for
+        # nearest symbol lookups, built on demand
+        self._symaddr_index = None
+
+        self._sym_addrfiles = ()
+        self._sym_namefiles = ()
+
+    def _loadSymFiles(self):
+        # Unpack any symbol files into our dicts (for the rare operations
+        # which can't be done on them in place)
+        for sfile, baseaddr, symfname in self._sym_addrfiles:
+            self._nomSymTupAddrs(self._getFileSymTups(sfile, baseaddr, symfname))
+
+        for sfile, baseaddr, symfname in self._sym_namefiles:
+            self._nomSymTupNames(self._getFileSymTups(sfile, baseaddr, symfname))
+
+        self._sym_addrfiles = ()
+        self._sym_namefiles = ()
+
+    def _getFileSymTups(self, sfile, baseaddr, symfname):
+        return [(symaddr + baseaddr, symsize, symname, symtype, symfname)
+                for (symaddr, symsize, symname, symtype) in sfile]
+
     def delSymbol(self, sym):
         """
         Delete a symbol from the resolver's namespace
         """
+        if self._sym_addrfiles or self._sym_namefiles:
+            self._loadSymFiles()
+
         symval = int(sym)
         self.symaddrs.pop(symval, None)
-
-        bbase = symval & self.bucketmask
-        # self.objbuckets[bbase].remove(sym)
+        self.symobjsbyaddr.pop(symval, None)
+        self._symaddr_index = None
 
         subres = None
         if sym.fname is not None:
@@ -125,6 +154,7 @@ class SymbolResolver:
             if not self.casesens:
                 symname = symname.lower()
             self.symnames.pop(symname, None)
+            self.symobjsbyname.pop(symname, None)
 
     def addSymbol(self, sym):
         """
@@ -164,6 +194,13 @@ class SymbolResolver:
         if symtup is not None:
             return self._symFromTup(symtup)
 
+        # Do we have a symbol file with it?
+        for sfile, baseaddr, symfname in reversed(self._sym_namefiles):
+            symtup = sfile.getSymTupByName(name, casesens=self.casesens)
+            if symtup is not None:
+                symaddr, symsize, symname, symtype = symtup
+                return self._symFromTup((symaddr + baseaddr, symsize, symname, symtype, symfname))
+
     def delSymByName(self, name):
         if not self.casesens:
             name = name.lower()
@@ -188,10 +225,6 @@ class SymbolResolver:
         # Add a symbol object to our datastructures.
         self.symobjsbyaddr[sym.value] = sym
 
-        symmax = sym.value + sym.size
-
-        bbase = sym.value & self.bucketmask
-
         if sym.fname:
             subres = self.symobjsbyname.get(sym.fname)
             if subres is not None:
@@ -218,28 +251,117 @@ class SymbolResolver:
         if symtup:
             return self._symFromTup(symtup)
 
+        for sfile, baseaddr, symfname in reversed(self._sym_addrfiles):
+            rva = va - baseaddr
+            if rva < sfile.minrva or rva > sfile.maxrva:
+                continue
+
+            symtup = sfile.getSymTupByAddr(rva)
+            if symtup is not None:
+                symaddr, symsize, symname, symtype = symtup
+                return self._symFromTup((symaddr + baseaddr, symsize, symname, symtype, symfname))
+
         # In the "not exact" case, go by the tuples...
-        # ...and try 2 buckets... ( more than 8k away is bunk )
         if not exact:
-            bucketva = va & self.bucketmask
-            b1 = [b for b in self.buckets[bucketva] if b[0] <= va]
-            if not b1:
-                b1 = self.buckets[bucketva - self.bucketsize]
-
-            if b1:
-                b1.sort()
-                symtup = b1[-1]
+            symtup = self._getNearSymTup(va)
+            if symtup is not None:
                 sym = self.symobjsbyaddr.get(symtup[0])
                 if sym is not None:
                     return sym
 
                 return self._symFromTup(symtup)
 
+    def _getSymAddrIndex(self):
+        if self._symaddr_index is None:
+            addrs = sorted(self.symaddrs)
+            maxends = []
+
+            maxend = 0
+            symaddrs = self.symaddrs
+            for addr in addrs:
+                maxend = max(maxend, addr + (symaddrs[addr][1] or 0))
+                maxends.append(maxend)
+
+            self._symaddr_index = (addrs, maxends)
+
+        return self._symaddr_index
+
+    def _getNearSymTups(self, va):
+        # Return the symbol tuples nearest below va and nearest below va
+        # which contains it (from our dicts)
+        addrs, maxends = self._getSymAddrIndex()
+
+        idx = bisect.bisect_right(addrs, va) - 1
+        if idx < 0:
+            return None, None
+
+        symaddrs = self.symaddrs
+        near = symaddrs[addrs[idx]]
+
+        # Walk back through any symbols which may still contain va
+        while idx >= 0 and maxends[idx] > va:
+            symtup = symaddrs[addrs[idx]]
+            if va < symtup[0] + (symtup[1] or 0):
+                return near, symtup
+            idx -= 1
+
+        return near, None
+
+    def _getNearSymTup(self, va):
+        # Return the symbol tuple nearest below va, preferring one which
+        # contains va (any distance within its size) over one which is
+        # merely close ( more than SYMSTOR_NEAR_MAX away is bunk )
+        near, encl = self._getNearSymTups(va)
+
+        for sfile, baseaddr, symfname in self._sym_addrfiles:
+            # Nothing in the file can contain (or be near enough to) va
+            rva = va - baseaddr
+            if rva < sfile.minrva or rva >= max(sfile.maxend, sfile.maxrva + SYMSTOR_NEAR_MAX):
+                continue
+
+            for symtup in sfile.getNearSymTups(rva):
+                if symtup is None:
+                    continue
+
+                symaddr, symsize, symname, symtype = symtup
+                symtup = (symaddr + baseaddr, symsize, symname, symtype, symfname)
+                if near is None or symtup[0] > near[0]:
+                    near = symtup
+
+                if va < symtup[0] + symsize and (encl is None or symtup[0] > encl[0]):
+                    encl = symtup
+
+        if near is None:
+            return None
+
+        nearsize = near[1] or 0
+        nearby = va - near[0] < SYMSTOR_NEAR_MAX
+        if va < near[0] + nearsize or (nearby and not nearsize):
+            return near
+
+        if encl is not None:
+            return encl
+
+        if nearby:
+            return near
+
     def getSymList(self):
         """
         Return a list of the symbols which are contained in this resolver.
         """
         names = list(self.symnames.keys())
+
+        seen = set(names)
+        for sfile, baseaddr, symfname in self._sym_namefiles:
+            for symtup in sfile:
+                symname = symtup[2]
+                if not self.casesens:
+                    symname = symname.lower()
+
+                if symname not in seen:
+                    seen.add(symname)
+                    names.append(symname)
+
         return [self.getSymByName(name) for name in names]
 
     def getSymHint(self, va, hidx):
@@ -259,12 +381,7 @@ class SymbolResolver:
 
         # Ugly list comprehensions for speed...
         [self.symaddrs.__setitem__(n[0], n) for n in symtups]
-
-        for symtup in symtups:
-            # do the size range...
-            self.buckets[symtup[0] & self.bucketmask].append(symtup)
-            if symtup[1]:
-                [self.buckets[b].append(symtup) for b in range(symtup[0], symtup[0] + symtup[1], self.bucketsize)]
+        self._symaddr_index = None
 
     def _nomSymTupNames(self, symtups):
         if not self.casesens:
@@ -276,7 +393,13 @@ class SymbolResolver:
         """
         Import a list of symbol tuples (see getCacheSyms()) at the
         given base address ( and for the given sub-file )
+
+        A SymbolFile (see SymbolCache.getCacheFile()) is queried in place
+        rather than unpacked.
         """
+        if isinstance(symcache, e_symfile.SymbolFile):
+            return self._impSymFile(symcache, symfname=symfname, baseaddr=baseaddr)
+
         # Recieve a "cache" list and make it into our kind of tuples.
         symtups = [(symaddr + baseaddr, symsize, symname, symtype, symfname) for (symaddr, symsize, symname, symtype) in
                    symcache]
@@ -295,6 +418,19 @@ class SymbolResolver:
 
         self._nomSymTupNames(symtups)
 
+    def _impSymFile(self, sfile, symfname=None, baseaddr=0):
+        fileinfo = (sfile, baseaddr, symfname)
+        self._sym_addrfiles += (fileinfo,)
+
+        if symfname:
+            subres = self.symobjsbyname.get(symfname)
+            if isinstance(subres, SymbolResolver):
+                subres._sym_addrfiles += (fileinfo,)
+                subres._sym_namefiles += (fileinfo,)
+                return
+
+        self._sym_namefiles += (fileinfo,)
+
 
 class FileSymbol(Symbol, SymbolResolver):
     """
@@ -3,6 +3,7 @@ import json
 
 import cobra
 import envi.config as e_config
+import envi.symstore.symfile as e_symfile
 
 
 def symCacheHashFromPe(pe):
@@ -25,6 +26,10 @@ class SymbolCache:
     Also, this object's API *must* be compatible with cobra
     shared object API to allow "symbol servers" to be cobra
     shared instances of SymbolCache objects.
+
+    Symbols are stored in the binary symbol file format (see
+    envi.symstore.symfile).  Caches saved as JSON by older versions are
+    converted the first time they are loaded.
     """
 
     def __init__(self, dirname=None):
@@ -37,6 +42,21 @@ class SymbolCache:
 
         self._sym_cachedir = os.path.abspath(dirname)
 
+    def _getCachePath(self, vhash):
+        cachefile = os.path.join(self._sym_cachedir, vhash)
+
+        abspath = os.path.abspath(cachefile)
+        if not abspath.startswith(self._sym_cachedir):
+            raise Exception('Invalid Symbol Cache Hash: %s' % vhash)
+
+        return cachefile
+
+    def _writeCacheFile(self, cachefile, symcache):
+        # Write it next to the real one so readers never see half a file
+        tmpfile = '%s.tmp' % cachefile
+        e_symfile.writeSymbolFile(tmpfile, symcache)
+        os.replace(tmpfile, cachefile)
+
     def setCacheSyms(self, vhash, symcache):
         """
         Save a set of symbol cache tuples to the symbol cache.
@@ -46,15 +66,8 @@ class SymbolCache:
             cache = SymbolCache()
             cache.setCacheSyms( vhash, tups )
         """
-        cachefile = os.path.join(self._sym_cachedir, vhash)
-
-        abspath = os.path.abspath(cachefile)
-        if not abspath.startswith(self._sym_cachedir):
-            raise Exception('Invalid Symbol Cache Hash: %s' % vhash)
-
-        # FIXME check input path
-        fd = open(cachefile, 'wb')
-        return json.dump(symcache, fd)
+        cachefile = self._getCachePath(vhash)
+        self._writeCacheFile(cachefile, symcache)
 
     def getCacheSyms(self, vhash):
         """
@@ -66,20 +79,40 @@ class SymbolCache:
             for rva, size, name, stype in cache.getCacheSyms():
                 dostuff()
         """
-        cachefile = os.path.join(self._sym_cachedir, vhash)
+        sfile = self.getCacheFile(vhash)
+        if sfile is None:
+            return None
 
-        abspath = os.path.abspath(cachefile)
-        if not abspath.startswith(self._sym_cachedir):
-            raise Exception('Invalid Symbol Cache Hash: %s' % vhash)
+        try:
+            return sfile.getCacheSyms()
+        finally:
+            sfile.close()
 
+    def getCacheFile(self, vhash):
+        """
+        Retrieve a SymbolFile (which may be passed to impSymCache() and is
+        queried in place) or None if the symbol cache doesn't have the given
+        file hash.  JSON caches are converted to the binary format.
+
+        Example:
+            cache = SymbolCache()
+            sfile = cache.getCacheFile(vhash)
+            if sfile is not None:
+                trace.impSymCache(sfile, symfname=normname, baseaddr=baseaddr)
+        """
+        cachefile = self._getCachePath(vhash)
         if not os.path.isfile(cachefile):
             return None
 
         try:
 
             print(('Loading Cache File: %s' % cachefile))
-            fd = open(cachefile, 'rb')
-            return json.load(fd)
+            if not e_symfile.isSymbolFile(cachefile):
+                with open(cachefile, 'rb') as fd:
+                    symcache = json.load(fd)
+                self._writeCacheFile(cachefile, symcache)
+
+            return e_symfile.SymbolFile(cachefile)
 
         except Exception as e:
             return None
@@ -109,6 +142,20 @@ class SymbolCachePath:
             if ret != None:
                 return ret
 
+    def getCacheFile(self, symhash):
+        """
+        Like getCacheSyms() but returns a SymbolFile from local caches (a
+        list of tuples still comes back from cobra symbol servers).
+        """
+        for symcache in self.symcaches:
+            if isinstance(symcache, SymbolCache):
+                ret = symcache.getCacheFile(symhash)
+            else:
+                ret = symcache.getCacheSyms(symhash)
+
+            if ret != None:
+                return ret
+
     def setCacheSyms(self, symhash, symcache):
         if self.symcaches:
             self.symcaches[0].setCacheSyms(symhash, symcache)
@@ -0,0 +1,224 @@
+"""
+A compact binary (mmap-able) format for symbol cache tuples.
+
+The file is a header followed by three tables:
+
+    [ header ]      magic, symbol count, name hash slot count
+    [ addresses ]   (rva, size, maxend, nameoff, namelen, symtype) records
+                    sorted by rva (maxend is the highest rva + size so far)
+    [ name hash ]   open addressed table of record index + 1 ( 0 is empty )
+                    hashed on the lower case name
+    [ strings ]     utf-8 symbol names
+
+so a SymbolFile can answer address and name queries directly from the
+mapped file without building a tuple for every symbol in it.
+"""
+import mmap
+import zlib
+import struct
+
+SYMFILE_MAGIC = b'VSYMC\x00\x01\x00'
+SYMFILE_HEADER = '<8sQQ'
+SYMFILE_RECORD = '<QQQIHH'
+SYMFILE_SLOT = '<I'
+
+symfile_hdrsize = struct.calcsize(SYMFILE_HEADER)
+symfile_recsize = struct.calcsize(SYMFILE_RECORD)
+symfile_slotsize = struct.calcsize(SYMFILE_SLOT)
+
+
+def _nameHash(name):
+    return zlib.crc32(name.lower().encode('utf-8', 'surrogatepass'))
+
+
+def isSymbolFile(filename):
+    """
+    Returns True if the given file is in the binary symbol file format.
+    """
+    with open(filename, 'rb') as fd:
+        return fd.read(len(SYMFILE_MAGIC)) == SYMFILE_MAGIC
+
+
+def writeSymbolFile(filename, symcache):
+    """
+    Write a list of symbol cache tuples ( rva, size, name, symtype ) to
+    the given file in the binary symbol file format.
+
+    Example:
+        tups = [ ( rva, size, 'wootfunc', SYMSTOR_SYM_FUNCTION), ]
+        writeSymbolFile('foo.symc', tups)
+    """
+    # Only one symbol per address (the last) like the resolver
+    byaddr = {}
+    for rva, size, name, symtype in symcache:
+        byaddr[rva] = (rva, size or 0, name, symtype)
+
+    symtups = [byaddr[rva] for rva in sorted(byaddr)]
+    count = len(symtups)
+
+    nslots = 1
+    while nslots < count * 2:
+        nslots <<= 1
+
+    records = []
+    slots = [0] * nslots
+    strings = []
+
+    maxend = 0
+    nameoff = 0
+    for idx, (rva, size, name, symtype) in enumerate(symtups):
+        nbytes = name.encode('utf-8', 'surrogatepass')
+        maxend = max(maxend, rva + size)
+        records.append(struct.pack(SYMFILE_RECORD, rva, size, maxend, nameoff, len(nbytes), symtype))
+        strings.append(nbytes)
+        nameoff += len(nbytes)
+
+        slot = _nameHash(name) & (nslots - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (nslots - 1)
+        slots[slot] = idx + 1
+
+    with open(filename, 'wb') as fd:
+        fd.write(struct.pack(SYMFILE_HEADER, SYMFILE_MAGIC, count, nslots))
+        fd.write(b''.join(records))
+        fd.write(struct.pack('<%dI' % nslots, *slots))
+        fd.write(b''.join(strings))
+
+
+class SymbolFile:
+    """
+    Read only access to a binary symbol file.  Symbol tuples are only
+    built for the symbols asked for, but iterating a SymbolFile yields all
+    of its ( rva, size, name, symtype ) tuples so it may be used anywhere
+    a list of symbol cache tuples is.
+
+    Example:
+        sfile = SymbolFile('foo.symc')
+        symtup = sfile.getSymTupByName('CreateFileW')
+        near, encl = sfile.getNearSymTups(0x1234)
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as fd:
+            self._sf_map = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._sf_count, self._sf_nslots = struct.unpack_from(SYMFILE_HEADER, self._sf_map, 0)
+        if magic != SYMFILE_MAGIC:
+            self._sf_map.close()
+            raise Exception('Invalid Symbol File: %s' % filename)
+
+        self._sf_hashoff = symfile_hdrsize + (self._sf_count * symfile_recsize)
+        self._sf_stroff = self._sf_hashoff + (self._sf_nslots * symfile_slotsize)
+
+        # The range of rvas covered by the symbols (for callers to skip us)
+        self.minrva = 0
+        self.maxrva = -1
+        self.maxend = 0
+        if self._sf_count:
+            self.minrva = self._getRva(0)
+            self.maxrva, size, self.maxend = self._getRecord(self._sf_count - 1)[:3]
+
+    def close(self):
+        self._sf_map.close()
+
+    def __len__(self):
+        return self._sf_count
+
+    def __iter__(self):
+        for idx in range(self._sf_count):
+            yield self.getSymTup(idx)
+
+    def _getRecord(self, idx):
+        return struct.unpack_from(SYMFILE_RECORD, self._sf_map, symfile_hdrsize + (idx * symfile_recsize))
+
+    def _getRva(self, idx):
+        return struct.unpack_from('<Q', self._sf_map, symfile_hdrsize + (idx * symfile_recsize))[0]
+
+    def _getName(self, nameoff, namelen):
+        off = self._sf_stroff + nameoff
+        return self._sf_map[off:off + namelen].decode('utf-8', 'surrogatepass')
+
+    def getSymTup(self, idx):
+        """
+        Return the ( rva, size, name, symtype ) tuple for the symbol at the
+        given index (in address order).
+        """
+        rva, size, maxend, nameoff, namelen, symtype = self._getRecord(idx)
+        return (rva, size, self._getName(nameoff, namelen), symtype)
+
+    def getCacheSyms(self):
+        """
+        Return a list of all the symbol cache tuples in the file.
+        """
+        return list(self)
+
+    def getSymTupByName(self, name, casesens=True):
+        """
+        Return the symbol cache tuple for the given name (or None).
+        """
+        if not self._sf_count:
+            return None
+
+        if not casesens:
+            name = name.lower()
+
+        mask = self._sf_nslots - 1
+        slot = _nameHash(name) & mask
+        while True:
+            idx = struct.unpack_from(SYMFILE_SLOT, self._sf_map, self._sf_hashoff + (slot * symfile_slotsize))[0]
+            if not idx:
+                return None
+
+            symtup = self.getSymTup(idx - 1)
+            symname = symtup[2]
+            if not casesens:
+                symname = symname.lower()
+
+            if symname == name:
+                return symtup
+
+            slot = (slot + 1) & mask
+
+    def getSymTupByAddr(self, rva):
+        """
+        Return the symbol cache tuple at the given rva (or None).
+        """
+        idx = self._bisectRva(rva)
+        if idx < 0 or self._getRva(idx) != rva:
+            return None
+        return self.getSymTup(idx)
+
+    def _bisectRva(self, rva):
+        # Index of the last symbol at or below rva (or -1)
+        lo = 0
+        hi = self._sf_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if rva < self._getRva(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo - 1
+
+    def getNearSymTups(self, rva):
+        """
+        Return a ( near, encl ) tuple of the symbol nearest below rva and the
+        nearest below rva which contains it (either may be None).
+        """
+        idx = self._bisectRva(rva)
+        if idx < 0:
+            return None, None
+
+        near = self.getSymTup(idx)
+        while idx >= 0:
+            symrva, size, maxend, nameoff, namelen, symtype = self._getRecord(idx)
+            if maxend <= rva:
+                break
+
+            if rva < symrva + size:
+                return near, (symrva, size, self._getName(nameoff, namelen), symtype)
+
+            idx -= 1
+
+        return near, None
@@ -1,4 +1,5 @@
 import envi
+import random
 import platform
 import unittest
 
@@ -21,3 +22,30 @@ def skip(*skips):
 
     return skipfunc
 
+
+def getOpcodeInfo(dmeth, bytez, offset, va):
+    '''
+    Decode an opcode and return a comparable tuple of everything about it
+    (or about the exception decoding raised).
+    '''
+    try:
+        op = dmeth(bytez, offset, va)
+    except Exception as e:
+        return ('exception', type(e).__name__, str(e))
+
+    opers = [(type(oper).__name__, sorted((k, v) for k, v in vars(oper).items() if k != '_dis_regctx'))
+             for oper in op.opers]
+    return (type(op).__name__, op.va, op.opcode, op.mnem, op.prefixes, op.size, op.iflags, opers)
+
+def checkFastDecode(testcase, dis, prefixes, count=2000, seed=0x56495600):
+    '''
+    Check that the precompiled decoder in dis makes identical opcodes to
+    the opcode table walker over random bytes (with random prefixes).
+    '''
+    rnd = random.Random(seed)
+    for i in range(count):
+        bytez = bytes(rnd.choice(prefixes) for j in range(rnd.randrange(4)))
+        bytez += bytes(rnd.randrange(256) for j in range(15))
+        tinfo = getOpcodeInfo(dis.disasm_tables, bytez, 0, 0x41414141)
+        finfo = getOpcodeInfo(dis.disasm, bytez, 0, 0x41414141)
+        testcase.assertEqual(tinfo, finfo, msg=bytez.hex())
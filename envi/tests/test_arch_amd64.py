@@ -1,6 +1,7 @@
 import unittest
 
 import envi
+import envi.tests as e_tests
 import envi.memcanvas as e_memcanvas
 import varchs.amd64 as e_amd64
 import vivisect
@@ -70,6 +71,17 @@ amd64MultiByteOpcodes = [
 class Amd64InstructionSet(unittest.TestCase):
     _arch = envi.getArchModule("amd64")
 
+    def test_envi_amd64_disasm_FastDecode(self):
+        '''
+        the precompiled decoder must match the opcode table walker
+        '''
+        prefixes = [0x66, 0x67, 0xf0, 0xf2, 0xf3, 0x0f, 0x0f, 0x38, 0x3a, 0xc4, 0xc5, 0x41, 0x48, 0x4c]
+        e_tests.checkFastDecode(self, self._arch._arch_dis, prefixes)
+
+        for bytez, va, reprOp in instrs:
+            op = self._arch.archParseOpcode(bytes.fromhex(bytez), 0, va)
+            self.assertEqual(repr(op).replace(' ', ''), reprOp.replace(' ', ''))
+
     def test_envi_amd64_disasm_Specific_SingleByte_Instrs(self):
         '''
         pick 10 arbitrary 1-byte-operands
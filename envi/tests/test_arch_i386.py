@@ -1,6 +1,7 @@
 import unittest
 
 import envi
+import envi.tests as e_tests
 import envi.memcanvas as e_memcanvas
 import envi.memory as e_mem
 import vivisect
@@ -120,6 +121,64 @@ class i386InstructionSet(unittest.TestCase):
         pass
     '''
 
+    def test_envi_i386_disasm_FastDecode(self):
+        '''
+        the precompiled decoder must match the opcode table walker
+        '''
+        dis = self._arch._arch_dis
+        prefixes = [0x66, 0x67, 0xf0, 0xf2, 0xf3, 0x2e, 0x0f, 0x0f, 0x38, 0x3a]
+        e_tests.checkFastDecode(self, dis, prefixes)
+
+        bytez = bytes.fromhex('f30f2caaaaaaaa41')
+        dis.setFastDecode(False)
+        try:
+            self.assertEqual(repr(dis.disasm(bytez, 0, 0x40)), 'rep: cvttps2pi qword [edx + 1101703850],oword [edx + 1101703850]')
+        finally:
+            dis.setFastDecode(True)
+        self.assertEqual(repr(dis.disasm(bytez, 0, 0x40)), 'rep: cvttps2pi qword [edx + 1101703850],oword [edx + 1101703850]')
+
+    def test_envi_i386_disasm_Batch(self):
+        '''
+        linear sweep into columnar results
+        '''
+        # push ebp; mov ebp,esp; call +0; jz +2; mov eax,0x41414141; ret; (invalid)
+        bytez = bytes.fromhex('5589e5e8000000007402b841414141c3') + b'\x0f\x0b\xff\xff'
+        va = 0x41410000
+
+        batch = self._arch.archParseOpcodes(bytez, va=va)
+        ops = []
+        offset = 0
+        for i in range(6):
+            op = self._arch.archParseOpcode(bytez, offset, va + offset)
+            ops.append(op)
+            offset += op.size
+
+        self.assertEqual(len(batch), 6)
+        self.assertEqual(list(batch.vas), [op.va for op in ops])
+        self.assertEqual(list(batch.sizes), [op.size for op in ops])
+        self.assertEqual(list(batch.iflags), [op.iflags for op in ops])
+        self.assertEqual([batch.getMnemonic(i) for i in range(6)], [op.mnem for op in ops])
+        self.assertEqual(len(batch.mnems), 5)
+        self.assertEqual(batch.endoff, offset)
+
+        for i, op in enumerate(ops):
+            self.assertEqual(batch.getBranches(i), list(op.getBranches()))
+            self.assertEqual(repr(batch.getOpcode(i)), repr(op))
+        self.assertEqual([repr(op) for op in batch.iterOpcodes()], [repr(op) for op in ops])
+
+        self.assertRaises(Exception, batch.getOperValues, 0)
+        batch = self._arch.archParseOpcodes(bytez, va=va, opervals=True)
+        self.assertEqual(batch.getOperValues(4), [(0x41414141, True)])
+
+        batch = self._arch.archParseOpcodes(bytez, offset=1, va=va + 1, size=7, maxcount=10)
+        self.assertEqual(list(batch.vas), [va + 1, va + 3])
+
+        batch = self._arch.archParseOpcodes(bytez, va=va, maxcount=2)
+        self.assertEqual(len(batch), 2)
+
+        batch = self._arch.archParseOpcodes(b'\x55\xff\xff\x90\x90', skipinvalid=True)
+        self.assertEqual(list(batch.vas), [0, 3, 4])
+
     def checkOpcode(self, hexbytez, va, oprepr, opcheck, opercheck, renderOp):
 
         op = self._arch.archParseOpcode(hexbytez.decode('hex'), 0, va)
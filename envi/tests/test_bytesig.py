@@ -0,0 +1,69 @@
+import random
+import unittest
+
+import envi.bytesig as e_bsig
+
+
+def getTestSigs(rnd, count=200, maxlen=10):
+    '''
+    Random (bytes, masks, val) signatures (some fully masked) over a
+    small alphabet so they actually match things.
+    '''
+    sigs = []
+    for i in range(count):
+        slen = rnd.randrange(1, maxlen)
+        masks = bytes(rnd.choice([0xff, 0xff, 0xff, 0x01, 0x00]) for j in range(slen))
+        sbytes = bytes(rnd.randrange(4) & m for m in masks)
+        sigs.append((sbytes, masks, i))
+    return sigs
+
+
+def bruteScan(sigs, bytez, offset, size):
+    hits = []
+    for soff in range(offset, min(len(bytez), offset + size)):
+        for sbytes, masks, val in sigs:
+            if soff + len(sbytes) > len(bytez):
+                continue
+            if all(bytez[soff + i] & masks[i] == sbytes[i] for i in range(len(sbytes))):
+                hits.append((soff, val))
+    return sorted(hits)
+
+
+class BytesigTest(unittest.TestCase):
+
+    def test_bytesig_tree(self):
+        tree = e_bsig.SignatureTree()
+        tree.addSignature(b'\x55\x89\xe5', val='push/mov')
+        tree.addSignature(b'\x55\x8b\xec', val='push/mov2')
+        tree.addSignature(b'\x68\x00\x00\x00\x00\x64', masks=b'\xff\x00\x00\x00\x00\xff', val='seh')
+
+        bytez = b'\x90\x55\x89\xe5\x90\x68\x41\x42\x43\x44\x64\x55\x8b\xec'
+        self.assertEqual(tree.getSignature(bytez, 1), 'push/mov')
+        self.assertEqual(tree.getSignature(bytez, 5), 'seh')
+        self.assertEqual(tree.getSignature(bytez, 11), 'push/mov2')
+        self.assertIsNone(tree.getSignature(bytez, 0))
+
+        self.assertEqual(tree.scan(bytez), [(1, 'push/mov'), (5, 'seh'), (11, 'push/mov2')])
+        self.assertEqual(tree.scan(bytez, offset=2, size=9), [(5, 'seh')])
+
+        # Adding a signature recompiles the automaton
+        tree.addSignature(b'\x90\x68', val='nop/push')
+        self.assertEqual(tree.scan(bytez, size=5), [(1, 'push/mov'), (4, 'nop/push')])
+
+    def test_bytesig_automaton(self):
+        rnd = random.Random(0x5167)
+        bytez = bytes(rnd.randrange(4) for i in range(2000))
+        sigs = getTestSigs(rnd)
+
+        auto = e_bsig.SignatureAutomaton(sigs)
+        self.assertEqual(len(auto), len(sigs))
+        self.assertGreater(len(auto.unanchored), 0)
+
+        for offset, size in ((0, 2000), (100, 300), (1990, 100), (2000, 10)):
+            self.assertEqual(auto.scan(bytez, offset=offset, size=size), bruteScan(sigs, bytez, offset, size))
+
+        auto2 = e_bsig.loads(auto.dumps())
+        self.assertEqual(list(auto2.trans), list(auto.trans))
+        self.assertEqual(auto2.scan(bytez, 100, 300), auto.scan(bytez, 100, 300))
+
+        self.assertEqual(e_bsig.SignatureAutomaton().scan(bytez), [])
@@ -0,0 +1,86 @@
+import sys
+import struct
+import unittest
+
+import envi
+import envi.const
+import envi.memory as e_mem
+import envi.codeflow as e_codeflow
+
+
+class CodeFlowMem(e_mem.MemoryObject):
+
+    psize = 4
+
+    def __init__(self):
+        e_mem.MemoryObject.__init__(self, arch=envi.ARCH_I386)
+        self.funcs = set()
+
+    def isFunction(self, va):
+        return va in self.funcs
+
+    def parseOpcode(self, va, arch=envi.ARCH_DEFAULT):
+        b = self.readMemory(va, 16)
+        return self.imem_archs[arch >> 16].archParseOpcode(b, 0, va)
+
+
+class LoggingCodeFlow(e_codeflow.CodeFlowContext):
+
+    def __init__(self, mem, **kwargs):
+        e_codeflow.CodeFlowContext.__init__(self, mem, **kwargs)
+        self.log = []
+
+    def _cb_opcode(self, va, op, branches):
+        self.log.append(('op', va))
+        return branches
+
+    def _cb_function(self, fva, fmeta):
+        self._mem.funcs.add(fva)
+        self.log.append(('func', fva, fmeta['CallsFrom']))
+
+
+class CodeFlowTest(unittest.TestCase):
+
+    def test_codeflow_callback_order(self):
+        # 0x1000: call 0x1010; call 0x1000 (recursive); ret
+        # 0x1010: call 0x1020; ret
+        # 0x1020: ret
+        code = bytearray(b'\xc3' * 0x30)
+        code[0x00:0x05] = b'\xe8' + struct.pack('<i', 0x1010 - 0x1005)
+        code[0x05:0x0a] = b'\xe8' + struct.pack('<i', 0x1000 - 0x100a)
+        code[0x10:0x15] = b'\xe8' + struct.pack('<i', 0x1020 - 0x1015)
+
+        mem = CodeFlowMem()
+        mem.addMemoryMap(0x1000, envi.const.MM_RWX, 'code', bytes(code))
+
+        cf = LoggingCodeFlow(mem)
+        cf.addEntryPoint(0x1000)
+
+        # Deepest functions complete (and are called back) first
+        funcs = [x[1] for x in cf.log if x[0] == 'func']
+        self.assertEqual(funcs, [0x1020, 0x1010, 0x1000])
+        self.assertEqual(sorted(cf.getCallsFrom(0x1000)), [0x1000, 0x1010])
+        self.assertEqual(cf.log[:3], [('op', 0x1000), ('op', 0x1005), ('op', 0x100a)])
+        self.assertEqual(cf._cf_blocks, [])
+        self.assertEqual(cf._cf_blockrefs, {})
+
+    def test_codeflow_deep_calls(self):
+        # A call chain much deeper than the recursion limit
+        depth = 400
+        code = (b'\xe8\x01\x00\x00\x00\xc3' * depth) + b'\xc3'
+
+        mem = CodeFlowMem()
+        mem.addMemoryMap(0x1000, envi.const.MM_RWX, 'code', code)
+
+        cf = LoggingCodeFlow(mem)
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(200)
+        try:
+            cf.addEntryPoint(0x1000)
+        finally:
+            sys.setrecursionlimit(limit)
+
+        funcs = [x[1] for x in cf.log if x[0] == 'func']
+        self.assertEqual(len(funcs), depth + 1)
+        self.assertEqual(funcs[0], 0x1000 + (6 * depth))
+        self.assertEqual(funcs[-1], 0x1000)
@@ -1,5 +1,10 @@
+import os
+import pickle
+import hashlib
+import tempfile
 import unittest
 
+import envi
 import envi.const
 import envi.memory as e_mem
 
@@ -19,3 +24,110 @@ class EnviMemoryTest(unittest.TestCase):
         self.assertEqual(mem.readMemory(0x41410040, 3), 'BBB')
         # Test a cross page read
         self.assertEqual(mem.readMemory(0x41410000 + (cache.pagesize - 2), 4), 'BBBB')
+
+    def test_envi_memory_map_index(self):
+        mem = e_mem.MemoryObject()
+        mem.addMemoryMap(0x2000, envi.const.MM_RWX, 'two', b'B' * 0x1000)
+        mem.addMemoryMap(0x1000, envi.const.MM_READ, 'one', b'A' * 0x1000)
+        mem.addMemoryMap(0x8000, envi.const.MM_RWX, 'three', b'C' * 0x100)
+
+        # getMemoryMaps() keeps insertion order
+        self.assertEqual([m[3] for m in mem.getMemoryMaps()], ['two', 'one', 'three'])
+
+        self.assertEqual(mem.getMemoryMap(0x1fff)[3], 'one')
+        self.assertEqual(mem.getMemoryMap(0x2000)[3], 'two')
+        self.assertIsNone(mem.getMemoryMap(0x3000))
+        self.assertIsNone(mem.getMemoryMap(0xfff))
+        self.assertFalse(mem.isValidPointer(None))
+        self.assertFalse(mem.isValidPointer(0x8100))
+
+        self.assertEqual(mem.readMemory(0x1ffe, 2), b'AA')
+        self.assertEqual(mem.getByteDef(0x2010)[0], 0x10)
+        self.assertRaises(envi.SegmentationViolation, mem.writeMemory, 0x1000, b'X')
+
+        snap = mem.getMemorySnap()
+        mem.writeMemory(0x2010, b'VISI')
+        self.assertEqual(mem.readMemory(0x2010, 4), b'VISI')
+        mem.setMemorySnap(snap)
+        self.assertEqual(mem.readMemory(0x2010, 4), b'BBBB')
+
+        mem.delMemoryMap(0x2010)
+        self.assertIsNone(mem.getMemoryMap(0x2010))
+        self.assertEqual(mem.readMemory(0x8000, 1), b'C')
+        self.assertRaises(envi.SegmentationViolation, mem.readMemory, 0x2000, 1)
+
+    def test_envi_memory_map_overlap(self):
+        mem = e_mem.MemoryObject()
+        mem.addMemoryMap(0x1000, envi.const.MM_RWX, 'big', b'A' * 0x1000)
+        mem.addMemoryMap(0x1100, envi.const.MM_RWX, 'small', b'B' * 0x10)
+        self.assertEqual(mem.getMemoryMap(0x1200)[3], 'big')
+        self.assertEqual(mem.getMemoryMap(0x1108)[3], 'big')
+
+    def test_envi_memory_paged_cow(self):
+        base = b'A' * 0x2800
+        mem = e_mem.PagedMemoryObject()
+        mem.addMemoryMap(0x41410000, envi.const.MM_RWX, 'heap', base)
+        mem.addMemoryMap(0x41412800, envi.const.MM_RWX, 'next', b'B' * 0x100)
+
+        snap = mem.getMemorySnap()
+
+        # cross page write
+        mem.writeMemory(0x41410ffe, b'VISI')
+        self.assertEqual(mem.readMemory(0x41410ffc, 8), b'AAVISIAA')
+        self.assertEqual(len(mem.getDirtyPages()), 2)
+        # the base bytes are never modified
+        self.assertEqual(base, b'A' * 0x2800)
+
+        offset, bytez = mem.getByteDef(0x41410ffe)
+        self.assertEqual(bytez[offset:offset + 4], b'VISI')
+
+        snap2 = mem.getMemorySnap()
+        mem.writeMemory(0x41410fff, b'X')
+        self.assertEqual(mem.readMemory(0x41410ffe, 4), b'VXSI')
+
+        mem.setMemorySnap(snap2)
+        self.assertEqual(mem.readMemory(0x41410ffe, 4), b'VISI')
+
+        mem.setMemorySnap(snap)
+        self.assertEqual(mem.readMemory(0x41410ffe, 4), b'AAAA')
+        self.assertEqual(mem.getDirtyPages(), [])
+
+        # writes off the end of one map continue into the next
+        mem.writeMemory(0x414127fe, b'DDDD')
+        self.assertEqual(mem.readMemory(0x414127fc, 4), b'AADD')
+        self.assertEqual(mem.readMemory(0x41412800, 3), b'DDB')
+        self.assertRaises(envi.SegmentationViolation, mem.writeMemory, 0x41412900, b'X')
+
+    def test_envi_memory_filebytes(self):
+        fbytes = bytes(range(256)) * 64
+        fd, fpath = tempfile.mkstemp()
+        os.write(fd, fbytes)
+        os.close(fd)
+        self.addCleanup(os.unlink, fpath)
+        md5 = hashlib.md5(fbytes).hexdigest()
+
+        fb = e_mem.FileBytes(fpath, 0x1234, 0x100, padsize=0x10, md5sum=md5)
+        expect = fbytes[0x1234:0x1334] + b'\x00' * 0x10
+        self.assertEqual(len(fb), len(expect))
+        self.assertEqual(bytes(fb), expect)
+        self.assertEqual(fb[0], expect[0])
+        self.assertEqual(fb[-1], 0)
+        self.assertEqual(fb[0xfe:0x104], expect[0xfe:0x104])
+        self.assertEqual(fb.find(b'\xff\x00'), expect.find(b'\xff\x00'))
+        self.assertEqual(fb.find(b'\x33\x00'), expect.find(b'\x33\x00'))
+        self.assertEqual(fb.find(b'\x00\x00', 8), expect.find(b'\x00\x00', 8))
+        self.assertRaises(IndexError, fb.__getitem__, 0x110)
+
+        # pickles as a reference to the file rather than its bytes
+        pbytes = pickle.dumps(fb)
+        self.assertLess(len(pbytes), 0x100)
+        self.assertEqual(pickle.loads(pbytes), expect)
+
+        mem = e_mem.MemoryObject()
+        mem.addMemoryMap(0x41410000, envi.const.MM_RWX, 'file', fb)
+        self.assertEqual(mem.readMemory(0x414100fe, 4), expect[0xfe:0x102])
+        mem.writeMemory(0x41410000, b'VISI')
+        self.assertEqual(mem.readMemory(0x41410000, 6), b'VISI' + expect[4:6])
+
+        badfb = e_mem.FileBytes(fpath, 0, 0x10, md5sum='00' * 16)
+        self.assertRaises(Exception, badfb.__getitem__, 0)
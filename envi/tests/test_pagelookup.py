@@ -0,0 +1,89 @@
+import unittest
+
+import envi.pagelookup as e_page
+
+
+class IntervalLookupTest(unittest.TestCase):
+
+    def test_interval_lookup_basic(self):
+        ilook = e_page.IntervalLookup()
+        ilook.initMapLookup(0x1000, 0x1000)
+
+        self.assertIsNone(ilook.getMapLookup(0x1000))
+        self.assertIsNone(ilook.getMapLookup(None))
+        self.assertIsNone(ilook.getMapLookup(0x5000))
+
+        ilook.setMapLookup(0x1010, 4, 'woot')
+        self.assertIsNone(ilook.getMapLookup(0x100f))
+        self.assertEqual(ilook.getMapLookup(0x1010), 'woot')
+        self.assertEqual(ilook.getMapLookup(0x1013), 'woot')
+        self.assertIsNone(ilook.getMapLookup(0x1014))
+
+        ilook.setMapLookup(0x1010, 4, None)
+        self.assertIsNone(ilook.getMapLookup(0x1010))
+        self.assertEqual(list(ilook.getMapLookups()), [])
+
+        self.assertRaises(Exception, ilook.setMapLookup, 0x3000, 4, 'nope')
+
+    def test_interval_lookup_overlap(self):
+        ilook = e_page.IntervalLookup()
+        ilook.initMapLookup(0x1000, 0x100)
+
+        ilook.setMapLookup(0x1000, 0x10, 'a')
+        ilook.setMapLookup(0x1004, 4, 'b')
+        self.assertEqual(ilook.getMapLookup(0x1003), 'a')
+        self.assertEqual(ilook.getMapLookup(0x1004), 'b')
+        self.assertEqual(ilook.getMapLookup(0x1008), 'a')
+        self.assertEqual(ilook.getMapLookup(0x100f), 'a')
+
+        ilook.setMapLookup(0x1002, 0x20, 'c')
+        self.assertEqual(ilook.getMapLookup(0x1001), 'a')
+        self.assertEqual(ilook.getMapLookup(0x1002), 'c')
+        self.assertEqual(ilook.getMapLookup(0x1021), 'c')
+        self.assertIsNone(ilook.getMapLookup(0x1022))
+
+        # Sets are clamped to the end of the memory map
+        ilook.setMapLookup(0x10f0, 0x20, 'd')
+        self.assertEqual(ilook.getMapLookup(0x10ff), 'd')
+        self.assertIsNone(ilook.getMapLookup(0x1100))
+
+        self.assertEqual(ilook.getMapLookupPrev(0x10f0), 'c')
+        self.assertIsNone(ilook.getMapLookupPrev(0x1000))
+
+    def test_interval_lookup_matches_maplookup(self):
+        mlook = e_page.MapLookup()
+        ilook = e_page.IntervalLookup()
+        for look in (mlook, ilook):
+            look.initMapLookup(0x2000, 0x80)
+            look.initMapLookup(0x1000, 0x80)
+
+        sets = [
+            (0x1000, 8, 'a'),
+            (0x1004, 2, 'b'),
+            (0x2010, 0x20, 'c'),
+            (0x2018, 4, None),
+            (0x1006, 0x10, 'd'),
+            (0x2000, 0x80, 'e'),
+            (0x2040, 0x8, None),
+        ]
+        for va, size, obj in sets:
+            mlook.setMapLookup(va, size, obj)
+            ilook.setMapLookup(va, size, obj)
+
+        for va in range(0xff0, 0x2090):
+            self.assertEqual(mlook.getMapLookup(va), ilook.getMapLookup(va))
+
+    def test_interval_lookup_bulk(self):
+        items = [(0x1010, 4, 'b'), (0x1000, 8, 'a'), (0x10fc, 8, 'c')]
+
+        ilook = e_page.IntervalLookup()
+        ilook.initMapLookup(0x1000, 0x100)
+        ilook.setMapLookups(items)
+        self.assertEqual(list(ilook.getMapLookups()),
+                         [(0x1000, 8, 'a'), (0x1010, 4, 'b'), (0x10fc, 4, 'c')])
+
+        # overlapping items are applied in the given order
+        ilook = e_page.IntervalLookup()
+        ilook.initMapLookup(0x1000, 0x100)
+        ilook.setMapLookups([(0x1004, 4, 'b'), (0x1000, 0x10, 'a')])
+        self.assertEqual(ilook.getMapLookup(0x1004), 'a')
@@ -0,0 +1,89 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+import envi.symstore.symfile as e_symfile
+import envi.symstore.resolver as e_sym_resolv
+import envi.symstore.symcache as e_symcache
+
+symtups = [
+    (0x1000, 0x20, 'CreateFileW', e_sym_resolv.SYMSTOR_SYM_FUNCTION),
+    (0x1100, 0x4000, 'ReadFile', e_sym_resolv.SYMSTOR_SYM_FUNCTION),
+    (0x1200, 0, 'some_label', e_sym_resolv.SYMSTOR_SYM_SYMBOL),
+    (0x9000, 0x10, 'WriteFile', e_sym_resolv.SYMSTOR_SYM_FUNCTION),
+    (0x20000, 0, 'ünicode', e_sym_resolv.SYMSTOR_SYM_SYMBOL),
+]
+
+
+class SymCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_symfile(self):
+        fname = os.path.join(self.tmpdir, 'test.symc')
+        e_symfile.writeSymbolFile(fname, reversed(symtups))
+        self.assertTrue(e_symfile.isSymbolFile(fname))
+
+        sfile = e_symfile.SymbolFile(fname)
+        self.assertEqual(len(sfile), len(symtups))
+        self.assertEqual(sfile.getCacheSyms(), symtups)
+
+        for symtup in symtups:
+            self.assertEqual(sfile.getSymTupByName(symtup[2]), symtup)
+            self.assertEqual(sfile.getSymTupByAddr(symtup[0]), symtup)
+
+        self.assertIsNone(sfile.getSymTupByName('readfile'))
+        self.assertEqual(sfile.getSymTupByName('readfile', casesens=False), symtups[1])
+        self.assertIsNone(sfile.getSymTupByName('nope'))
+        self.assertIsNone(sfile.getSymTupByAddr(0x1001))
+
+        self.assertEqual(sfile.getNearSymTups(0x10), (None, None))
+        self.assertEqual(sfile.getNearSymTups(0x1300), (symtups[2], symtups[1]))
+        self.assertEqual(sfile.getNearSymTups(0x9100), (symtups[3], None))
+        sfile.close()
+
+    def test_symcache_migrate(self):
+        cache = e_symcache.SymbolCache(dirname=self.tmpdir)
+        self.assertIsNone(cache.getCacheSyms('pe.woot'))
+
+        # an old style json cache
+        with open(os.path.join(self.tmpdir, 'pe.json'), 'w') as fd:
+            json.dump(symtups, fd)
+
+        self.assertEqual(cache.getCacheSyms('pe.json'), symtups)
+        self.assertTrue(e_symfile.isSymbolFile(os.path.join(self.tmpdir, 'pe.json')))
+
+        cache.setCacheSyms('pe.bin', symtups[:2])
+        self.assertEqual(cache.getCacheSyms('pe.bin'), symtups[:2])
+
+        self.assertRaises(Exception, cache.getCacheSyms, '../../etc/passwd')
+
+    def test_symcache_resolver(self):
+        cache = e_symcache.SymbolCache(dirname=self.tmpdir)
+        cache.setCacheSyms('pe.bin', symtups)
+
+        fres = e_sym_resolv.FileSymbol('kernel32', 0x7c000000, 0x30000, width=4)
+        symres = e_sym_resolv.SymbolResolver(casesens=False)
+        symres.addSymbol(fres)
+        symres.impSymCache(cache.getCacheFile('pe.bin'), symfname='kernel32', baseaddr=0x7c000000)
+
+        sym = symres.getSymByAddr(0x7c001100)
+        self.assertEqual(str(sym), 'kernel32.ReadFile')
+        self.assertEqual(str(symres.getSymByAddr(0x7c003000, exact=False)), 'kernel32.some_label')
+        self.assertEqual(str(symres.getSymByAddr(0x7c004000, exact=False)), 'kernel32.ReadFile')
+        self.assertEqual(str(symres.getSymByAddr(0x7c00c000, exact=False)), 'kernel32')
+        self.assertIsNone(symres.getSymByAddr(0x7c001101))
+
+        self.assertEqual(int(fres.getSymByName('WriteFile')), 0x7c009000)
+        self.assertEqual(len(fres.getSymList()), len(symtups))
+        self.assertIsNone(symres.getSymByName('writefile'))
+
+        fres.delSymbol(fres.getSymByName('WriteFile'))
+        self.assertIsNone(fres.getSymByName('WriteFile'))
+        self.assertEqual(len(fres.getSymList()), len(symtups) - 1)
@@ -59,3 +59,32 @@ class SymResolverTests(unittest.TestCase):
         # boom.
         sym = self.symres.getSymByAddr(0x16010, exact=False)
         assert (sym != None)
+
+    def test_getSymByAddr_nearest(self):
+        symcache = [
+            (0x800, 0x100000, 'text', e_sym_resolv.SYMSTOR_SYM_SECTION),
+            (0x1000, 0x20, 'first', e_sym_resolv.SYMSTOR_SYM_FUNCTION),
+            (0x5000, 0x10, 'small', e_sym_resolv.SYMSTOR_SYM_FUNCTION),
+            (0x8000, 0x40000, 'big', e_sym_resolv.SYMSTOR_SYM_FUNCTION),
+            (0x8100, 0, 'label', e_sym_resolv.SYMSTOR_SYM_SYMBOL),
+        ]
+        self.symres.impSymCache(symcache, baseaddr=0x400000)
+
+        def near(va):
+            sym = self.symres.getSymByAddr(0x400000 + va, exact=False)
+            if sym is not None:
+                return sym.name
+
+        self.assertEqual(near(0x5008), 'small')
+        self.assertEqual(near(0x8100), 'label')
+        self.assertEqual(near(0x8200), 'label')
+        # far past "label" but still within "big"
+        self.assertEqual(near(0x30000), 'big')
+        # past "big" but within the "text" section
+        self.assertEqual(near(0x50000), 'text')
+        self.assertIsNone(near(0x200000))
+        self.assertIsNone(near(0x10))
+
+        self.symres.delSymbol(self.symres.getSymByName('big'))
+        self.assertEqual(near(0x30000), 'text')
+        self.assertIsNone(self.symres.getSymByAddr(0x430000))
@@ -42,7 +42,7 @@ def maintthread(stime):
                 time.sleep(stime)
 
         def dothread(*args, **kwargs):
-            thr = threading.Thread(target=maintloop, args=args, kwargs=kwargs, daemon=True, name="Do thread %s" % str(mainloop))
+            thr = threading.Thread(target=maintloop, args=args, kwargs=kwargs, daemon=True, name="Do thread %s" % str(maintloop))
             thr.start()
 
         functools.update_wrapper(dothread, func)
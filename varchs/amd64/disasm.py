@@ -172,6 +172,10 @@ class Amd64Disasm(e_i386.i386Disasm):
         self._dis_regctx = Amd64RegisterContext()
         self.ptrsize = 8
 
+        self._dis_tables = all_tables
+        self._dis_fast_steps = [None] * len(all_tables)
+        self._dis_opclass = Amd64Opcode
+
         # 64-bit only
         self._dis_amethods[opcode86.ADDRMETH_B >> 16] = self.ameth_b
         self._dis_amethods[opcode86.ADDRMETH_H >> 16] = self.ameth_h
@@ -216,17 +220,14 @@ class Amd64Disasm(e_i386.i386Disasm):
 
         return sizelist[mode]
 
-    def disasm(self, bytez, offset, va):
-        # FIXME: for newer instructions, the VEX.W bit needs to be able to change the opcode. ugh.
-
-        # Stuff for opcode parsing
+    def _dis_parse_prefixes(self, bytez, offset):
+        """
+        Parse the instruction prefixes (including REX and VEX) and return
+        a tuple of (offset, prefixes, tblidx) where tblidx is the opcode
+        table the mandatory prefixes have moved us to.
+        """
         tabdesc = all_tables[opcode86.TBL_Main]  # A tuple (optable, shiftbits, mask byte, sub, max)
-        startoff = offset  # Use startoff as a size knob if needed
-
-        # Stuff we'll be putting in the opcode object
-        optype = None  # This gets set if we successfully decode below
-        mnem = None
-        operands = []
+        tblidx = opcode86.TBL_Main
 
         prefixes = 0
         pho_prefixes = 0  # faux prefixes... don't immediately apply them, they may not be the prefixes we're looking for
@@ -249,7 +250,8 @@ class Amd64Disasm(e_i386.i386Disasm):
                 # print "TABIDX: %d" % tabidx
                 opdesc = tabdesc[0][tabidx]
                 # print 'OPDESC: %s -> %s' % (repr(opdesc), opcode86.tables_lookup.get(opdesc[0]))
-                tabdesc = all_tables[opdesc[0]]
+                tblidx = opdesc[0]
+                tabdesc = all_tables[tblidx]
             else:
                 prefixes |= p
 
@@ -299,7 +301,8 @@ class Amd64Disasm(e_i386.i386Disasm):
                     # print "TABIDX: %d" % tabidx
                     opdesc = tabdesc[0][tabidx]
                     # print 'OPDESC: %s -> %s' % (repr(opdesc), opcode86.tables_lookup.get(opdesc[0]))
-                    tabdesc = all_tables[opdesc[0]]
+                    tblidx = opdesc[0]
+                    tabdesc = all_tables[tblidx]
 
             offset += 1
             continue
@@ -307,6 +310,49 @@ class Amd64Disasm(e_i386.i386Disasm):
         if obyte != 0x0f:
             prefixes |= pho_prefixes
 
+        return offset, prefixes, tblidx
+
+    def _dis_fast_step(self, tblidx, obyte):
+        tabdesc = all_tables[tblidx]
+        try:
+            if obyte > tabdesc[5]:
+                tabdesc = all_tables[tabdesc[6]]
+
+            tabidx = ((obyte - tabdesc[4]) >> tabdesc[2]) & tabdesc[3]
+            opdesc = tabdesc[0][tabidx]
+
+            if opdesc[0] != 0:
+                return (opdesc[0], False)
+
+            tbl_opercnt = tabdesc[1]
+            mnem = opdesc[3 + tbl_opercnt]
+
+        except IndexError:
+            return False
+
+        advance = 0
+        if tabdesc[3] == 0xff:
+            advance = 1
+
+        return self._dis_fast_opcode(opdesc, tbl_opercnt, opdesc[1], mnem, advance)
+
+    def _dis_fast_signext(self, operflags, prefixes):
+        # Check if we are an explicitly signed operand *or* REX.W
+        return bool(operflags & opcode86.OP_SIGNED or prefixes & PREFIX_REX_W)
+
+    def disasm_tables(self, bytez, offset, va):
+        # FIXME: for newer instructions, the VEX.W bit needs to be able to change the opcode. ugh.
+
+        startoff = offset  # Use startoff as a size knob if needed
+
+        # Stuff we'll be putting in the opcode object
+        optype = None  # This gets set if we successfully decode below
+        mnem = None
+        operands = []
+
+        offset, prefixes, tblidx = self._dis_parse_prefixes(bytez, offset)
+        tabdesc = all_tables[tblidx]  # A tuple (optable, shiftbits, mask byte, sub, max)
+
         while True:
 
             obyte = bytez[offset]
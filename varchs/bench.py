@@ -0,0 +1,81 @@
+"""
+Measure disassembler throughput (in instructions per second) over a
+corpus of files.
+
+Example:
+    python -m varchs.bench -a amd64 /bin/ls /bin/sh
+"""
+import sys
+import time
+import argparse
+
+import envi
+
+
+def disbench(d, bytez, va=0, maxsize=None):
+    """
+    Linear sweep disassemble bytez with the disassembler d and return a
+    tuple of (count, seconds) for the instructions decoded (undecodable
+    bytes are skipped one at a time and not counted).
+
+    Example:
+        count, secs = disbench(d, open('/bin/ls', 'rb').read())
+        print('%d ins/sec' % (count / secs))
+    """
+    if maxsize is not None:
+        bytez = bytez[:maxsize]
+
+    count = 0
+    offset = 0
+    maxoff = len(bytez)
+    begin = time.perf_counter()
+    while offset < maxoff:
+        try:
+            op = d.disasm(bytez, offset, va + offset)
+        except Exception:
+            offset += 1
+            continue
+
+        offset += op.size
+        count += 1
+
+    return count, time.perf_counter() - begin
+
+
+def main(argv):
+    p = argparse.ArgumentParser(prog='varchs.bench')
+    p.add_argument('-a', '--arch', default='i386', help='The architecture to disassemble as')
+    p.add_argument('-s', '--size', type=lambda x: int(x, 0), default=None, help='Only sweep the first size bytes of each file')
+    p.add_argument('files', nargs='+', help='The corpus files')
+    args = p.parse_args(argv)
+
+    archmod = envi.getArchModule(args.arch)
+    d = archmod._arch_dis
+
+    modes = [('default', None)]
+    if hasattr(d, 'setFastDecode'):
+        modes = [('tables', False), ('fast', True)]
+
+    corpus = [open(fname, 'rb').read() for fname in args.files]
+    for mode, fast in modes:
+        if fast is not None:
+            d.setFastDecode(fast)
+
+        # Warm up (the fast decoder compiles tables on first use)
+        disbench(d, corpus[0], maxsize=0x1000)
+
+        count = 0
+        secs = 0.0
+        for bytez in corpus:
+            c, s = disbench(d, bytez, maxsize=args.size)
+            count += c
+            secs += s
+
+        print('%s %s: %d instructions in %.2f sec (%d ins/sec)' % (args.arch, mode, count, secs, count / secs))
+
+    if modes[0][1] is not None:
+        d.setFastDecode(True)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -629,11 +629,35 @@ class i386Opcode(envi.Opcode):
 
 
 operand_range = (2, 3, 4)
+operands_index = 2
 
 MODE_16 = 0
 MODE_32 = 1
 MODE_64 = 2
 
+# Kinds of precompiled operand templates ( see i386Disasm._dis_fast_specs )
+FASTOPER_EMBED = 0  # embedded in the opcode (ameth_0)
+FASTOPER_IMM = 1    # immediate following the other operands (I/J)
+FASTOPER_MODRM = 2  # parsed from the modrm byte on
+
+
+class FastOpcode:
+    """
+    The precompiled decode info for one final opcode table entry, and the
+    operand templates for it (by prefixes) as they are needed.
+    """
+    __slots__ = ('opdesc', 'opercnt', 'optype', 'mnem', 'advance', 'iflags', 'islea', 'specs')
+
+    def __init__(self, opdesc, opercnt, optype, mnem, advance, iflags):
+        self.opdesc = opdesc
+        self.opercnt = opercnt
+        self.optype = optype
+        self.mnem = mnem
+        self.advance = advance
+        self.iflags = iflags
+        self.islea = optype == opcode86.INS_LEA
+        self.specs = {}
+
 
 class i386Disasm:
     def __init__(self, mode=MODE_32):
@@ -643,6 +667,14 @@ class i386Disasm:
         self._dis_oparch = envi.ARCH_I386
         self.ptrsize = 4
 
+        # The precompiled (fast path) decoder state.  Table steps are
+        # compiled from self._dis_tables as they are used.
+        self._dis_fast = True
+        self._dis_tables = all_tables
+        self._dis_fast_steps = [None] * len(all_tables)
+        self._dis_fast_ops = {}
+        self._dis_opclass = i386Opcode
+
         # This will make function lookups nice and quick
         self._dis_amethods = [None for x in range(1 + (opcode86.ADDRMETH_LAST >> 16))]
         self._dis_amethods[opcode86.ADDRMETH_A >> 16] = self.ameth_a
@@ -822,17 +854,103 @@ class i386Disasm:
         # print "SIZELIST",repr(sizelist)
         return sizelist[mode]
 
-    def disasm(self, bytez, offset, va):
+    def setFastDecode(self, fast=True):
+        """
+        Enable/disable decoding with the precompiled opcode tables (on by
+        default).  When disabled every decode walks the opcode tables
+        (see disasm_tables()).  Both produce identical opcodes.
+        """
+        self._dis_fast = fast
+
+    def _dis_fast_step(self, tblidx, obyte):
+        # Compile one opcode table lookup into either a (tblidx, lookahead)
+        # tuple for a multi-byte opcode, a FastOpcode or False if the
+        # table walker should handle it.
+        tabdesc = self._dis_tables[tblidx]
+        try:
+            if obyte > tabdesc[4]:
+                tabdesc = self._dis_tables[tabdesc[5]]
 
-        # Stuff for opcode parsing
-        tabdesc = all_tables[0]  # A tuple (optable, shiftbits, mask byte, sub, max)
-        startoff = offset  # Use startoff as a size knob if needed
+            tabidx = ((obyte - tabdesc[3]) >> tabdesc[1]) & tabdesc[2]
+            opdesc = tabdesc[0][tabidx]
 
-        # Stuff we'll be putting in the opcode object
-        optype = None  # This gets set if we successfully decode below
-        mnem = None
-        operands = []
+        except IndexError:
+            return False
+
+        if opdesc[0] != 0:
+            # 66 0f has the next table assuming we ate both
+            return (opdesc[0], obyte == 0x66)
+
+        advance = 0
+        if tabdesc[2] == 0xff:
+            advance = 1
+
+        return self._dis_fast_opcode(opdesc, 3, opdesc[1], opdesc[6], advance)
+
+    def _dis_fast_opcode(self, opdesc, opercnt, optype, mnem, advance):
+        if optype == 0:
+            return False
+
+        key = (id(opdesc), advance)
+        fop = self._dis_fast_ops.get(key)
+        if fop is None:
+            iflags = iflag_lookup.get(optype, 0) | self._dis_oparch
+            if priv_lookup.get(mnem, False):
+                iflags |= envi.IF_PRIV
 
+            fop = FastOpcode(opdesc, opercnt, optype, mnem, advance, iflags)
+            self._dis_fast_ops[key] = fop
+
+        return fop
+
+    def _dis_fast_specs(self, fop, prefixes):
+        """
+        Build the operand templates for the given FastOpcode and prefixes,
+        a tuple of (kind, ameth, operflags, extra, tsize) tuples (or False
+        if the table walker should handle it).
+        """
+        specs = []
+        opdesc = fop.opdesc
+        opercnt = fop.opercnt
+        try:
+            for i in range(operands_index, operands_index + opercnt):
+
+                operflags = opdesc[i]
+                if operflags == 0:
+                    break
+
+                opertype = operflags & opcode86.OPTYPE_MASK
+                addrmeth = operflags & opcode86.ADDRMETH_MASK
+                tsize = self._dis_calc_tsize(opertype, prefixes, operflags)
+
+                if addrmeth == 0:
+                    specs.append((FASTOPER_EMBED, self.ameth_0, operflags, opdesc[2 + opercnt + i], tsize))
+                    continue
+
+                ameth = self._dis_amethods[addrmeth >> 16]
+                if ameth is None:
+                    return False
+
+                if addrmeth == opcode86.ADDRMETH_I or addrmeth == opcode86.ADDRMETH_J:
+                    signext = self._dis_fast_signext(operflags, prefixes)
+                    specs.append((FASTOPER_IMM, ameth, operflags, signext, tsize))
+                else:
+                    specs.append((FASTOPER_MODRM, ameth, operflags, None, tsize))
+
+        except Exception:
+            return False
+
+        return tuple(specs)
+
+    def _dis_fast_signext(self, operflags, prefixes):
+        return bool(operflags & opcode86.OP_SIGNED)
+
+    def _dis_parse_prefixes(self, bytez, offset):
+        """
+        Parse the instruction prefixes and return a tuple of
+        (offset, prefixes, tblidx) where tblidx is the opcode table
+        to begin decoding the opcode with.
+        """
         prefixes = 0
 
         while True:
@@ -849,6 +967,112 @@ class i386Disasm:
             offset += 1
             continue
 
+        return offset, prefixes, 0
+
+    def disasm(self, bytez, offset, va):
+        if not self._dis_fast:
+            return self.disasm_tables(bytez, offset, va)
+
+        startoff = offset
+        offset, prefixes, tblidx = self._dis_parse_prefixes(bytez, offset)
+
+        # Walk the compiled opcode tables (steps are compiled on first use)
+        fsteps = self._dis_fast_steps
+        while True:
+
+            steps = fsteps[tblidx]
+            if steps is None:
+                steps = [None] * 256
+                fsteps[tblidx] = steps
+
+            obyte = bytez[offset]
+            fop = steps[obyte]
+            if fop is None:
+                fop = self._dis_fast_step(tblidx, obyte)
+                steps[obyte] = fop
+
+            if fop.__class__ is not tuple:
+                break
+
+            tblidx, lookahead = fop
+            if lookahead and bytez[offset + 1] == 0x0f:
+                offset += 1
+
+            offset += 1
+
+        if fop is False:
+            return self.disasm_tables(bytez, startoff, va)
+
+        offset += fop.advance
+
+        specs = fop.specs.get(prefixes)
+        if specs is None:
+            specs = self._dis_fast_specs(fop, prefixes)
+            fop.specs[prefixes] = specs
+
+        if specs is False:
+            return self.disasm_tables(bytez, startoff, va)
+
+        operands = []
+        operoffset = 0
+        regctx = self._dis_regctx
+        for kind, ameth, operflags, extra, tsize in specs:
+
+            if kind == FASTOPER_EMBED:
+                osize = 0
+                oper = ameth(operflags, extra, tsize, prefixes)
+
+            else:
+                try:
+                    if kind == FASTOPER_IMM:
+                        osize, oper = ameth(bytez, offset + operoffset, tsize, prefixes, operflags)
+
+                        # Sign extend to the size of the other operand (see disasm_tables)
+                        if extra and operands and tsize != operands[-1].tsize:
+                            otsize = operands[-1].tsize
+                            oper.imm = e_bits.sign_extend(oper.imm, oper.tsize, otsize)
+                            oper.tsize = otsize
+
+                    else:
+                        osize, oper = ameth(bytez, offset, tsize, prefixes, operflags)
+
+                except struct.error as e:
+                    # Catch struct unpack errors due to insufficient data length
+                    raise envi.InvalidInstruction(bytez=bytez[startoff:startoff + 16])
+
+            if oper is not None:
+                oper._dis_regctx = regctx
+                operands.append(oper)
+
+            operoffset += osize
+
+        iflags = fop.iflags
+        if prefixes & PREFIX_REP_MASK:
+            iflags |= envi.IF_REPEAT
+
+        # Lea will have a reg-mem/sib operand with _is_deref True, but should be false
+        if fop.islea:
+            operands[1]._is_deref = False
+
+        return self._dis_opclass(va, fop.optype, fop.mnem, prefixes, (offset - startoff) + operoffset, operands, iflags)
+
+    def disasm_tables(self, bytez, offset, va):
+        """
+        Decode an opcode by walking the opcode tables (the reference for
+        the precompiled fast path used by disasm()).
+        """
+
+        # Stuff for opcode parsing
+        tabdesc = all_tables[0]  # A tuple (optable, shiftbits, mask byte, sub, max)
+        startoff = offset  # Use startoff as a size knob if needed
+
+        # Stuff we'll be putting in the opcode object
+        optype = None  # This gets set if we successfully decode below
+        mnem = None
+        operands = []
+
+        offset, prefixes, tblidx = self._dis_parse_prefixes(bytez, offset)
+
         # pdone = False
         while True:
 
@@ -732,12 +732,9 @@ class Vdb(e_cli.EnviMutableCli, v_notif.Notifier, v_util.TraceManager):
 
         t = self.trace
         t.requireAttached()
-        self.vprint("Taking Snapshot...")
-        snap = vs_snap.takeSnapshot(t)
-        self.vprint("Saving To File")
-        snap.saveToFile(alist[0])
+        self.vprint("Saving Snapshot To File...")
+        vs_snap.saveSnapshot(t, alist[0])
         self.vprint("Done")
-        snap.release()
 
     def do_ignore(self, args):
         """
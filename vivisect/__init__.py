@@ -9,6 +9,7 @@ import re
 import sys
 import time
 import copy
+import bisect
 import queue
 import string
 import hashlib
@@ -18,6 +19,11 @@ import traceback
 import collections
 from binascii import hexlify
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 import envi
 import envi.bits as e_bits
 import envi.bytesig as e_bytesig
@@ -31,6 +37,9 @@ import vivisect.base as viv_base
 import vivisect.codegraph as viv_codegraph
 import vivisect.contrib  # This should go first
 import vivisect.impemu.lookup as viv_imp_lookup
+import vivisect.parallel as viv_parallel
+import vivisect.storage as viv_storage
+import vivisect.xrefs as viv_xrefs
 import vparsers as viv_parsers
 import vstruct
 import vstruct.cparse as vs_cparse
@@ -66,6 +75,7 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
 
         self.chanids = itertools.count()
         self.chan_lookup = {}
+        self.chan_pending = {}  # chanid -> deque of events left from a batch
         self.nextchanid = 1
 
         self.arch = None  # The placeholder for the Envi architecture module
@@ -83,9 +93,7 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         self._dead_data = []
         self.iscode = {}
 
-        self.xrefs = []
-        self.xrefs_by_to = {}
-        self.xrefs_by_from = {}
+        self.xrefs = viv_xrefs.XrefStore()
 
         # XXX - make config option
         self.greedycode = 0
@@ -130,6 +138,11 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         # emulator cache - holds an instance of an emulator and a clean snapshot
         self._emulator_cache = dict()
 
+        # decoded opcode caches for parseOpcode() (by (va, arch)) and for
+        # our emulators (by va)
+        self._op_cache = viv_base.OpcodeCache(self.config.viv.opcache)
+        self._emu_op_cache = viv_base.OpcodeCache(self.config.viv.opcache)
+
         self._initEventHandlers()
 
         # Some core meta types that exist
@@ -184,7 +197,10 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         return vivGuid
 
     def loadWorkspace(self, wsname):
-        mname = self.getMeta("StorageModule")
+        # Storage formats with a known signature pick their own module
+        mname = viv_storage.guessStorageModule(wsname)
+        if mname is None:
+            mname = self.getMeta("StorageModule")
         mod = self.loadModule(mname)
         mod.loadWorkspace(self, wsname)
         self.setMeta("StorageName", wsname)
@@ -353,6 +369,21 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         offset, bytes = self.getByteDef(va)
         return self.sigtree.isSignature(bytes, offset=offset)
 
+    def findFunctionSignatures(self, va, size):
+        """
+        Return a sorted list of the virtual addresses from va to va + size
+        (which must be within one memory map) that match a function entry
+        signature.  The whole range is scanned in one pass with the
+        compiled signature automaton (see envi.bytesig).
+
+        Example:
+            for fva in vw.findFunctionSignatures(mapva, mapsize):
+                vw.makeFunction(fva)
+        """
+        offset, bytes = self.getByteDef(va)
+        hits = self.sigtree.scan(bytes, offset=offset, size=size)
+        return sorted(set(va + (off - offset) for off, val in hits))
+
     def addNoReturnApi(self, funcname):
         """
         Inform vivisect code-flow disassembly that any call target
@@ -481,18 +512,41 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
             local = True
 
         # Process the events from the import data...
-        fe = self._fireEvent
-        for event, einfo in wsevents:
-            fe(event, einfo, local=local)
-        return
+        self._fireEvents(wsevents, local=local)
 
     def exportWorkspace(self):
         """
         Return the (probably big) list of events which define this
         workspace.
         """
+        if self._event_ckpt:
+            # Loaded from a checkpoint, so there's no full history to
+            # hand out.  Give back a compacted event list instead.
+            return list(viv_base.checkpointEvents(self.exportCheckpoint()))
         return self._event_list
 
+    def exportCheckpoint(self):
+        """
+        Return a checkpoint of the materialized workspace state (locations,
+        xrefs, names, functions, codeblocks, memory maps, vasets...) which
+        may be handed to importCheckpoint() to rebuild the workspace
+        without replaying the event history.
+
+        Example:
+            ckpt = vw.exportCheckpoint()
+            vw2 = vivisect.VivWorkspace()
+            vw2.importCheckpoint(ckpt)
+        """
+        return self._exportCheckpoint()
+
+    def importCheckpoint(self, ckpt):
+        """
+        Bulk load a checkpoint from exportCheckpoint() into the workspace.
+        Events fired after the import will continue to be tracked as
+        changes (for saveWorkspace(fullsave=False)).
+        """
+        self._importCheckpoint(ckpt)
+
     def exportWorkspaceChanges(self):
         """
         Export the list of events which have been applied to the
@@ -526,18 +580,67 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         if self.server is None:
             raise Exception("_clientThread() with no server?!?!")
 
+        # Older servers only hand out one event at a time
+        try:
+            waitevents = self.server.waitForEvents
+        except Exception:
+            waitevents = None
+
         while self.server is not None:
-            event, einfo = self.server.waitForEvent(self.rchan)
-            self._fireEvent(event, einfo, local=True)
+            if waitevents is None:
+                event, einfo = self.server.waitForEvent(self.rchan)
+                self._fireEvent(event, einfo, local=True)
+                continue
+
+            self._fireEvents(waitevents(self.rchan), local=True)
 
     def waitForEvent(self, chanid, timeout=None):
         """
         Return an event,eventinfo tuple.
         """
+        pending = self.chan_pending.get(chanid)
+        if pending:
+            return pending.popleft()
+
+        q = self.chan_lookup.get(chanid)
+        if q is None:
+            raise Exception("Invalid Channel")
+
+        item = q.get(timeout=timeout)
+        if type(item) is not list:
+            return item
+
+        # A batch of events (see eventBatch())
+        pending = collections.deque(item)
+        self.chan_pending[chanid] = pending
+        return pending.popleft()
+
+    def waitForEvents(self, chanid, timeout=None):
+        """
+        Return a list of all the available event,eventinfo tuples (waiting
+        for at least one).  This saves a round trip per event for remote
+        clients.
+        """
+        pending = self.chan_pending.pop(chanid, None)
+        if pending:
+            return list(pending)
+
         q = self.chan_lookup.get(chanid)
         if q is None:
             raise Exception("Invalid Channel")
-        return q.get(timeout=timeout)
+
+        events = []
+        item = q.get(timeout=timeout)
+        while True:
+            if type(item) is list:
+                events.extend(item)
+            else:
+                events.append(item)
+
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                return events
 
     def deleteEventChannel(self, chanid):
         """
@@ -545,6 +648,7 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         the workspace.
         """
         self.chan_lookup.pop(chanid)
+        self.chan_pending.pop(chanid, None)
 
     def reprVa(self, va):
         """
@@ -634,26 +738,40 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         if self.verbose: self.vprint('...analyzing exports.')
 
         starttime = time.time()
-        for eva in self.getEntryPoints():
-            if self.isFunction(eva):
-                continue
-            if not self.probeMemory(eva, 1, envi.MM_EXEC):
-                continue
-            self.makeFunction(eva)
 
-        # Now lets engage any extended analysis modules.  If any modules return
-        # true, they managed to change things and we should run again...
-        for mname in self.amodlist:
-            mod = self.amods.get(mname)
-            if self.verbose:
-                self.vprint("Extended Analysis: %s" % mod.__name__)
+        # In parallel mode, the emulation heavy function analysis modules
+        # are deferred and run by a process pool after each pass.
+        if viv_parallel.getParallelProcs(self):
+            self._fmod_defer = []
 
-            try:
-                mod.analyze(self)
-            except Exception as e:
+        try:
+            for eva in self.getEntryPoints():
+                if self.isFunction(eva):
+                    continue
+                if not self.probeMemory(eva, 1, envi.MM_EXEC):
+                    continue
+                self.makeFunction(eva)
+
+            self._analyzeDeferred()
+
+            # Now lets engage any extended analysis modules.  If any modules return
+            # true, they managed to change things and we should run again...
+            for mname in self.amodlist:
+                mod = self.amods.get(mname)
                 if self.verbose:
-                    traceback.print_exc()
-                self.verbprint("Extended Analysis Exception %s: %s" % (mod.__name__, e))
+                    self.vprint("Extended Analysis: %s" % mod.__name__)
+
+                try:
+                    mod.analyze(self)
+                except Exception as e:
+                    if self.verbose:
+                        traceback.print_exc()
+                    self.verbprint("Extended Analysis Exception %s: %s" % (mod.__name__, e))
+
+                self._analyzeDeferred()
+
+        finally:
+            self._fmod_defer = None
 
         endtime = time.time()
         if self.verbose:
@@ -661,6 +779,10 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
             self.printDiscoveredStats()
         self._fireEvent(VWE_AUTOANALFIN, (endtime, starttime))
 
+    def _analyzeDeferred(self):
+        if self._fmod_defer is not None:
+            viv_parallel.analyzeDeferredFunctions(self)
+
     def getStats(self):
         stats = {
             'functions': len(self.funcmeta),
@@ -746,32 +868,110 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
                 self.setTransMeta('findPointers', ret)
                 return ret
 
+        ret = []
+        for mva, msize, mperm, mname in self.getMemoryMaps():
+            offset, bytes = self.getByteDef(mva)
+            if numpy is not None and self.psize in (1, 2, 4, 8):
+                ret.extend(self._findMapPointersNumpy(mva, bytes))
+            else:
+                ret.extend(self._findMapPointers(mva, bytes))
+
+        if cache:
+            self.setTransMeta('findPointers', ret)
+
+        return ret
+
+    def _findMapPointers(self, mva, mbytes):
         ret = []
         size = self.psize
+        offset = 0
+        maxsize = len(mbytes) - size
 
-        for mva, msize, mperm, mname in self.getMemoryMaps():
+        while offset + size < maxsize:
+            va = mva + offset
 
-            offset, bytes = self.getByteDef(mva)
-            maxsize = len(bytes) - size
+            loctup = self.getLocation(va)
+            if loctup is not None:
+                offset += loctup[L_SIZE]
+                continue
 
-            while offset + size < maxsize:
-                va = mva + offset
+            x = e_bits.parsebytes(mbytes, offset, size, bigend=self.bigend)
+            if self.isValidPointer(x):
+                ret.append((va, x))
+                offset += size
+                continue
 
-                loctup = self.getLocation(va)
-                if loctup is not None:
-                    offset += loctup[L_SIZE]
-                    continue
+            offset += 1
 
-                x = e_bits.parsebytes(bytes, offset, size, bigend=self.bigend)
-                if self.isValidPointer(x):
-                    ret.append((va, x))
-                    offset += size
-                    continue
+        return ret
 
-                offset += 1
+    def _findMapPointersNumpy(self, mva, mbytes, chunk=0x100000):
+        """
+        NumPy version of _findMapPointers() (with the same results).  The
+        pointer value at every offset is checked against the memory maps
+        and the location intervals are turned into an occupancy mask in
+        bulk, which leaves only the offsets where something happens (a
+        location or a valid pointer) for the (greedy) walk over the map.
+        """
+        size = self.psize
+        # The offsets _findMapPointers() checks are [0, limit)
+        limit = len(mbytes) - (2 * size)
+        if limit <= 0:
+            return []
 
-        if cache:
-            self.setTransMeta('findPointers', ret)
+        try:
+            buf = numpy.frombuffer(mbytes, dtype=numpy.uint8)
+        except TypeError:
+            buf = numpy.frombuffer(bytes(mbytes), dtype=numpy.uint8)
+
+        dtype = numpy.dtype('u%d' % size).newbyteorder('>' if self.bigend else '<')
+        # The (unaligned) pointer sized value at every offset
+        vals = numpy.ndarray((limit,), dtype=dtype, buffer=buf, strides=(1,))
+
+        # The union of the memory map ranges (for isValidPointer)
+        mstarts = []
+        mends = []
+        for mapva, mapmax in sorted((mdef[0], mdef[1]) for mdef in self._map_defs):
+            if mends and mapva <= mends[-1]:
+                mends[-1] = max(mends[-1], mapmax)
+                continue
+            mstarts.append(mapva)
+            mends.append(mapmax)
+        mstarts = numpy.array(mstarts, dtype=numpy.uint64)
+        mends = numpy.array(mends, dtype=numpy.uint64)
+
+        valid = numpy.empty(limit, dtype=bool)
+        for start in range(0, limit, chunk):
+            x = vals[start:start + chunk].astype(numpy.uint64)
+            idx = numpy.searchsorted(mstarts, x, side='right') - 1
+            valid[start:start + chunk] = (idx >= 0) & (x < mends[idx.clip(0)])
+
+        lstarts, lends = self.locmap.getMapLookupRanges(mva, limit)
+        lstarts = numpy.array(lstarts, dtype=numpy.uint64)
+        lends = numpy.array(lends, dtype=numpy.uint64)
+        lstarts = (lstarts.clip(mva, mva + limit) - mva).astype(numpy.intp)
+        lends = (lends.clip(mva, mva + limit) - mva).astype(numpy.intp)
+        edges = numpy.bincount(lstarts, minlength=limit + 1) - numpy.bincount(lends, minlength=limit + 1)
+        occupied = numpy.cumsum(edges[:limit]) > 0
+
+        stops = numpy.flatnonzero(valid | occupied).tolist()
+
+        ret = []
+        offset = 0
+        i = 0
+        while True:
+            i = bisect.bisect_left(stops, offset, i)
+            if i >= len(stops):
+                break
+
+            offset = stops[i]
+            va = mva + offset
+            if occupied[offset]:
+                offset += self.getLocation(va)[L_SIZE]
+                continue
+
+            ret.append((va, int(vals[offset])))
+            offset += size
 
         return ret
 
@@ -908,8 +1108,30 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         Example: op = m.parseOpcode(0x7c773803)
 
         note: differs from the IMemory interface by checking loclist
+
+        Decoded opcodes are kept in a bounded (viv.opcache.size) LRU cache
+        and the *same* opcode object is returned for repeated calls, so
+        callers must not modify them.
         """
+        arch = self._getOpcodeArch(va, arch)
+
+        opkey = (va, arch)
+        op = self._op_cache.get(opkey)
+        if op is not None:
+            return op
+
         off, b = self.getByteDef(va)
+        try:
+            op = self.imem_archs[(arch & envi.ARCH_MASK) >> 16].archParseOpcode(b, off, va)
+        except envi.InvalidInstruction:
+            # fall back to capstone bridge
+            print("CAPSTOOOONE !!!!")
+            return None
+
+        self._op_cache.put(opkey, op)
+        return op
+
+    def _getOpcodeArch(self, va, arch):
         if arch == envi.ARCH_DEFAULT:
             loctup = self.getLocation(va)
             # XXX - in the case where we've set a location on what should be an 
@@ -917,13 +1139,49 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
             # so that at least parse opcode wont fail
             if loctup is not None and loctup[L_TINFO] and loctup[L_LTYPE] == LOC_OP:
                 arch = loctup[L_TINFO]
+        return arch
 
-        try:
-            return self.imem_archs[(arch & envi.ARCH_MASK) >> 16].archParseOpcode(b, off, va)
-        except envi.InvalidInstruction:
-            # fall back to capstone bridge
-            print("CAPSTOOOONE !!!!")
-            pass
+    def parseOpcodes(self, va, size, arch=envi.ARCH_DEFAULT, skipinvalid=False, opervals=False):
+        """
+        Linear sweep disassemble size bytes from the specified virtual
+        address and return an envi.OpcodeBatch of columnar results (see
+        envi.ArchitectureModule.archParseOpcodes()) without keeping an
+        Opcode object for each instruction.
+
+        Example:
+            batch = vw.parseOpcodes(cbva, cbsize)
+            for i in range(len(batch)):
+                print('0x%.8x %s' % (batch.vas[i], batch.getMnemonic(i)))
+
+        NOTE: the sweep stops at the end of the memory map (and, unless
+              skipinvalid=True, at the first invalid instruction).
+        """
+        arch = self._getOpcodeArch(va, arch)
+        off, b = self.getByteDef(va)
+        archmod = self.imem_archs[(arch & envi.ARCH_MASK) >> 16]
+        return archmod.archParseOpcodes(b, off, va, size=size, skipinvalid=skipinvalid, opervals=opervals)
+
+    def clearOpcodeCache(self):
+        """
+        Drop all decoded opcodes from the parseOpcode() (and emulator)
+        opcode caches.  This is done for you when memory (or the
+        architecture) changes.
+        """
+        self._op_cache.clear()
+        self._emu_op_cache.clear()
+
+    def getOpcodeCacheStats(self, emu=False):
+        """
+        Return a dict of hits, misses, size and maxsize for the parseOpcode()
+        cache (or the opcode cache shared by workspace emulators if emu=True).
+
+        Example:
+            stats = vw.getOpcodeCacheStats()
+            print('opcode cache hits: %d misses: %d' % (stats['hits'], stats['misses']))
+        """
+        if emu:
+            return self._emu_op_cache.getStats()
+        return self._op_cache.getStats()
 
     def makeOpcode(self, va, op=None, arch=envi.ARCH_DEFAULT):
         """
@@ -1370,9 +1628,7 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         """
         Return the entire list of XREF tuples for this workspace.
         """
-        if rtype:
-            return [xtup for xtup in self.xrefs if xtup[XR_RTYPE] == rtype]
-        return self.xrefs
+        return self.xrefs.getXrefs(rtype=rtype)
 
     def getXrefsFrom(self, va, rtype=None):
         """
@@ -1384,27 +1640,36 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         for fromva, tova, rtype, rflags in vw.getXrefsFrom(0x41414141):
             dostuff(tova)
         """
-        ret = []
-        xrefs = self.xrefs_by_from.get(va, None)
-        if xrefs is None:
-            return ret
-        if rtype is None:
-            return xrefs
-        return [xtup for xtup in xrefs if xtup[XR_RTYPE] == rtype]
+        return self.xrefs.getXrefsFrom(va, rtype=rtype)
 
     def getXrefsTo(self, va, rtype=None):
         """
         Get a list of xrefs which point to the given va. Optionally,
         specify an rtype to get only xrefs of that type.
         """
-        # FIXME make xrefs use MapLookup!
-        ret = []
-        xrefs = self.xrefs_by_to.get(va, None)
-        if xrefs is None:
-            return ret
-        if rtype is None:
-            return xrefs
-        return [xtup for xtup in xrefs if xtup[XR_RTYPE] == rtype]
+        return self.xrefs.getXrefsTo(va, rtype=rtype)
+
+    def getXrefsFromRange(self, va, size, rtype=None):
+        """
+        Get a list of the xrefs whose origin is within [va, va + size).
+        Optionally, specify an rtype to get only xrefs of that type.
+
+        Example:
+            for fromva, tova, rtype, rflags in vw.getXrefsFromRange(fva, fsize):
+                dostuff(tova)
+        """
+        return self.xrefs.getXrefsFromRange(va, size, rtype=rtype)
+
+    def getXrefsToRange(self, va, size, rtype=None):
+        """
+        Get a list of the xrefs which point into [va, va + size).
+        Optionally, specify an rtype to get only xrefs of that type.
+
+        Example:
+            # everything which references the .data section
+            xrefs = vw.getXrefsToRange(segva, segsize)
+        """
+        return self.xrefs.getXrefsToRange(va, size, rtype=rtype)
 
     def addMemoryMap(self, va, perms, fname, bytes):
         """
@@ -1416,6 +1681,10 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
     def delMemoryMap(self, va):
         raise Exception("OMG")
 
+    def writeMemory(self, va, bytez):
+        e_mem.MemoryObject.writeMemory(self, va, bytez)
+        self.clearOpcodeCache()
+
     def addSegment(self, va, size, name, filename):
         """
         Add a "segment" to the workspace.  A segment is generally some meaningful
@@ -1485,7 +1754,7 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         Callers are expected to do their own xref analysis (ie, makeCode() etc)
         """
         ref = (fromva, tova, reftype, rflags)
-        if ref in self.getXrefsFrom(fromva):
+        if self.xrefs.hasXref(ref):
             return
         self._fireEvent(VWE_ADDXREF, (fromva, tova, reftype, rflags))
 
@@ -1494,8 +1763,8 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
         Remove the given xref.  This *will* exception if the
         xref doesn't already exist...
         """
-        if ref not in self.getXrefsFrom(ref[XR_FROM]):
-            raise Exception("Unknown Xref: %x %x %d" % ref)
+        if not self.xrefs.hasXref(ref):
+            raise Exception("Unknown Xref: %x %x %d" % ref[:3])
         self._fireEvent(VWE_DELXREF, ref)
 
     def analyzePointer(self, va):
@@ -1952,13 +2221,7 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
             return ret
         if adjacent:
             return None
-        va -= 1
-        while va > 0:
-            ret = self.locmap.getMapLookup(va)
-            if ret is not None:
-                return ret
-            va -= 1
-        return None
+        return self.locmap.getMapLookupPrev(va)
 
     def vaByName(self, name) -> object:
         return self.va_by_name.get(name, None)
@@ -2033,8 +2296,14 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
 
         self._fireEvent(VWE_SETNAME, (va, name))
 
-    def saveWorkspace(self, fullsave=True):
-
+    def saveWorkspace(self, fullsave=True, checkpoint=False):
+        """
+        Save the workspace using the current StorageModule.  Specify
+        checkpoint=True to save the materialized workspace state rather
+        than the event history ( this requires a storage module with
+        saveWorkspaceCheckpoint() such as vivisect.storage.binfile ).
+        Later saves with fullsave=False append changes after it.
+        """
         if self.server is not None:
             return
 
@@ -2050,7 +2319,12 @@ class VivWorkspace(e_mem.MemoryObject, viv_base.VivWorkspaceCore):
 
         # If they specified a full save, *or* this event list
         # has never been saved before, do a full save.
-        if fullsave:
+        if checkpoint:
+            savecp = getattr(mod, 'saveWorkspaceCheckpoint', None)
+            if savecp is None:
+                raise Exception('StorageModule %s does not support checkpoints!' % modname)
+            savecp(self, filename)
+        elif fullsave:
             mod.saveWorkspace(self, filename)
         else:
             mod.saveWorkspaceChanges(self, filename)
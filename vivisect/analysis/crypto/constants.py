@@ -3,8 +3,8 @@
 import envi
 from vivisect.const import *
 
-dh_group1 = "FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A63A3620FFFFFFFFFFFFFFFF".decode("hex")
-dh_group2 = "FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7EDEE386BFB5A899FA5AE9F24117C4B1FE649286651ECE65381FFFFFFFFFFFFFFFF".decode("hex")
+dh_group1 = bytes.fromhex("FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A63A3620FFFFFFFFFFFFFFFF")
+dh_group2 = bytes.fromhex("FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7EDEE386BFB5A899FA5AE9F24117C4B1FE649286651ECE65381FFFFFFFFFFFFFFFF")
 
 md5_inits = [0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476]
 md5_xform = [
@@ -32,23 +32,17 @@ def analyze(vw):
         md5_xform_score = 0
 
         for va, size, funcva in vw.getFunctionBlocks(fva):
-            maxva = va + size
-            while va < maxva:
-                op = vw.parseOpcode(va)
-                for o in op.opers:
+            batch = vw.parseOpcodes(va, size, opervals=True)
+            for imm, isimmed in zip(batch.opvals, batch.opimmed):
 
-                    if not o.isImmed():
-                        continue
+                if not isimmed:
+                    continue
 
-                    imm = o.getOperValue(op)
+                if imm in md5_inits:
+                    md5_init_score += 1
 
-                    if imm in md5_inits:
-                        md5_init_score += 1
-
-                    if imm in md5_xform:
-                        md5_xform_score += 1
-
-                va += len(op)
+                if imm in md5_xform:
+                    md5_xform_score += 1
 
         if md5_init_score == len(md5_inits):
             rows.append((fva, "MD5 Init"))
@@ -7,6 +7,7 @@ if they are code by emulation behavioral analysis.
 import envi
 import vivisect
 import vivisect.impemu.monitor as viv_imp_monitor
+import vivisect.parallel as viv_parallel
 
 from vivisect.const import *
 
@@ -101,8 +102,39 @@ class watcher(viv_imp_monitor.EmulationMonitor):
             emu.stopEmu()
 
 
+TRY_DATA = 0
+TRY_FUNC = 1
+TRY_CODE = 2
+
+
+def tryCode(vw, va):
+    """
+    Emulate from va and return TRY_FUNC if it looks like a function,
+    TRY_CODE if it only looks like (greedy) code, TRY_DATA if it
+    doesn't look like code, or None if emulation failed.
+    """
+    emu = vw.getEmulator()
+    wat = watcher(vw, va)
+    emu.setEmulationMonitor(wat)
+    try:
+        emu.runFunction(va, maxhit=1)
+    except Exception as e:
+        return None
+
+    if wat.looksgood():
+        return TRY_FUNC
+
+    # flag to tell us to be greedy w/ finding code
+    # XXX - visi is going to hate this..
+    if wat.iscode() and vw.greedycode:
+        return TRY_CODE
+
+    return TRY_DATA
+
+
 def analyze(vw):
     flist = vw.getFunctions()
+    procs = viv_parallel.getParallelProcs(vw)
 
     tried = {}
     vasetrows = []
@@ -115,6 +147,7 @@ def analyze(vw):
         vatodo.extend(
             [tova for fromva, tova, reftype, rflags in vw.getXrefs(rtype=REF_PTR) if vw.getLocation(tova) is None])
 
+        trylist = []
         for va in set(vatodo):
             if vw.getLocation(va) is not None:
                 continue
@@ -130,18 +163,30 @@ def analyze(vw):
                 continue
 
             tried[va] = True
-            emu = vw.getEmulator()
-            wat = watcher(vw, va)
-            emu.setEmulationMonitor(wat)
-            try:
-                emu.runFunction(va, maxhit=1)
-            except Exception as e:
+            trylist.append(va)
+
+        # Emulate them all up front in parallel mode (emulation only reads
+        # the workspace), otherwise as we go.
+        results = None
+        if procs and len(trylist) > vw.config.viv.analysis.parallel.chunksize:
+            results = viv_parallel.parallelMap(vw, tryCode, trylist)
+
+        for i, va in enumerate(trylist):
+            # Strings made for earlier entries may cover this one
+            if vw.getLocation(va) is not None:
+                continue
+
+            if results is not None:
+                res = results[i]
+            else:
+                res = tryCode(vw, va)
+
+            if res is None:
                 continue
-            if wat.looksgood():
+
+            if res == TRY_FUNC:
                 docode.append(va)
-            # flag to tell us to be greedy w/ finding code
-            # XXX - visi is going to hate this..
-            elif wat.iscode() and vw.greedycode:
+            elif res == TRY_CODE:
                 bcode.append(va)
             else:
                 if vw.isProbablyString(va):
@@ -29,22 +29,16 @@ def analyze(vw):
         if not mapflags & envi.const.MM_EXEC:
             continue
 
-        i = 0
-        maxsize = mapsize - 4
-        while i < maxsize:
-            va = mapva + i
-            loctup = vw.getLocation(va)
-            if loctup is not None:
-                i += loctup[vivisect.L_SIZE]
-                continue
+        # Find all the signature matches in the map in one pass, then only
+        # try the ones which haven't been made into locations since
+        for va in vw.findFunctionSignatures(mapva, mapsize - 4):
 
-            i += 1
+            if vw.getLocation(va) is not None:
+                continue
 
             try:
 
-                if vw.isFunctionSignature(va):
-                    # print "MATCH MATCH MATCH: 0x%.8x" % va
-                    vw.makeFunction(va)
+                vw.makeFunction(va)
 
             except vivisect.InvalidLocation as msg:
                 if vw.verbose: vw.vprint("InvalidLocation: %s" % msg)
@@ -14,17 +14,14 @@ def analyze(vw):
 
     for fva in vw.getFunctions():
         for va, size, funcva in vw.getFunctionBlocks(fva):
-            maxva = va + size
-            while va < maxva:
-                op = vw.parseOpcode(va)
-                for o in op.opers:
-                    if o.isDeref():
-                        continue
-                    ref = o.getOperValue(op, None)
+            batch = vw.parseOpcodes(va, size, opervals=True)
+            for i in range(len(batch)):
+                opva = batch.vas[i]
+                for ref, isimmed in batch.getOperValues(i):
 
                     # Candidates will be listed with the Xrefs thanks to
                     # logic in makeOpcode().
-                    if not (vw.getXrefsTo(ref) and vw.getXrefsFrom(va)):
+                    if not (vw.getXrefsTo(ref) and vw.getXrefsFrom(opva)):
                         continue
 
                     # String constants must be in a defined memory segment.
@@ -39,5 +36,4 @@ def analyze(vw):
                         if sz > 0:
                             vw.addLocation(ref, sz, LOC_UNI)
 
-                va += len(op)
     return
@@ -6,6 +6,7 @@ of a workspace, so the outer facing API is a little cleaner.
 import queue
 import traceback
 import threading
+import contextlib
 import collections
 
 import envi
@@ -21,6 +22,7 @@ import vivisect.const as viv_const
 import vivisect.impapi as viv_impapi
 import vivisect.analysis as viv_analysis
 import vivisect.codegraph as viv_codegraph
+import vivisect.parallel as viv_parallel
 
 from envi.threads import firethread
 
@@ -84,6 +86,9 @@ class VivEventCore:
         self._ve_lock.release()
 
 
+# Bump this if the layout of _exportCheckpoint() changes
+CKPT_VERSION = 1
+
 vaset_xlate = {
     int: VASET_ADDRESS,
     str: VASET_STRING,
@@ -151,14 +156,65 @@ def ddict():
     return collections.defaultdict(dict)
 
 
+class OpcodeCache:
+    """
+    A bounded (config.size entries) LRU cache of decoded opcodes which
+    keeps hit/miss counters.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.hits = 0
+        self.misses = 0
+        self._ops = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._ops)
+
+    def get(self, key):
+        op = self._ops.pop(key, None)
+        if op is None:
+            self.misses += 1
+            return None
+
+        self._ops[key] = op
+        self.hits += 1
+        return op
+
+    def put(self, key, op):
+        maxsize = self.config.size
+        if not maxsize:
+            return
+
+        ops = self._ops
+        ops[key] = op
+        while len(ops) > maxsize:
+            ops.popitem(last=False)
+
+    def clear(self):
+        self._ops.clear()
+
+    def getStats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._ops),
+            'maxsize': self.config.size,
+        }
+
+
+# The most events applied by one call to a bulk event handler
+BULK_EVENT_MAX = 4096
+
+
 class VivWorkspaceCore(viv_impapi.ImportApi):
     def __init__(self):
         super(VivWorkspaceCore, self).__init__()
         # viv_impapi.ImportApi.__init__(self)
         self.loclist = []
         self.bigend = False
-        self.locmap = e_page.MapLookup()
-        self.blockmap = e_page.MapLookup()
+        self.locmap = e_page.IntervalLookup()
+        self.blockmap = e_page.IntervalLookup()
         self._mods_loaded = False
 
         # Storage for function local symbols
@@ -172,6 +228,10 @@ class VivWorkspaceCore(viv_impapi.ImportApi):
 
         self._event_list = []
         self._event_saved = 0  # The index of the last "save" event...
+        self._event_ckpt = False  # Was the workspace loaded from a checkpoint?
+        self._fmod_defer = None  # (fva, fmnames) awaiting parallel analysis
+        self._event_batch = None  # [(event, einfo, local, skip), ...] (see eventBatch())
+        self._event_batchdepth = 0
 
         # Give ourself a structure namespace!
         self.vsbuilder = vs_builder.VStructBuilder()
@@ -206,6 +266,26 @@ class VivWorkspaceCore(viv_impapi.ImportApi):
             if self.getMeta('NoReturnApis', {}).get(linfo.lower()):
                 self.cfctx.addNoReturnAddr(lva)
 
+    def _handleADDLOCATIONS(self, locs):
+        # The bulk version of _handleADDLOCATION (see _fireEvents)
+        done = []
+        setmap = self.locmap.setMapLookup
+        noret = self.getMeta('NoReturnApis', {})
+        for loc in locs:
+            lva, lsize, ltype, linfo = loc
+            try:
+                setmap(lva, lsize, loc)
+            except Exception as e:
+                traceback.print_exc()
+                continue
+
+            done.append(loc)
+            if ltype == LOC_IMPORT and noret.get(linfo.lower()):
+                self.cfctx.addNoReturnAddr(lva)
+
+        self.loclist.extend(done)
+        return done
+
     def _handleDELLOCATION(self, loc):
         # FIXME delete xrefs
         lva, lsize, ltype, linfo = loc
@@ -282,26 +362,15 @@ class VivWorkspaceCore(viv_impapi.ImportApi):
         self.blockmap.setMapLookup(va, size, None)
 
     def _handleADDXREF(self, einfo):
-        fromva, tova, reftype, rflags = einfo
-        xr_to = self.xrefs_by_to.get(tova, None)
-        xr_from = self.xrefs_by_from.get(fromva, None)
-        if xr_to is None:
-            xr_to = []
-            self.xrefs_by_to[tova] = xr_to
-
-        if xr_from is None:
-            xr_from = []
-            self.xrefs_by_from[fromva] = xr_from
-
-        if einfo not in xr_to:  # Just check one for now
-            xr_to.append(einfo)
-            xr_from.append(einfo)
-            self.xrefs.append(einfo)
+        self.xrefs.addXref(einfo)
+
+    def _handleADDXREFS(self, einfos):
+        # The bulk version of _handleADDXREF (see _fireEvents)
+        self.xrefs.addXrefs(einfos)
+        return einfos
 
     def _handleDELXREF(self, einfo):
-        fromva, tova, reftype, refflags = einfo
-        self.xrefs_by_to[tova].remove(einfo)
-        self.xrefs_by_from[fromva].remove(einfo)
+        self.xrefs.delXref(einfo)
 
     def _handleSETNAME(self, einfo):
         va, name = einfo
@@ -331,6 +400,7 @@ class VivWorkspaceCore(viv_impapi.ImportApi):
         # On loading a new memory map, we need to crush a few
         # transmeta items...
         self.transmeta.pop('findPointers', None)
+        self.clearOpcodeCache()
 
     def _handleADDEXPORT(self, einfo):
         va, etype, name, filename = einfo
@@ -476,6 +546,12 @@ class VivWorkspaceCore(viv_impapi.ImportApi):
         self.ehand[VWE_SYMHINT] = self._handleSYMHINT
         self.ehand[VWE_AUTOANALFIN] = self._handleAUTOANALFIN
 
+        # Optional bulk handlers which apply a list of einfos for one
+        # event type at once and return the list they applied.
+        self.ehandbulk = [None for x in range(VWE_MAX)]
+        self.ehandbulk[VWE_ADDLOCATION] = self._handleADDLOCATIONS
+        self.ehandbulk[VWE_ADDXREF] = self._handleADDXREFS
+
         self.thand = [None for x in range(VTE_MAX)]
         self.thand[VTE_IAMLEADER] = self._handleIAMLEADER
         self.thand[VTE_FOLLOWME] = self._handleFOLLOWME
@@ -500,11 +576,19 @@ class VivWorkspaceCore(viv_impapi.ImportApi):
 
         try:
             if event & VTE_MASK:
+                # Keep channel ordering for anything already batched
+                if self._event_batch:
+                    self._flushEventBatch()
                 return self._fireTransEvent(event, einfo)
 
             # Do our main event processing
             self.ehand[event](einfo)
 
+            if self._event_batch is not None:
+                self._event_list.append((event, einfo))
+                self._event_batch.append((event, einfo, local, skip))
+                return
+
             # If we're supposed to call a server, do that.
             if self.server is not None and local is False:
                 self.server._fireEvent(event, einfo, skip=self.rchan)
@@ -524,11 +608,213 @@ class VivWorkspaceCore(viv_impapi.ImportApi):
         except Exception as e:
             traceback.print_exc()
 
+    def _fireEvents(self, events, local=False, skip=None):
+        """
+        Fire a list (or any iterable) of (event, einfo) tuples as a single
+        batch (see eventBatch()).  Runs of the same event type are applied
+        with the bulk handler for that type (if there is one).
+        """
+        with self.eventBatch():
+            run = []
+            runevent = None
+            for event, einfo in events:
+                if event != runevent or len(run) >= BULK_EVENT_MAX:
+                    self._fireEventRun(runevent, run, local, skip)
+                    run = []
+                    runevent = event
+                run.append(einfo)
+
+            self._fireEventRun(runevent, run, local, skip)
+
+    def _fireEventRun(self, event, einfos, local, skip):
+        bulk = None
+        if len(einfos) > 1 and not event & VTE_MASK:
+            bulk = self.ehandbulk[event]
+
+        if bulk is None:
+            for einfo in einfos:
+                self._fireEvent(event, einfo, local=local, skip=skip)
+            return
+
+        try:
+            einfos = bulk(einfos)
+        except Exception as e:
+            traceback.print_exc()
+            return
+
+        for einfo in einfos:
+            self._event_list.append((event, einfo))
+            self._event_batch.append((event, einfo, local, skip))
+
+    @contextlib.contextmanager
+    def eventBatch(self):
+        """
+        Group the events fired within the context into one batch.  Each
+        event is still applied to the workspace (and recorded in the event
+        list) as it is fired, but the batch is sent to the server and put
+        into each event channel as a single list once the (outermost)
+        context exits.
+
+        Example:
+            with vw.eventBatch():
+                for va in vas:
+                    vw.makeName(va, 'foo_%.8x' % va)
+        """
+        if self._event_batch is None:
+            self._event_batch = []
+
+        self._event_batchdepth += 1
+        try:
+            yield
+        finally:
+            self._event_batchdepth -= 1
+            if self._event_batchdepth == 0:
+                try:
+                    self._flushEventBatch()
+                finally:
+                    self._event_batch = None
+
+    def _flushEventBatch(self):
+        """
+        Send the pending batch of events to the server and event channels.
+        """
+        batch = self._event_batch
+        if not batch:
+            return
+
+        self._event_batch = []
+
+        if self.server is not None:
+            events = [(event, einfo) for (event, einfo, local, skip) in batch if local is False]
+            if events:
+                try:
+                    # Older servers only accept one event at a time
+                    try:
+                        fevents = self.server._fireEvents
+                    except Exception:
+                        fevents = None
+
+                    if fevents is not None:
+                        fevents(events, skip=self.rchan)
+                    else:
+                        for event, einfo in events:
+                            self.server._fireEvent(event, einfo, skip=self.rchan)
+                except Exception as e:
+                    traceback.print_exc()
+
+        for chanid, q in list(self.chan_lookup.items()):
+            events = [(event, einfo) for (event, einfo, local, skip) in batch if skip != chanid]
+            if not events:
+                continue
+            try:
+                q.put_nowait(events)
+            except queue.Full as e:
+                print("FULL QUEUE DO SOMETHING")
+
     def _fireTransEvent(self, event, einfo):
         for q in list(self.chan_lookup.values()):
             q.put((event, einfo))
         return self.thand[event ^ VTE_MASK](event, einfo)
 
+    def _exportCheckpoint(self):
+        """
+        Build a checkpoint dict of the materialized workspace state
+        (as python primitives suitable for a storage module).
+        """
+        return {
+            'version': CKPT_VERSION,
+            'metadata': dict(self.metadata),
+            'filemeta': dict([(fname, dict(fmeta)) for fname, fmeta in self.filemeta.items()]),
+            'mmaps': [(mva, mperms, mname, mbytes) for (mva, mmaxva, (x, msize, mperms, mname), mbytes) in self._map_defs],
+            'segments': list(self.segments),
+            'relocations': list(self.relocations),
+            'exports': list(self.exports),
+            'locations': list(self.loclist),
+            'xrefs': list(self.getXrefs()),
+            'names': list(self.name_by_va.items()),
+            'funcmeta': dict([(fva, dict(fmeta)) for fva, fmeta in self.funcmeta.items()]),
+            'funcargs': dict(self.func_args),
+            'codeblocks': list(self.codeblocks),
+            'comments': dict(self.comments),
+            'colormaps': dict(self.colormaps),
+            'vasetdefs': dict(self.vasetdefs),
+            'vasets': dict([(name, list(vals.values())) for name, vals in self.vasets.items()]),
+            'frefs': [(va, idx, val) for (va, idx), val in self.frefs.items()],
+            'symhints': [(va, idx, hint) for (va, idx), hint in self.symhints.items()],
+        }
+
+    def _importCheckpoint(self, ckpt):
+        """
+        Bulk construct the workspace structures from a checkpoint
+        (see _exportCheckpoint) without replaying events.
+        """
+        if ckpt.get('version') != CKPT_VERSION:
+            raise Exception('Unknown Checkpoint Version: %r' % (ckpt.get('version'),))
+
+        # Meta first, the callbacks set up arch/endian/structs/etc.
+        for name, value in ckpt['metadata'].items():
+            self._handleSETMETA((name, value))
+        self.metadata.update(ckpt['metadata'])
+
+        for fname, fmeta in ckpt['filemeta'].items():
+            self.filemeta[fname] = fmeta
+
+        for mmap in ckpt['mmaps']:
+            self._handleADDMMAP(mmap)
+
+        self.segments.extend(ckpt['segments'])
+        for reloc in ckpt['relocations']:
+            self.reloc_by_va[reloc[0]] = reloc[1]
+        self.relocations.extend(ckpt['relocations'])
+
+        locs = ckpt['locations']
+        self.loclist.extend(locs)
+        self.locmap.setMapLookups([(loc[L_VA], loc[L_SIZE], loc) for loc in locs])
+        noret = self.getMeta('NoReturnApis', {})
+        for lva, lsize, ltype, linfo in locs:
+            if ltype == LOC_IMPORT and noret.get(linfo.lower()):
+                self.cfctx.addNoReturnAddr(lva)
+
+        for xref in ckpt['xrefs']:
+            self._handleADDXREF(xref)
+
+        for va, name in ckpt['names']:
+            self.name_by_va[va] = name
+            self.va_by_name[name] = va
+
+        for export in ckpt['exports']:
+            self.exports.append(export)
+            self.exports_by_va[export[0]] = export
+
+        # Functions must exist before their codeblocks, and codeblocks
+        # must exist before the function meta callbacks (call graph)
+        funcmeta = ckpt['funcmeta']
+        for fva in funcmeta.keys():
+            self._initFunction(fva)
+
+        cbs = ckpt['codeblocks']
+        self.codeblocks.extend(cbs)
+        self.blockmap.setMapLookups([(cb[CB_VA], cb[CB_SIZE], cb) for cb in cbs])
+        for cb in cbs:
+            self.codeblocks_by_funcva.get(cb[CB_FUNCVA]).append(cb)
+
+        for fva, fmeta in funcmeta.items():
+            self._handleADDFUNCTION((fva, fmeta))
+        self.func_args.update(ckpt['funcargs'])
+
+        self.comments.update(ckpt['comments'])
+        self.colormaps.update(ckpt['colormaps'])
+        for name, defs in ckpt['vasetdefs'].items():
+            self._handleADDVASET((name, defs, ckpt['vasets'].get(name, ())))
+
+        for va, idx, val in ckpt['frefs']:
+            self.frefs[(va, idx)] = val
+        for va, idx, hint in ckpt['symhints']:
+            self.symhints[(va, idx)] = hint
+
+        # There is no complete event history once loaded from a checkpoint
+        self._event_ckpt = True
+
     def _initFunction(self, funcva):
         # Internal function to initialize all datastructures necessary for
         # a function, but only if they haven't been done already.
@@ -562,6 +848,7 @@ class VivWorkspaceCore(viv_impapi.ImportApi):
 
         archid = envi.getArchByName(value)
         self.setMemArchitecture(archid)
+        self.clearOpcodeCache()
 
         # Default calling convention for architecture
         # This will be superceded by Platform and Parser settings
@@ -571,6 +858,7 @@ class VivWorkspaceCore(viv_impapi.ImportApi):
 
     def _mcb_bigend(self, name, value):
         self.setEndian(bool(value))
+        self.clearOpcodeCache()
 
     def _mcb_Platform(self, name, value):
         # Default calling convention for platform
@@ -608,6 +896,66 @@ class VivWorkspaceCore(viv_impapi.ImportApi):
         self.localsyms[fva][spdelta] = locsym
 
 
+def checkpointEvents(ckpt):
+    """
+    Yield a (compacted) sequence of (event, einfo) tuples which will
+    rebuild the state captured in the given checkpoint when replayed.
+    """
+    for name, value in ckpt['metadata'].items():
+        yield VWE_SETMETA, (name, value)
+
+    for fname, fmeta in ckpt['filemeta'].items():
+        yield VWE_ADDFILE, (fname, fmeta.get('imagebase'), fmeta.get('md5sum'))
+        for key, value in fmeta.items():
+            if key not in ('imagebase', 'md5sum'):
+                yield VWE_SETFILEMETA, (fname, key, value)
+
+    for mmap in ckpt['mmaps']:
+        yield VWE_ADDMMAP, mmap
+
+    for seg in ckpt['segments']:
+        yield VWE_ADDSEGMENT, seg
+
+    for reloc in ckpt['relocations']:
+        yield VWE_ADDRELOC, reloc
+
+    for loc in ckpt['locations']:
+        yield VWE_ADDLOCATION, loc
+
+    for xref in ckpt['xrefs']:
+        yield VWE_ADDXREF, xref
+
+    for export in ckpt['exports']:
+        yield VWE_ADDEXPORT, export
+
+    for va, name in ckpt['names']:
+        yield VWE_SETNAME, (va, name)
+
+    for fva, fmeta in ckpt['funcmeta'].items():
+        yield VWE_ADDFUNCTION, (fva, fmeta)
+
+    for cb in ckpt['codeblocks']:
+        yield VWE_ADDCODEBLOCK, cb
+
+    for fva, args in ckpt['funcargs'].items():
+        yield VWE_SETFUNCARGS, (fva, args)
+
+    for va, comment in ckpt['comments'].items():
+        yield VWE_COMMENT, (va, comment)
+
+    for mapname, colmap in ckpt['colormaps'].items():
+        yield VWE_ADDCOLOR, (mapname, colmap)
+
+    for name, defs in ckpt['vasetdefs'].items():
+        yield VWE_ADDVASET, (name, defs, ckpt['vasets'].get(name, ()))
+
+    for fref in ckpt['frefs']:
+        yield VWE_ADDFREF, fref
+
+    for hint in ckpt['symhints']:
+        yield VWE_SYMHINT, hint
+
+
 def trackDynBranches(cfctx, op, vw, bflags, branches):
     """
     track dynamic branches
@@ -679,15 +1027,18 @@ class VivCodeFlowContext(e_codeflow.CodeFlowContext):
         vw._fireEvent(VWE_ADDFUNCTION, (fva, fmeta))
 
         # Go through the function analysis modules in order
+        deferred = []
         for fmname in vw.fmodlist:
-            fmod = vw.fmods.get(fmname)
-            try:
-                fmod.analyzeFunction(vw, fva)
-            except Exception as e:
-                if vw.verbose:
-                    traceback.print_exc()
-                vw.verbprint("Function Analysis Exception for 0x%x   %s: %s" % (fva, fmod.__name__, e))
-                vw.setFunctionMeta(fva, "%s fail" % fmod.__name__, traceback.format_exc())
+            # In parallel analysis, the emulation passes are done later
+            # (see vivisect.parallel)
+            if vw._fmod_defer is not None and fmname in viv_parallel.parallel_fmods:
+                deferred.append(fmname)
+                continue
+
+            viv_parallel.analyzeFunctionModule(vw, fmname, fva)
+
+        if deferred:
+            vw._fmod_defer.append((fva, deferred))
 
         fname = vw.getName(fva)
         if vw.getMeta('NoReturnApis').get(fname.lower()):
@@ -5,7 +5,12 @@ defconfig = {
 
         'SymbolCacheSave':True,
 
+        'opcache':{
+            'size':0x10000,
+        },
+
         'parsers':{
+            'mmap':False,
             'pe':{
                 'loadresources':False,
                 'carvepes':True,
@@ -30,6 +35,10 @@ defconfig = {
             'pointertables':{
                 'table_min_len':4,
             },
+            'parallel':{
+                'procs':0,
+                'chunksize':32,
+            },
         },
     },
     'cli':vdb.defconfig.get('cli'), # FIXME make our own...
@@ -45,7 +54,12 @@ docconfig = {
 
         'SymbolCacheSave':'Save vivisect names to the vdb configured symbol cache?',
 
+        'opcache':{
+            'size':'How many decoded opcodes should parseOpcode cache? (0 for none)',
+        },
+
         'parsers':{
+            'mmap':'Should memory maps reference (mmap) the input file rather than copy its bytes?',
             'pe':{
                 'loadresources':'Should we load resource segments?',
                 'carvepes':'Should we carve pes?',
@@ -70,6 +84,10 @@ docconfig = {
             'pointertables':{
                 'table_min_len':'How many pointers must be in a row to make a table?',
             },
+            'parallel':{
+                'procs':'How many worker processes to use for function emulation analysis? (0 for none)',
+                'chunksize':'How many functions does each worker analyze from one copy of the workspace?',
+            },
         },
 
     },
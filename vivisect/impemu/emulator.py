@@ -155,7 +155,17 @@ class WorkspaceEmulator:
         # getByteDef etc... use it.
         op = self.opcache.get(pc)
         if op is None:
-            op = envi.Emulator.parseOpcode(self, pc)
+            # Opcodes for code we haven't written to are shared by all
+            # the workspace emulators (in the workspace's cache)
+            clean = not self.isDirtyMemory(pc, 16)
+            if clean:
+                op = self.vw._emu_op_cache.get(pc)
+
+            if op is None:
+                op = envi.Emulator.parseOpcode(self, pc)
+                if clean:
+                    self.vw._emu_op_cache.put(pc, op)
+
             self.opcache[pc] = op
         return op
 
@@ -539,7 +549,7 @@ class WorkspaceEmulator:
         if self._safe_mem and not probeok:
             return
 
-        return e_mem.MemoryObject.writeMemory(self, va, bytes)
+        return e_mem.PagedMemoryObject.writeMemory(self, va, bytes)
 
     def logUninitRegUse(self, regid):
         self.uninit_use[regid] = True
@@ -567,7 +577,7 @@ class WorkspaceEmulator:
         if self._safe_mem and not probeok:
             return b'A' * size
 
-        return e_mem.MemoryObject.readMemory(self, va, size)
+        return e_mem.PagedMemoryObject.readMemory(self, va, size)
 
     # Some APIs for telling if pointers are in runtime memory regions
 
@@ -0,0 +1,208 @@
+"""
+Process pool helpers for running the emulation heavy parts of
+workspace analysis in parallel.
+
+Workers are forked from the workspace process, so each has a read-only
+(copy on write) copy of the workspace (and its memory maps) as it was
+when the work was handed out.  Jobs are split into fixed size chunks
+and every chunk is run by a freshly forked worker, so results depend
+only on the workspace and the job list (not on the number of processes
+or scheduling) and are returned in job order.
+
+Function analysis modules listed in parallel_fmods are deferred while
+VivWorkspace.analyze() is running in parallel mode.  Each worker runs
+them for its functions and returns the events it generated, which the
+parent applies in the order the functions were created.  If those events
+do more than annotate the function (ie. they create new functions or
+conflict with locations the parent has), the result is thrown away and
+the function is analyzed again in the parent.
+
+Parallel analysis is enabled using the viv.analysis.parallel.procs option
+and is only available where the "fork" start method is.
+"""
+import multiprocessing
+import traceback
+
+from vivisect.const import *
+
+# Function analysis modules which spend their time emulating and may run
+# in a worker process.
+parallel_fmods = (
+    'vivisect.analysis.i386.calling',
+    'vivisect.analysis.amd64.emulation',
+)
+
+# Events a worker's function analysis may produce and still be applied
+# in the parent as-is.
+func_events = set([
+    VWE_ADDLOCATION,
+    VWE_ADDXREF,
+    VWE_ADDFREF,
+    VWE_COMMENT,
+    VWE_SETFUNCMETA,
+    VWE_SETFUNCARGS,
+    VWE_ADDVASET,
+    VWE_SETVASETROW,
+    VWE_SYMHINT,
+])
+
+# The forked workers pick these up from the parent
+_pool_vw = None
+_pool_func = None
+
+
+def getParallelProcs(vw):
+    """
+    Return the number of worker processes to use for analysis of the
+    given workspace (0 means analyze serially).
+    """
+    procs = vw.config.viv.analysis.parallel.procs
+    if procs < 2:
+        return 0
+
+    # Remote workspaces must fire events through their server
+    if vw.server is not None:
+        return 0
+
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return 0
+
+    return procs
+
+
+def _poolChunk(jobs):
+    return [_pool_func(_pool_vw, job) for job in jobs]
+
+
+def parallelMap(vw, func, jobs):
+    """
+    Return a list of func(vw, job) for each of jobs, computed in forked
+    worker processes.  Anything func does to the workspace is discarded,
+    so any changes must be made by the caller from the results.
+
+    Example:
+        def isGoodCode(vw, va):
+            return doSomeEmulation(vw, va)
+
+        for va, good in zip(vas, parallelMap(vw, isGoodCode, vas)):
+            if good:
+                vw.makeFunction(va)
+    """
+    global _pool_vw, _pool_func
+
+    chunksize = vw.config.viv.analysis.parallel.chunksize
+    chunks = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+
+    _pool_vw = vw
+    _pool_func = func
+    try:
+        ctx = multiprocessing.get_context('fork')
+        procs = min(getParallelProcs(vw), len(chunks))
+        # maxtasksperchild=1 means every chunk starts from the same fork
+        pool = ctx.Pool(procs, maxtasksperchild=1)
+        try:
+            results = pool.map(_poolChunk, chunks, chunksize=1)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    finally:
+        _pool_vw = None
+        _pool_func = None
+
+    ret = []
+    for chunk in results:
+        ret.extend(chunk)
+    return ret
+
+
+def analyzeFunctionModule(vw, fmname, fva):
+    """
+    Run the named function analysis module on the given function.
+    """
+    fmod = vw.fmods.get(fmname)
+    try:
+        fmod.analyzeFunction(vw, fva)
+    except Exception as e:
+        if vw.verbose:
+            traceback.print_exc()
+        vw.verbprint("Function Analysis Exception for 0x%x   %s: %s" % (fva, fmod.__name__, e))
+        vw.setFunctionMeta(fva, "%s fail" % fmod.__name__, traceback.format_exc())
+
+
+def _analyzeFunctionJob(vw, job):
+    fva, fmnames = job
+    mark = len(vw._event_list)
+    for fmname in fmnames:
+        analyzeFunctionModule(vw, fmname, fva)
+    return vw._event_list[mark:]
+
+
+def _checkFunctionEvents(vw, events):
+    for event, einfo in events:
+        if event not in func_events:
+            return False
+
+        if event == VWE_ADDLOCATION:
+            lva, lsize, ltype, linfo = einfo
+            for va in range(lva, lva + lsize):
+                loc = vw.getLocation(va)
+                if loc is not None and loc != einfo:
+                    return False
+
+    return True
+
+
+def applyFunctionEvents(vw, events):
+    """
+    Apply the events from a worker's function analysis to the workspace,
+    skipping any which the workspace already has.  Returns False (and
+    changes nothing) if the events may not be applied this way.
+    """
+    if not _checkFunctionEvents(vw, events):
+        return False
+
+    for event, einfo in events:
+        if event == VWE_ADDLOCATION:
+            if vw.getLocation(einfo[L_VA]) == einfo:
+                continue
+
+        elif event == VWE_ADDXREF:
+            if vw.xrefs.hasXref(einfo):
+                continue
+
+        elif event == VWE_ADDVASET:
+            if einfo[0] in vw.vasets:
+                continue
+
+        vw._fireEvent(event, einfo)
+
+    return True
+
+
+def analyzeDeferredFunctions(vw):
+    """
+    Run the parallel function analysis modules which were deferred for
+    the functions created since the last call.
+    """
+    chunksize = vw.config.viv.analysis.parallel.chunksize
+    while vw._fmod_defer:
+        jobs = vw._fmod_defer
+        vw._fmod_defer = []
+
+        results = [None] * len(jobs)
+        if len(jobs) > chunksize:
+            try:
+                results = parallelMap(vw, _analyzeFunctionJob, jobs)
+            except Exception as e:
+                if vw.verbose:
+                    traceback.print_exc()
+                vw.verbprint("Parallel Analysis Exception (analyzing serially): %s" % e)
+
+        # Any functions these create are deferred for the next pass
+        for (fva, fmnames), events in zip(jobs, results):
+            if events is not None and applyFunctionEvents(vw, events):
+                continue
+
+            for fmname in fmnames:
+                analyzeFunctionModule(vw, fmname, fva)
@@ -2,12 +2,13 @@ import time
 import vivisect
 import vivisect.cli as viv_cli
 import vivisect.qt.main as viv_qt_main
+import vivisect.remote.share as viv_share
 
 def remotemain(appsrv):
 
     # The "appsrv" is a remote workspace...
     vw = viv_cli.VivCli()
-    vw.initWorkspaceClient(appsrv)
+    vw.initWorkspaceClient(viv_share.VivSharedClient(appsrv))
 
     # If we are interactive, lets turn on extended output...
     vw.verbose = True
@@ -24,6 +24,9 @@ timeo_wait = 10
 timeo_sock = 30
 timeo_aban = 120  # 2 minute timeout for abandon
 
+# The most events handed to a client channel at once
+chunk_events = 100000
+
 # This should *only* rev when they're truly incompatible
 server_version = 20130820
 
@@ -54,18 +57,156 @@ class VivServerClient:
     def _fireEvent(self, event, einfo, local=False, skip=None):
         return self.server._fireEvent(self.wsname, event, einfo, local=local, skip=skip)
 
+    def _fireEvents(self, events, local=False, skip=None):
+        return self.server._fireEvents(self.wsname, events, local=local, skip=skip)
+
     def createEventChannel(self):
         self.chan = self.server.createEventChannel(self.wsname)
-        self._eatServerEvents()
         return self.chan
 
     def exportWorkspace(self):
-        # Retrieve the big initial list of viv events
-        return self.server.getNextEvents(self.chan)
+        '''
+        Stream the existing workspace events from the server (in chunks)
+        and then start eating new events from the channel.
+        '''
+        while True:
+            events = self.server.getNextEvents(self.chan)
+            for event in events:
+                yield event
+
+            if len(events) < chunk_events:
+                break
+
+        self._eatServerEvents()
 
     def waitForEvent(self, chan):
         return self.q.get()
 
+    def waitForEvents(self, chan):
+        events = [self.q.get()]
+        while True:
+            try:
+                events.append(self.q.get_nowait())
+            except queue.Empty:
+                return events
+
+
+class ServerWorkspace:
+    '''
+    The state the server keeps for one workspace: a single, append only,
+    in memory event log which is shared by every client channel.  Each
+    channel is just a cursor into the log, so connecting clients neither
+    re-read the workspace file nor copy the events.  The file is loaded
+    the first time the log is needed and saves only append the events
+    added since the last save.
+    '''
+
+    def __init__(self, path, events=None):
+        self.path = path
+        self.cond = threading.Condition()
+
+        self.events = events  # the shared log (None until loaded)
+        self.saved = 0  # how much of the log is in the file
+        if events is not None:
+            self.saved = len(events)
+
+        self.skips = {}  # log index -> channel which fired (and has) it
+        self.trans = set()  # log indexes of transient events (never saved)
+
+        # chan -> [offset, start, lastcheckin]
+        self.chans = {}
+
+    def _reqEvents(self):
+        # NOTE: must hold self.cond
+        if self.events is None:
+            self.events = viv_basicfile.vivEventsFromFile(self.path)
+            self.saved = len(self.events)
+        return self.events
+
+    def addChannel(self, chan):
+        with self.cond:
+            self._reqEvents()
+            self.chans[chan] = [0, len(self.events), time.time()]
+
+    def delChannel(self, chan):
+        with self.cond:
+            self.chans.pop(chan, None)
+            for idx in [idx for idx, skip in self.skips.items() if skip == chan]:
+                self.skips.pop(idx)
+
+    def abandoned(self, chan, dtime):
+        cursor = self.chans.get(chan)
+        if cursor is None:
+            return True
+        return time.time() > (cursor[2] + dtime)
+
+    def addEvents(self, events, skip=None):
+        with self.cond:
+            log = self._reqEvents()
+            for evtup in events:
+                idx = len(log)
+                if evtup[0] & VTE_MASK:
+                    self.trans.add(idx)
+                if skip is not None:
+                    self.skips[idx] = skip
+                log.append(evtup)
+
+            self.cond.notify_all()
+
+    def getNextEvents(self, chan, timeout=None):
+        '''
+        Return the next chunk of events for the given channel (waiting up
+        to timeout seconds for more events if the channel is caught up).
+        '''
+        with self.cond:
+            cursor = self.chans.get(chan)
+            if cursor is None:
+                raise Exception('Invalid Channel: %s' % chan)
+
+            cursor[2] = time.time()
+            if cursor[0] >= len(self.events):
+                self.cond.wait(timeout)
+
+            offset = cursor[0]
+            endoff = min(len(self.events), offset + chunk_events)
+            cursor[0] = endoff
+            cursor[2] = time.time()
+
+            events = self.events[offset:endoff]
+            if not self.skips and not self.trans:
+                return events
+
+            # Drop events the channel fired itself, and transient events
+            # from before it connected.
+            ret = []
+            start = cursor[1]
+            for idx, evtup in enumerate(events, offset):
+                if self.skips.get(idx) == chan:
+                    # Only this channel cares, and it is past it now
+                    self.skips.pop(idx)
+                    continue
+                if idx < start and idx in self.trans:
+                    continue
+                ret.append(evtup)
+            return ret
+
+    def save(self):
+        '''
+        Append any events added since the last save to the workspace file.
+        '''
+        with self.cond:
+            if self.events is None or self.saved == len(self.events):
+                return
+            offset = self.saved
+            endoff = len(self.events)
+            events = [self.events[i] for i in range(offset, endoff) if i not in self.trans]
+
+        if events:
+            viv_basicfile.vivEventsAppendFile(self.path, events)
+
+        with self.cond:
+            self.saved = endoff
+
 
 class VivServer:
     def __init__(self, dirname=""):
@@ -89,29 +230,21 @@ class VivServer:
     def _maintThread(self):
 
         for chan in list(self.chandict.keys()):
-            chaninfo = self.chandict.get(chan)
+            wsinfo = self.chandict.get(chan)
             # NOTE: double check because we're lock free...
-            if chaninfo == None:
+            if wsinfo == None:
                 continue
 
-            wsinfo, queue = chaninfo
-            if queue.abandoned(timeo_aban):
+            if wsinfo.abandoned(chan, timeo_aban):
                 # Remove from our chandict
                 self.chandict.pop(chan, None)
                 # Remove from the workspace clients
-                lock, fpath, pevents, users = wsinfo
-                with lock:
-                    users.pop(chan, None)
+                wsinfo.delChannel(chan)
 
     @e_threads.maintthread(30)
     def _saveWorkspaceThread(self):
         for wsinfo in list(self.wsdict.values()):
-            lock, path, events, users = wsinfo
-            if events:
-                with lock:
-                    wsinfo[2] = []  # start a new events list...
-
-                viv_basicfile.vivEventsAppendFile(path, events)
+            wsinfo.save()
 
     def _req_wsinfo(self, wsname):
         wsinfo = self.wsdict.get(wsname)
@@ -138,19 +271,19 @@ class VivServer:
         if not os.path.isdir(wsdir):
             os.makedirs(wsdir, 0o750)
 
+        events = list(events)
         viv_basicfile.vivEventsToFile(wspath, events)
-        wsinfo = [threading.Lock(), wspath, [], {}]
-        self.wsdict[wsname] = wsinfo
+        self.wsdict[wsname] = ServerWorkspace(wspath, events=events)
 
     def _loadWorkspaces(self):
 
         # First, ditch any that are missing
         for wsname in list(self.wsdict.keys()):
             wsinfo = self.wsdict.get(wsname)
-            if not os.path.isfile(wsinfo[1]):
+            if not os.path.isfile(wsinfo.path):
                 self.wsdict.pop(wsname, None)
 
-        def checkWorkspaceDir(arg, dirname, filenames):
+        for dirname, dirnames, filenames in os.walk(self.path):
 
             for filename in filenames:
                 wspath = os.path.join(dirname, filename)
@@ -159,52 +292,40 @@ class VivServer:
                 if not os.path.isfile(wspath):
                     continue
 
-                if not open(wspath, 'rb').read(3) == 'VIV':
-                    continue
+                with open(wspath, 'rb') as f:
+                    if f.read(3) != b'VIV':
+                        continue
 
                 wsinfo = self.wsdict.get(wsname)
                 if wsinfo == None:
-                    # Initialize the workspace info tuple
-                    lock = threading.Lock()
-                    wsinfo = [lock, wspath, [], {}]
+                    # Initialize the workspace info (events load on demand)
+                    wsinfo = ServerWorkspace(wspath)
                     print(('loaded: %s' % wsname))
                     self.wsdict[wsname] = wsinfo
 
-        os.path.walk(self.path, checkWorkspaceDir, None)
-
     def getNextEvents(self, chan):
-        chaninfo = self.chandict.get(chan)
-        if chaninfo == None:
+        wsinfo = self.chandict.get(chan)
+        if wsinfo == None:
             raise Exception('Invalid Channel: %s' % chan)
-        return chaninfo[1].get(timeout=timeo_wait)
+        return wsinfo.getNextEvents(chan, timeout=timeo_wait)
 
     # All APIs from here down are basically mirrors of the workspace APIs
     # used with remote workspaces, with a prepended wsname first argument
 
     def _fireEvent(self, wsname, event, einfo, local=False, skip=None):
-        lock, fpath, pevents, users = self._req_wsinfo(wsname)
-        evtup = (event, einfo)
-        with lock:
-            # Transient events do not get saved
-            if not event & VTE_MASK:
-                pevents.append(evtup)
-            # SPEED HACK
-            [q.append(evtup) for (chan, q) in list(users.items()) if chan != skip]
+        wsinfo = self._req_wsinfo(wsname)
+        wsinfo.addEvents(((event, einfo),), skip=skip)
+
+    def _fireEvents(self, wsname, events, local=False, skip=None):
+        wsinfo = self._req_wsinfo(wsname)
+        wsinfo.addEvents([tuple(evtup) for evtup in events], skip=skip)
 
     def createEventChannel(self, wsname):
         wsinfo = self._req_wsinfo(wsname)
-        chan = os.urandom(16).encode('hex')
-
-        lock, fpath, pevents, users = wsinfo
-        with lock:
-            events = []
-            events.extend(viv_basicfile.vivEventsFromFile(fpath))
-            events.extend(pevents)
-            # These must reference the same actual list object...
-            queue = e_threads.ChunkQueue(items=events)
-            users[chan] = queue
-            self.chandict[chan] = [wsinfo, queue]
+        chan = os.urandom(16).hex()
 
+        wsinfo.addChannel(chan)
+        self.chandict[chan] = wsinfo
         return chan
 
 
@@ -1,9 +1,124 @@
+import queue
+import itertools
+import traceback
+
+import cobra
 import cobra.dcode
 import cobra.remoteapp
 
+import vivisect
+import envi.threads as e_threads
+
+
 def shareWorkspace(vw, doref=False):
     daemon = cobra.CobraDaemon('', 0, msgpack=True)
     daemon.fireThread()
     cobra.dcode.enableDcodeServer(daemon=daemon)
     cobra.remoteapp.shareRemoteApp('vivisect.remote.client', appsrv=vw, daemon=daemon)
     return daemon
+
+
+class VivSharedClient:
+    '''
+    Implement "glue" methods for a local workspace to be a client of a
+    (cobra proxied) workspace shared with shareWorkspace().
+
+    The local workspace is a replica built from the shared workspace's
+    events and kept up to date from its event channel, so reads such as
+    getLocation(), getName() and readMemory() never leave the client.
+    Events fired locally are queued and forwarded ( in order, and in
+    batches ) by one thread, so mutations do not wait on a round trip.
+    '''
+
+    def __init__(self, remotevw):
+        self.remotevw = remotevw
+        self.fwdq = queue.Queue()
+
+        # Older workspaces only accept one event at a time
+        try:
+            self.fireevents = remotevw._fireEvents
+        except Exception:
+            self.fireevents = None
+
+        self._forwardEvents()
+
+    def vprint(self, msg):
+        return self.remotevw.vprint(msg)
+
+    def createEventChannel(self):
+        return self.remotevw.createEventChannel()
+
+    def deleteEventChannel(self, chan):
+        return self.remotevw.deleteEventChannel(chan)
+
+    def exportWorkspace(self):
+        return self.remotevw.exportWorkspace()
+
+    def waitForEvent(self, chan):
+        return self.remotevw.waitForEvent(chan)
+
+    def waitForEvents(self, chan):
+        return self.remotevw.waitForEvents(chan)
+
+    def _fireEvent(self, event, einfo, local=False, skip=None):
+        self.fwdq.put(([(event, einfo)], skip))
+
+    def _fireEvents(self, events, local=False, skip=None):
+        self.fwdq.put((list(events), skip))
+
+    def flushEvents(self):
+        '''
+        Wait until every event fired so far has been sent to the shared
+        workspace.
+        '''
+        self.fwdq.join()
+
+    @e_threads.firethread
+    def _forwardEvents(self):
+        while True:
+            # Send everything which is waiting at once
+            batch = [self.fwdq.get()]
+            while True:
+                try:
+                    batch.append(self.fwdq.get_nowait())
+                except queue.Empty:
+                    break
+
+            for skip, fwds in itertools.groupby(batch, key=lambda fwd: fwd[1]):
+                events = []
+                for fevents, fskip in fwds:
+                    events.extend(fevents)
+
+                try:
+                    if self.fireevents is not None:
+                        self.fireevents(events, skip=skip)
+                    else:
+                        for event, einfo in events:
+                            self.remotevw._fireEvent(event, einfo, skip=skip)
+                except Exception as e:
+                    traceback.print_exc()
+
+            for fwd in batch:
+                self.fwdq.task_done()
+
+
+def getSharedWorkspace(uri, vw=None):
+    '''
+    Connect to a workspace shared with shareWorkspace() and return a local
+    replica of it ( see VivSharedClient ).  Specify vw to use your own
+    ( empty ) workspace object, such as a VivCli, as the replica.
+
+    Example:
+        vw = getSharedWorkspace('cobra://host:port/vivisect.remote.client?msgpack=1')
+        for fva in vw.getFunctions():
+            vw.makeName(fva, 'woot_%.8x' % fva)
+
+        # Wait for our changes to reach the shared workspace
+        vw.server.flushEvents()
+    '''
+    if vw is None:
+        vw = vivisect.VivWorkspace()
+
+    remotevw = cobra.CobraProxy(uri)
+    vw.initWorkspaceClient(VivSharedClient(remotevw))
+    return vw
@@ -4,3 +4,23 @@ a workspace.  the saveWorkspace and loadWorkspace functions
 each take a string for "backing info"
 """
 
+
+# File signatures for the storage modules which may be sniffed on load
+storage_sigs = (
+    (b'VIVBIN', 'vivisect.storage.binfile'),
+)
+
+
+def guessStorageModule(filename):
+    """
+    Return the name of the storage module for the given workspace file
+    based on its signature (or None if it doesn't have a known one).
+    """
+    with open(filename, 'rb') as f:
+        sig = f.read(8)
+
+    for magic, modname in storage_sigs:
+        if sig.startswith(magic):
+            return modname
+
+    return None
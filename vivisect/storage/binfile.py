@@ -0,0 +1,430 @@
+"""
+A binary, streaming storage module for vivisect workspaces.
+
+Events are written as length prefixed records using a compact tagged
+binary encoding (rather than one huge pickle) so a workspace may be
+loaded one event at a time with bounded memory.  Every save (full or
+incremental) ends with a footer record which indexes the records by
+event type, and a trailer record which points at the footer.
+
+File layout:
+    <magic>
+    <record> <record> ... <footer> <trailer>    (full save)
+    <record> <record> ... <footer> <trailer>    (each saveWorkspaceChanges)
+
+A checkpoint save replaces the full save event records with a single
+checkpoint record holding the materialized workspace state (see
+VivWorkspace.exportCheckpoint) which loads without event replay.
+
+Record layout:
+    <u32 payload length> <u16 record type> <payload>
+"""
+import array
+import struct
+import pickle
+import traceback
+
+import vivisect
+import vivisect.base as viv_base
+
+from vivisect.const import *
+
+vivsig_binfile = b'VIVBIN\x00\x01'
+
+rec_hdr = struct.Struct('<IH')
+rec_hdr_size = rec_hdr.size
+
+# Special (non-event) record types
+REC_CHECKPOINT = 0xfffd
+REC_FOOTER = 0xfffe
+REC_TRAILER = 0xffff
+
+trailer_fmt = struct.Struct('<Q')
+trailer_size = rec_hdr_size + trailer_fmt.size
+
+# Value encoding tags
+TAG_NONE = 0
+TAG_TRUE = 1
+TAG_FALSE = 2
+TAG_INT = 3
+TAG_NEGINT = 4
+TAG_BYTES = 5
+TAG_STR = 6
+TAG_TUPLE = 7
+TAG_LIST = 8
+TAG_DICT = 9
+TAG_FLOAT = 10
+TAG_PICKLE = 11
+
+float_fmt = struct.Struct('<d')
+
+
+def _encVarint(val, out):
+    while val > 0x7f:
+        out.append((val & 0x7f) | 0x80)
+        val >>= 7
+    out.append(val)
+
+
+def _decVarint(buf, off):
+    ret = 0
+    shift = 0
+    while True:
+        b = buf[off]
+        off += 1
+        ret |= (b & 0x7f) << shift
+        if not b & 0x80:
+            return ret, off
+        shift += 7
+
+
+def _encValue(val, out):
+    vtype = type(val)
+    if vtype is int:
+        if val >= 0:
+            out.append(TAG_INT)
+            _encVarint(val, out)
+        else:
+            out.append(TAG_NEGINT)
+            _encVarint(-val, out)
+
+    elif val is None:
+        out.append(TAG_NONE)
+
+    elif vtype is str:
+        b = val.encode('utf-8')
+        out.append(TAG_STR)
+        _encVarint(len(b), out)
+        out.extend(b)
+
+    elif vtype is tuple or vtype is list:
+        out.append(TAG_TUPLE if vtype is tuple else TAG_LIST)
+        _encVarint(len(val), out)
+        for v in val:
+            _encValue(v, out)
+
+    elif vtype is bool:
+        out.append(TAG_TRUE if val else TAG_FALSE)
+
+    elif vtype is bytes or vtype is bytearray:
+        out.append(TAG_BYTES)
+        _encVarint(len(val), out)
+        out.extend(val)
+
+    elif vtype is dict:
+        out.append(TAG_DICT)
+        _encVarint(len(val), out)
+        for k, v in val.items():
+            _encValue(k, out)
+            _encValue(v, out)
+
+    elif vtype is float:
+        out.append(TAG_FLOAT)
+        out.extend(float_fmt.pack(val))
+
+    else:
+        # Anything exotic (vstructs, sets, etc) goes the pickle route
+        b = pickle.dumps(val, protocol=2)
+        out.append(TAG_PICKLE)
+        _encVarint(len(b), out)
+        out.extend(b)
+
+
+def _decValue(buf, off):
+    tag = buf[off]
+    off += 1
+
+    if tag == TAG_INT:
+        return _decVarint(buf, off)
+
+    if tag == TAG_NONE:
+        return None, off
+
+    if tag == TAG_STR:
+        size, off = _decVarint(buf, off)
+        return bytes(buf[off:off + size]).decode('utf-8'), off + size
+
+    if tag == TAG_TUPLE or tag == TAG_LIST:
+        size, off = _decVarint(buf, off)
+        ret = []
+        for i in range(size):
+            val, off = _decValue(buf, off)
+            ret.append(val)
+        if tag == TAG_TUPLE:
+            ret = tuple(ret)
+        return ret, off
+
+    if tag == TAG_NEGINT:
+        val, off = _decVarint(buf, off)
+        return -val, off
+
+    if tag == TAG_TRUE:
+        return True, off
+
+    if tag == TAG_FALSE:
+        return False, off
+
+    if tag == TAG_BYTES:
+        size, off = _decVarint(buf, off)
+        return bytes(buf[off:off + size]), off + size
+
+    if tag == TAG_DICT:
+        size, off = _decVarint(buf, off)
+        ret = {}
+        for i in range(size):
+            key, off = _decValue(buf, off)
+            val, off = _decValue(buf, off)
+            ret[key] = val
+        return ret, off
+
+    if tag == TAG_FLOAT:
+        return float_fmt.unpack_from(buf, off)[0], off + float_fmt.size
+
+    if tag == TAG_PICKLE:
+        size, off = _decVarint(buf, off)
+        return pickle.loads(bytes(buf[off:off + size])), off + size
+
+    raise Exception('Invalid binfile value tag: %d' % tag)
+
+
+def encodeValue(val):
+    """
+    Encode a python primitive (or nested primitives) to bytes using the
+    binfile tagged encoding.
+    """
+    out = bytearray()
+    _encValue(val, out)
+    return bytes(out)
+
+
+def decodeValue(buf):
+    """
+    Decode a value previously encoded by encodeValue().
+    """
+    val, off = _decValue(buf, 0)
+    return val
+
+
+def _writeRecord(f, rtype, payload):
+    f.write(rec_hdr.pack(len(payload), rtype))
+    f.write(payload)
+
+
+def _writeEvents(f, events):
+    """
+    Write a segment of event records followed by its footer and
+    trailer.  The file object must be positioned at the end of
+    the file.
+    """
+    # Find the previous footer (if this is an append)
+    prevfoot = 0
+    offset = f.tell()
+    if offset > len(vivsig_binfile):
+        f.seek(offset - trailer_size)
+        prevfoot = _readTrailer(f)
+        f.seek(offset)
+
+    index = {}
+    for event, einfo in events:
+        offs = index.get(event)
+        if offs is None:
+            offs = array.array('Q')
+            index[event] = offs
+        offs.append(offset)
+
+        payload = bytearray()
+        _encValue(einfo, payload)
+        _writeRecord(f, event, payload)
+        offset += rec_hdr_size + len(payload)
+
+    footer = {
+        'prev': prevfoot,
+        'index': dict([(event, offs.tobytes()) for event, offs in index.items()]),
+    }
+
+    footoff = offset
+    _writeRecord(f, REC_FOOTER, encodeValue(footer))
+    _writeRecord(f, REC_TRAILER, trailer_fmt.pack(footoff))
+
+
+def _readTrailer(f):
+    hdr = f.read(rec_hdr_size)
+    size, rtype = rec_hdr.unpack(hdr)
+    if rtype != REC_TRAILER:
+        raise vivisect.InvalidWorkspace(f.name, 'invalid binfile trailer')
+    return trailer_fmt.unpack(f.read(size))[0]
+
+
+def _checkSig(f, filename):
+    if f.read(len(vivsig_binfile)) != vivsig_binfile:
+        raise vivisect.InvalidWorkspace(filename, 'not a binfile workspace')
+
+
+def vivEventsToFile(filename, events):
+    try:
+        with open(filename, 'wb') as f:
+            f.write(vivsig_binfile)
+            _writeEvents(f, events)
+    except Exception as e:
+        traceback.print_exc()
+
+
+def vivEventsAppendFile(filename, events):
+    with open(filename, 'r+b') as f:
+        _checkSig(f, filename)
+        f.seek(0, 2)
+        _writeEvents(f, events)
+
+
+def vivCheckpointToFile(filename, ckpt):
+    try:
+        with open(filename, 'wb') as f:
+            f.write(vivsig_binfile)
+            _writeEvents(f, [(REC_CHECKPOINT, ckpt)])
+    except Exception as e:
+        traceback.print_exc()
+
+
+def iterEventsFromFile(filename, skip=()):
+    """
+    Yield (event, einfo) tuples from the file one at a time.  Any event
+    types in skip are seeked over without being decoded.  A checkpoint
+    is yielded as the compacted events which rebuild its state.
+
+    Example:
+        # a headless job which doesn't care about colors or comments
+        skip = (VWE_ADDCOLOR, VWE_DELCOLOR, VWE_COMMENT)
+        for event, einfo in iterEventsFromFile(filename, skip=skip):
+            dostuff()
+    """
+    for rtype, rinfo in _iterRecords(filename, skip=skip):
+        if rtype == REC_CHECKPOINT:
+            for event, einfo in viv_base.checkpointEvents(rinfo):
+                if event not in skip:
+                    yield event, einfo
+            continue
+
+        yield rtype, rinfo
+
+
+def _iterRecords(filename, skip=()):
+    skip = set(skip)
+    skip.add(REC_FOOTER)
+    skip.add(REC_TRAILER)
+
+    with open(filename, 'rb') as f:
+        _checkSig(f, filename)
+
+        while True:
+            hdr = f.read(rec_hdr_size)
+            if not hdr:
+                break
+
+            if len(hdr) != rec_hdr_size:
+                raise vivisect.InvalidWorkspace(filename, 'truncated binfile record')
+
+            size, event = rec_hdr.unpack(hdr)
+            if event in skip:
+                f.seek(size, 1)
+                continue
+
+            payload = f.read(size)
+            if len(payload) != size:
+                raise vivisect.InvalidWorkspace(filename, 'truncated binfile record')
+
+            einfo, off = _decValue(payload, 0)
+            yield event, einfo
+
+
+def vivEventsFromFile(filename, skip=()):
+    return list(iterEventsFromFile(filename, skip=skip))
+
+
+def getEventIndex(filename):
+    """
+    Return a dict of event type to an array of record offsets (in file
+    order) built from the footers of every save segment in the file.
+    """
+    segs = []
+    with open(filename, 'rb') as f:
+        _checkSig(f, filename)
+
+        f.seek(-trailer_size, 2)
+        footoff = _readTrailer(f)
+        while footoff:
+            f.seek(footoff)
+            size, rtype = rec_hdr.unpack(f.read(rec_hdr_size))
+            if rtype != REC_FOOTER:
+                raise vivisect.InvalidWorkspace(filename, 'invalid binfile footer')
+
+            footer = decodeValue(f.read(size))
+            segs.append(footer['index'])
+            footoff = footer['prev']
+
+    ret = {}
+    for segidx in reversed(segs):
+        for event, offbytes in segidx.items():
+            offs = ret.get(event)
+            if offs is None:
+                offs = array.array('Q')
+                ret[event] = offs
+            offs.frombytes(offbytes)
+    return ret
+
+
+def getEventCounts(filename):
+    """
+    Return a dict of event type to number of events using only the index.
+    """
+    return dict([(event, len(offs)) for event, offs in getEventIndex(filename).items()])
+
+
+def iterEventsByType(filename, events):
+    """
+    Yield (event, einfo) tuples (in file order) for only the given event
+    types by seeking directly to their records using the footer index.
+
+    Example:
+        for event, (va, perms, fname, bytez) in iterEventsByType(filename, (VWE_ADDMMAP,)):
+            dostuff()
+    """
+    index = getEventIndex(filename)
+
+    offs = []
+    for event in events:
+        offs.extend(index.get(event, ()))
+    offs.sort()
+
+    with open(filename, 'rb') as f:
+        for off in offs:
+            f.seek(off)
+            size, event = rec_hdr.unpack(f.read(rec_hdr_size))
+            einfo, x = _decValue(f.read(size), 0)
+            yield event, einfo
+
+
+def saveWorkspaceChanges(vw, filename):
+    elist = vw.exportWorkspaceChanges()
+    if len(elist):
+        vivEventsAppendFile(filename, elist)
+
+
+def saveWorkspace(vw, filename):
+    events = vw.exportWorkspace()
+    vivEventsToFile(filename, events)
+
+
+def saveWorkspaceCheckpoint(vw, filename):
+    vivCheckpointToFile(filename, vw.exportCheckpoint())
+
+
+def _iterLoadEvents(vw, filename, skip):
+    for rtype, rinfo in _iterRecords(filename, skip=skip):
+        if rtype == REC_CHECKPOINT:
+            vw.importCheckpoint(rinfo)
+            continue
+        yield rtype, rinfo
+
+
+def loadWorkspace(vw, filename, skip=()):
+    vw.importWorkspace(_iterLoadEvents(vw, filename, skip))
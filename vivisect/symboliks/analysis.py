@@ -1,5 +1,6 @@
 import visgraph.pathcore as vg_pathcore
 import vivisect.tools.graphutil as viv_graph
+import vivisect.symboliks.paths as vsym_paths
 import vivisect.symboliks.effects as vsym_effects
 import vivisect.symboliks.emulator as vsym_emulator
 
@@ -340,6 +341,26 @@ class SymbolikAnalysisContext:
         self._sym_resolve = False
         self.preeffects = []
         self.preconstraints = []
+        # Shared (hash-consed) symboliks and their solve/reduce results
+        self.interner = SymbolikInterner()
+
+    def internSym(self, sym):
+        """
+        Return the canonical (hash-consed) version of the given symbolik
+        AST.  Structurally identical subtrees interned by this context are
+        the same object (and share their solve/str/repr caches).
+        """
+        return self.interner.intern(sym)
+
+    def reduceSym(self, sym, emu=None):
+        """
+        Fully reduce the given symbolik, re-using the reductions of any
+        subtrees previously reduced by this context.
+
+        Example:
+            ret = symctx.reduceSym(emu.getFunctionReturn(), emu=emu)
+        """
+        return self.interner.reduce(sym, emu=emu)
 
     def setSymPreEffects(self, effects):
         """
@@ -626,6 +647,25 @@ class SymbolikAnalysisContext:
                 emu.setMeta('opcodes', opcodes)
                 yield emu, patheffects
 
+    def streamSymbolikPaths(self, fva, graph=None, args=None, loopcnt=0,
+                            maxpath=1000, maxstates=256, checkpoint=None):
+        """
+        Return a SymbolikPathWalker which lazily yields emu, effects tuples
+        for each path through the function (like getSymbolikPaths()) while
+        sharing the emulator state and effects of common path prefixes.
+        The walker may be checkpointed and resumed (see vivisect.symboliks.paths).
+
+        Example:
+            walker = symctx.streamSymbolikPaths(fva, maxpath=50)
+            for emu, effects in walker:
+                dostuff(emu, effects)
+
+            ckpt = walker.getCheckpoint()
+        """
+        return vsym_paths.SymbolikPathWalker(self, fva, graph=graph, args=args,
+                                             loopcnt=loopcnt, maxpath=maxpath,
+                                             maxstates=maxstates, checkpoint=checkpoint)
+
     def getSymbolikOutputs(self, fva, args=None):
         """
         For each path in the specified function, run the path with the given
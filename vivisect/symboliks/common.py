@@ -1,4 +1,6 @@
+import copy
 import hashlib
+import weakref
 import operator
 import functools
 import itertools
@@ -25,6 +27,12 @@ def symcache(f):
     return docache
 
 
+@functools.lru_cache(maxsize=0x10000)
+def _varsolve(name, width):
+    md5sum = hashlib.md5(name.encode()).hexdigest()
+    return int(md5sum[:width * 2], 16)
+
+
 def varsolve(name, width, emu=None):
     """
     A helper routine which unifies the way symboliks
@@ -34,8 +42,7 @@ def varsolve(name, width, emu=None):
     if emu is not None:
         name += emu.getRandomSeed()
 
-    md5sum = hashlib.md5(name.encode()).hexdigest()
-    return int(md5sum[:width * 2], 16)
+    return _varsolve(name, width)
 
 
 def evalSymbolik(reprstr):
@@ -74,6 +81,98 @@ def cb_astNodeCount(path, obj, ctx):
         ctx['depth'] = len(path)
 
 
+class SymbolikInterner:
+    """
+    A hash-consing table for symbolik ASTs.  Interning a symbolik returns
+    an equivalent AST where each structurally identical subtree is the
+    same (canonical) object, so structural equality is identity and the
+    per-object solve/str/repr caches are shared by every use of the
+    subtree.  Reductions of interned ASTs are memoized here as well.
+
+    Interned objects are never modified in place; walkTree() (and
+    therefore reduce()) copies any interned object it needs to change.
+
+    Example:
+        interner = SymbolikInterner()
+        sym1 = interner.intern(symexp('(x + 3) * (x + 3)'))
+        assert sym1.kids[0] is sym1.kids[1]
+
+        sym2 = interner.reduce(sym1)
+    """
+
+    def __init__(self):
+        # structural key -> canonical symbolik
+        self.nodes = {}
+        # canonical sym id -> reduced canonical symbolik (per emu)
+        self.reduced = {}
+        self.emureduced = weakref.WeakKeyDictionary()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def clear(self):
+        self.nodes.clear()
+        self.reduced.clear()
+        self.emureduced.clear()
+
+    def isInterned(self, sym):
+        return sym._sym_key is not None and self.nodes.get(sym._sym_key) is sym
+
+    def intern(self, sym):
+        """
+        Return the canonical symbolik for the given symbolik AST.
+        """
+        if self.isInterned(sym):
+            return sym
+
+        kids = [self.intern(kid) for kid in sym.kids]
+        if sym._sym_key is not None or any([kid is not old for kid, old in zip(kids, sym.kids)]):
+            # Leave the caller's AST (or another table's object) alone
+            sym = sym._symCopy(kids)
+
+        key = sym._symKey()
+        ret = self.nodes.get(key)
+        if ret is not None:
+            return ret
+
+        sym._sym_key = key
+        self.nodes[key] = sym
+        return sym
+
+    def reduce(self, sym, emu=None):
+        """
+        Intern and reduce the given symbolik until it no longer changes
+        (like reduce(foo=True)), re-using the reductions of any subtrees
+        which have been reduced before.
+        """
+        memo = self.reduced
+        if emu is not None:
+            memo = self.emureduced.setdefault(emu, {})
+        return self._reduce(self.intern(sym), memo, emu)
+
+    def _reduce(self, sym, memo, emu):
+        ret = memo.get(sym._sym_id)
+        if ret is not None:
+            return ret
+
+        kids = [self._reduce(kid, memo, emu) for kid in sym.kids]
+
+        cur = sym
+        if any([kid is not old for kid, old in zip(kids, sym.kids)]):
+            cur = self.intern(sym._symCopy(kids))
+
+        ret = cur
+        new = cur._reduce(emu=emu)
+        if new is not None and new is not cur:
+            new = self.intern(new)
+            if new is not cur:
+                ret = self._reduce(new, memo, emu)
+
+        memo[sym._sym_id] = ret
+        memo[ret._sym_id] = ret
+        return ret
+
+
 class SymbolikBase:
     idgen = itertools.count()
 
@@ -81,12 +180,49 @@ class SymbolikBase:
     discrete = False
     commutative = False
 
+    # The structural key (set once interned by a SymbolikInterner)
+    _sym_key = None
+
     def __init__(self):
         self._sym_id = next(self.idgen)
         self.kids = []
         self.parents = []
         self.cache = {}
 
+    def __getstate__(self):
+        # copies (and unpickled objects) are not interned
+        state = dict(self.__dict__)
+        state.pop('_sym_key', None)
+        return state
+
+    def _symKeyAttrs(self):
+        """
+        Return a tuple of the (non-kid) values which make up the structure
+        of this symbolik, or None if it may only be interned by identity.
+        """
+        return None
+
+    def _symKey(self):
+        attrs = self._symKeyAttrs()
+        if attrs is None:
+            return ('id', self._sym_id)
+        kids = tuple([kid._sym_id for kid in self.kids])
+        return (self.__class__, attrs, kids)
+
+    def _symCopy(self, kids):
+        """
+        Return a (not interned) shallow copy of this symbolik with the
+        given (structurally equivalent or replacement) kids.
+        """
+        ret = copy.copy(self)
+        ret._sym_id = next(self.idgen)
+        ret.kids = []
+        ret.parents = []
+        ret.cache = {}
+        for i, kid in enumerate(kids):
+            ret.setSymKid(i, kid)
+        return ret
+
     def __add__(self, other):
         return o_add(self, other, self.getWidth())
 
@@ -155,6 +291,9 @@ class SymbolikBase:
 
     def __eq__(self, other):
 
+        if other is self:
+            return True
+
         if other is None:
             return False
 
@@ -246,6 +385,9 @@ class SymbolikBase:
     def setSymKid(self, idx, kid):
         """
         """
+        if self._sym_key is not None:
+            raise Exception('Interned symbolik objects may not be modified: %s' % repr(self))
+
         if idx > len(self.kids) - 1:
             self.kids.append(kid)
             self.kids[idx].parents.append(self)
@@ -322,6 +464,10 @@ class SymbolikBase:
             oldkid = self.kids[i]
             newkid = oldkid._walkTreeImpl(path, cb, ctx=ctx)
             if newkid._sym_id != oldkid._sym_id:
+                if self._sym_key is not None:
+                    # interned objects are shared, change a copy
+                    self = self._symCopy(self.kids)
+                    path[-1] = self
                 self.setSymKid(i, newkid)
 
         newkid = cb(path, self, ctx)
@@ -356,6 +502,9 @@ class cnot(SymbolikBase):
         SymbolikBase.__init__(self)
         self.setSymKid(0, v1)
 
+    def _symKeyAttrs(self):
+        return ()
+
     @symcache
     def __repr__(self):
         return 'cnot( %s )' % (repr(self.kids[0]))
@@ -401,6 +550,9 @@ class Call(SymbolikBase):
         for i in range(len(argsyms)):
             self.setSymKid(i + 1, argsyms[i])
 
+    def _symKeyAttrs(self):
+        return (self.width,)
+
     def getWidth(self):
         return self.width
 
@@ -457,6 +609,9 @@ class Mem(SymbolikBase):
         self.setSymKid(0, symaddr)
         self.setSymKid(1, symsize)
 
+    def _symKeyAttrs(self):
+        return ()
+
     @symcache
     def __repr__(self):
         return 'Mem(%s, %s)' % (repr(self.kids[0]), repr(self.kids[1]))
@@ -505,6 +660,9 @@ class Var(SymbolikBase):
         self.name = name
         self.width = width
 
+    def _symKeyAttrs(self):
+        return (self.name, self.width)
+
     def render(self, canvas, vw):
 
         strval = str(self)
@@ -565,6 +723,10 @@ class LookupVar(Var):
         self.offset = offset
         self.lookupdict = lookupdict
 
+    def _symKeyAttrs(self):
+        # the lookupdict (and offset) are not kids, intern by identity
+        return None
+
     @symcache
     def __repr__(self):
         return 'LookupVar(%s,%s,%s, width=%s)' % (
@@ -619,6 +781,9 @@ class Arg(SymbolikBase):
         self.idx = idx
         self.width = width
 
+    def _symKeyAttrs(self):
+        return (self.idx, self.width)
+
     @symcache
     def __repr__(self):
         return 'Arg(%d,width=%d)' % (self.idx, self.width)
@@ -664,6 +829,9 @@ class Const(SymbolikBase):
         self.ptrname = ptrname
         self.constname = constname
 
+    def _symKeyAttrs(self):
+        return (self.value, self.width, self.ptrname, self.constname)
+
     def render(self, canvas, vw):
 
         # Do we have a "ptrname"?
@@ -726,6 +894,9 @@ class Operator(SymbolikBase):
         self.setSymKid(0, v1)
         self.setSymKid(1, v2)
 
+    def _symKeyAttrs(self):
+        return (self.width,)
+
     def getWidth(self):
         return self.width
 
@@ -879,6 +1050,9 @@ class o_sextend(SymbolikBase):
         self.setSymKid(0, v1)
         self.setSymKid(1, tgtsz)
 
+    def _symKeyAttrs(self):
+        return ()
+
     @symcache
     def __repr__(self):
         symobj, tgtsz = self.kids
@@ -0,0 +1,393 @@
+"""
+Streaming symbolik path enumeration.
+
+Rather than building a new emulator (and re-applying every effect) for
+each code path, the SymbolikPathWalker does a depth first walk of the
+symbolik graph using one working emulator whose state dictionaries are
+persistent ChainDicts.  Each block on the walk stack keeps a frozen
+layer holding only the changes its effects made, so paths which share a
+prefix share the state (and the effects) for it, and sibling paths are
+explored by forking the parent's layer instead of copying the emulator.
+
+Paths are yielded lazily, the walk stack depth is bounded by maxstates,
+and the position of the walk may be saved with getCheckpoint() and used
+to resume it later (in another process if need be).
+"""
+import copy
+
+from vivisect.symboliks.common import *
+
+# Deepest a ChainDict may get before a fork flattens it into a new root
+CHAIN_MAXDEPTH = 32
+
+# Marks a key deleted in a ChainDict layer
+_chain_deleted = object()
+
+
+class ChainDict:
+    """
+    A dictionary made up of a chain of layers, where each layer holds the
+    changes made on top of its (frozen) parent.  Forking is O(1) and the
+    layers are shared by every fork made from them.
+
+    Example:
+        d1 = ChainDict({'eax': 10})
+        d2 = d1.fork()          # d1 is now frozen
+        d2['eax'] = 20
+        d1['eax'] == 10 and d2['eax'] == 20
+    """
+
+    def __init__(self, items=None, parent=None):
+        self._cd_parent = parent
+        self._cd_delta = {}
+        self._cd_frozen = False
+        self._cd_depth = 0
+        if parent is not None:
+            self._cd_depth = parent._cd_depth + 1
+
+        if items is not None:
+            self._cd_delta.update(items)
+
+    def fork(self):
+        """
+        Freeze this layer and return a new (writable) ChainDict on top of it.
+        """
+        self._cd_frozen = True
+        if self._cd_depth >= CHAIN_MAXDEPTH:
+            return ChainDict(self.flatten())
+        return ChainDict(parent=self)
+
+    def flatten(self):
+        """
+        Return a plain dict of the current contents.
+        """
+        layers = []
+        layer = self
+        while layer is not None:
+            layers.append(layer._cd_delta)
+            layer = layer._cd_parent
+
+        ret = {}
+        for delta in reversed(layers):
+            ret.update(delta)
+
+        return {k: v for k, v in ret.items() if v is not _chain_deleted}
+
+    def _lookup(self, key):
+        layer = self
+        while layer is not None:
+            val = layer._cd_delta.get(key, _chain_deleted)
+            if val is not _chain_deleted or key in layer._cd_delta:
+                return val
+            layer = layer._cd_parent
+        return _chain_deleted
+
+    def get(self, key, default=None):
+        val = self._lookup(key)
+        if val is _chain_deleted:
+            return default
+        return val
+
+    def __getitem__(self, key):
+        val = self._lookup(key)
+        if val is _chain_deleted:
+            raise KeyError(key)
+        return val
+
+    def __setitem__(self, key, val):
+        if self._cd_frozen:
+            raise Exception('ChainDict layer is frozen (fork it first)')
+        self._cd_delta[key] = val
+
+    def __delitem__(self, key):
+        if self._lookup(key) is _chain_deleted:
+            raise KeyError(key)
+        if self._cd_frozen:
+            raise Exception('ChainDict layer is frozen (fork it first)')
+        self._cd_delta[key] = _chain_deleted
+
+    def pop(self, key, *default):
+        val = self._lookup(key)
+        if val is _chain_deleted:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        del self[key]
+        return val
+
+    def __contains__(self, key):
+        return self._lookup(key) is not _chain_deleted
+
+    def __iter__(self):
+        return iter(self.flatten())
+
+    def __len__(self):
+        return len(self.flatten())
+
+    def keys(self):
+        return self.flatten().keys()
+
+    def values(self):
+        return self.flatten().values()
+
+    def items(self):
+        return self.flatten().items()
+
+    def update(self, items):
+        for key, val in dict(items).items():
+            self[key] = val
+
+    def copy(self):
+        return ChainDict(self.flatten())
+
+    def __repr__(self):
+        return 'ChainDict(%r)' % (self.flatten(),)
+
+
+def _initEmuState(emu):
+    emu._sym_meta = ChainDict(emu._sym_meta)
+    emu._sym_vars = ChainDict(emu._sym_vars)
+    emu._sym_mem = ChainDict(emu._sym_mem)
+
+
+def _forkEmuState(emu):
+    # Freeze the emulator's current layers and give it fresh ones on top
+    state = (emu._sym_meta, emu._sym_vars, emu._sym_mem, emu._sym_rseed)
+    _setEmuState(emu, state)
+    return state
+
+
+def _setEmuState(emu, state):
+    meta, symvars, mem, rseed = state
+    emu._sym_meta = meta.fork()
+    emu._sym_vars = symvars.fork()
+    emu._sym_mem = mem.fork()
+    emu._sym_rseed = rseed
+
+
+class _PathFrame:
+    __slots__ = ('nid', 'refs', 'nextidx', 'state', 'effects', 'opcodes')
+
+    def __init__(self, nid, refs, state, effects, opcodes):
+        self.nid = nid
+        self.refs = refs
+        self.nextidx = 0
+        self.state = state
+        self.effects = effects
+        self.opcodes = opcodes
+
+
+class SymbolikPathWalker:
+    """
+    Lazily yield (emu, effects) tuples for each path through a function's
+    symbolik graph (in the same order as getSymbolikPaths()).
+
+    At most maxstates blocks are held on the walk stack (which bounds the
+    memory used to the state changes of that many blocks); paths longer
+    than that are not yielded but are counted in the truncated attribute.
+    Loops are followed loopcnt times and the walk ends after maxpath
+    paths (0 for no limit) have been yielded by this walker.
+
+    Example:
+        walker = SymbolikPathWalker(symctx, fva, maxpath=100)
+        for emu, effects in walker:
+            if isInteresting(emu):
+                break
+
+        ckpt = walker.getCheckpoint()
+        ...
+        for emu, effects in SymbolikPathWalker(symctx, fva, checkpoint=ckpt):
+            ...
+    """
+
+    def __init__(self, symctx, fva, graph=None, args=None, loopcnt=0,
+                 maxpath=1000, maxstates=256, checkpoint=None):
+        if graph is None:
+            graph = symctx.getSymbolikGraph(fva)
+
+        if args is None and fva is not None:
+            argdef = symctx.vw.getFunctionArgs(fva)
+            args = [Arg(i, width=symctx.vw.psize) for i in range(len(argdef))]
+
+        self.symctx = symctx
+        self.fva = fva
+        self.graph = graph
+        self.args = args
+        self.loopcnt = loopcnt
+        self.maxpath = maxpath
+        self.maxstates = maxstates
+
+        self.roots = [node[0] for node in graph.getHierRootNodes()]
+        self.rootidx = 0
+        self.pathcnt = 0
+        self.truncated = 0
+
+        self.emu = None
+        self.stack = []
+        self._onstack = {}
+        self._checkpoint = checkpoint
+
+        if checkpoint is not None:
+            if checkpoint.get('fva') != fva:
+                raise Exception('Checkpoint is not for function: %r' % (fva,))
+            self.rootidx = checkpoint.get('root')
+            self.pathcnt = checkpoint.get('pathcnt')
+            self.truncated = checkpoint.get('truncated')
+
+        # maxpath counts the paths from *this* walker
+        self._pathstart = self.pathcnt
+
+    def __iter__(self):
+        return self.iterPaths()
+
+    def getCheckpoint(self):
+        """
+        Return a (picklable) dict describing where the walk is up to, which
+        may be passed as the checkpoint to a new SymbolikPathWalker for the
+        same function/graph to carry on from the next path.
+        """
+        return {
+            'fva': self.fva,
+            'root': self.rootidx,
+            'pathcnt': self.pathcnt,
+            'truncated': self.truncated,
+            'frames': [(frame.nid, frame.nextidx) for frame in self.stack],
+        }
+
+    def _isDone(self):
+        return bool(self.maxpath) and self.pathcnt - self._pathstart >= self.maxpath
+
+    def _pushFrame(self, parent, eid, nid):
+        graph = self.graph
+        symctx = self.symctx
+
+        if parent is None:
+            emu = symctx.getFuncEmu(self.fva, fargs=self.args)
+            for fname, funccb in list(symctx.funccb.items()):
+                emu.addFunctionCallback(fname, funccb)
+
+            _initEmuState(emu)
+            self.emu = emu
+            effects = emu.applyEffects(symctx.preeffects)
+            emu.applyEffects(symctx.preconstraints)
+
+        else:
+            emu = self.emu
+            _setEmuState(emu, parent.state)
+
+            # This is the edge that *got us here* so it has to be processed first
+            constraints = graph.getEdgeProps(eid).get('symbolik_constraints', ())
+            constraints = emu.applyEffects(constraints)
+            if symctx.consolve:
+                # If any of the constraints are discrete and false we skip the path
+                [c.reduce() for c in constraints]
+                if not all([c.cons.prove() for c in constraints if c.cons.isDiscrete()]):
+                    return None
+                constraints = [c for c in constraints if not c.cons.isDiscrete()]
+
+            effects = constraints
+
+        nprops = graph.getNodeProps(nid)
+        effects.extend(emu.applyEffects(nprops.get('symbolik_effects', ())))
+        opcodes = nprops.get('opcodes', ())
+
+        # refs are walked from the end (like the todo list in getCodePaths)
+        refs = list(reversed(graph.getRefsFromByNid(nid)))
+        frame = _PathFrame(nid, refs, _forkEmuState(emu), effects, opcodes)
+
+        self.stack.append(frame)
+        self._onstack[nid] = self._onstack.get(nid, 0) + 1
+        return frame
+
+    def _popFrame(self):
+        frame = self.stack.pop()
+        self._onstack[frame.nid] -= 1
+        return frame
+
+    def _getPath(self, frame):
+        # Called with the leaf frame already popped from the stack
+        effects = []
+        opcodes = []
+        for f in self.stack + [frame]:
+            effects.extend(f.effects)
+            opcodes.extend(f.opcodes)
+
+        emu = copy.copy(self.emu)
+        _setEmuState(emu, frame.state)
+        emu.setMeta('opcodes', opcodes)
+        return emu, effects
+
+    def _loadCheckpoint(self, checkpoint):
+        frames = checkpoint.get('frames')
+        if not frames:
+            return
+
+        nid, nextidx = frames[0]
+        if nid != self.roots[self.rootidx]:
+            raise Exception('Checkpoint does not match the graph (root: 0x%.8x)' % nid)
+
+        frame = self._pushFrame(None, None, nid)
+        frame.nextidx = nextidx
+
+        for nid, nextidx in frames[1:]:
+            eid, fromid, toid, einfo = frame.refs[frame.nextidx - 1]
+            if toid != nid:
+                raise Exception('Checkpoint does not match the graph (node: 0x%.8x)' % nid)
+
+            frame = self._pushFrame(frame, eid, nid)
+            if frame is None:
+                raise Exception('Checkpoint path is not viable (node: 0x%.8x)' % nid)
+            frame.nextidx = nextidx
+
+    def iterPaths(self):
+        """
+        Yield (emu, effects) tuples for the remaining paths.
+        """
+        if self._checkpoint is not None:
+            self._loadCheckpoint(self._checkpoint)
+            self._checkpoint = None
+
+        while self.rootidx < len(self.roots):
+            if self._isDone():
+                return
+
+            if not self.stack:
+                frame = self._pushFrame(None, None, self.roots[self.rootidx])
+                if not frame.refs:
+                    # The root is all there is to this path
+                    self._popFrame()
+                    self.rootidx += 1
+                    self.pathcnt += 1
+                    yield self._getPath(frame)
+                    continue
+
+            while self.stack:
+                if self._isDone():
+                    return
+
+                frame = self.stack[-1]
+                if frame.nextidx >= len(frame.refs):
+                    self._popFrame()
+                    continue
+
+                eid, fromid, toid, einfo = frame.refs[frame.nextidx]
+                frame.nextidx += 1
+
+                # Skip loops if they are "deeper" than we are allowed
+                if self._onstack.get(toid, 0) > self.loopcnt:
+                    continue
+
+                if len(self.stack) >= self.maxstates:
+                    self.truncated += 1
+                    continue
+
+                child = self._pushFrame(frame, eid, toid)
+                if child is None or child.refs:
+                    continue
+
+                # This is a leaf node!
+                self._popFrame()
+                self.pathcnt += 1
+                yield self._getPath(child)
+
+            self.rootidx += 1
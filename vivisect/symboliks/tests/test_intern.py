@@ -0,0 +1,57 @@
+import unittest
+
+from vivisect.const import *
+from vivisect.symboliks.common import *
+from vivisect.symboliks.expression import symexp
+
+
+class TestSymbolikIntern(unittest.TestCase):
+
+    def test_symboliks_intern(self):
+        interner = SymbolikInterner()
+
+        s1 = interner.intern(symexp('(x + 3) * (x + 3)'))
+        s2 = interner.intern(symexp('(x + 3) * (x + 3)'))
+
+        self.assertIs(s1, s2)
+        self.assertIs(s1.kids[0], s1.kids[1])
+        self.assertIsNot(interner.intern(symexp('(x + 4) * (x + 3)')), s1)
+        self.assertIsNot(interner.intern(symexp('(y + 3) * (x + 3)')), s1)
+
+        # widths are structure too
+        self.assertIsNot(interner.intern(Var('x', 4)), interner.intern(Var('x', 8)))
+        self.assertEqual(len(interner), 11)
+
+    def test_symboliks_intern_immutable(self):
+        interner = SymbolikInterner()
+
+        orig = symexp('(x + 3) * (x + 3)')
+        s1 = interner.intern(orig)
+        solved = s1.solve()
+        self.assertRaises(Exception, s1.setSymKid, 0, Var('y', 4))
+
+        def swapx(path, sym, ctx):
+            if sym.symtype == SYMT_VAR and sym.name == 'x':
+                return Var('y', 4)
+
+        # walkTree copies rather than modifying the interned AST
+        s2 = s1.walkTree(swapx)
+        self.assertEqual(str(s2), '((y + 3) * (y + 3))')
+        self.assertEqual(str(s1), '((x + 3) * (x + 3))')
+        self.assertEqual(s1.solve(), solved)
+        self.assertIs(interner.intern(symexp('(x + 3) * (x + 3)')), s1)
+
+    def test_symboliks_intern_reduce(self):
+        interner = SymbolikInterner()
+
+        exprs = (
+            '(foo & 0xff) & 0xff',
+            '((foo + 3) - 3) + ((foo + 3) - 3)',
+            '(0xff & (0xff & foo)) * 2',
+            'x + 0',
+        )
+        for expr in exprs:
+            red = interner.reduce(symexp(expr))
+            self.assertEqual(str(red), str(symexp(expr).reduce(foo=True)))
+            self.assertIs(interner.reduce(symexp(expr)), red)
+            self.assertTrue(interner.isInterned(red))
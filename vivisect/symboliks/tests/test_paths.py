@@ -0,0 +1,143 @@
+import pickle
+import unittest
+
+import vivisect
+import vivisect.tools.graphutil as viv_graph
+import vivisect.symboliks.paths as vsym_paths
+import vivisect.symboliks.effects as vsym_effects
+import vivisect.symboliks.analysis as vsym_analysis
+import vivisect.symboliks.constraints as vsym_cons
+import vivisect.symboliks.archs.i386 as vsym_i386
+
+from vivisect.symboliks.common import *
+
+
+def getTestGraph():
+    '''
+    A diamond (with a loop back from the bottom) where the "c" side is
+    never taken:
+
+            a
+           / \\
+          b   c
+           \\ /
+            d  <-.
+           / \\  |
+          e   f -'
+    '''
+    graph = vsym_analysis.SymbolikFunctionGraph()
+    for i, name in enumerate('abcdef'):
+        va = 0x1000 + i
+        effs = [vsym_effects.SetVariable(va, 'var_%s' % name, Const(i, 4)),
+                vsym_effects.SetVariable(va, 'count', Var('count', 4) + Const(1, 4))]
+        if name == 'a':
+            graph.addHierRootNode(nid=va, symbolik_effects=effs, opcodes=[name])
+        else:
+            graph.addNode(nid=va, symbolik_effects=effs, opcodes=[name])
+
+    def edge(n1, n2, cons=None):
+        econs = []
+        if cons is not None:
+            econs.append(vsym_effects.ConstrainPath(n1, Const(n2, 4), cons))
+        graph.addEdgeByNids(n1, n2, symbolik_constraints=econs)
+
+    edge(0x1000, 0x1001, vsym_cons.eq(Const(1, 4), Const(1, 4)))
+    edge(0x1000, 0x1002, vsym_cons.eq(Const(1, 4), Const(0, 4)))
+    edge(0x1001, 0x1003)
+    edge(0x1002, 0x1003)
+    edge(0x1003, 0x1004)
+    edge(0x1003, 0x1005)
+    edge(0x1005, 0x1003)
+    return graph
+
+
+def getPathInfo(emu, effects):
+    return (emu.getMeta('opcodes'),
+            [str(e) for e in effects],
+            sorted((name, str(sym)) for name, sym in emu.getSymVariables()))
+
+
+class TestSymbolikPaths(unittest.TestCase):
+
+    def setUp(self):
+        vw = vivisect.VivWorkspace()
+        vw.setMeta('Architecture', 'i386')
+        self.symctx = vsym_i386.i386SymbolikAnalysisContext(vw)
+        self.graph = getTestGraph()
+
+    def getSymbolikPaths(self, loopcnt=0):
+        paths = viv_graph.getCodePaths(self.graph, loopcnt=loopcnt)
+        spaths = self.symctx.getSymbolikPaths(None, paths=paths, args=[], graph=self.graph)
+        return [getPathInfo(emu, effs) for emu, effs in spaths]
+
+    def streamSymbolikPaths(self, **kwargs):
+        walker = self.symctx.streamSymbolikPaths(None, graph=self.graph, args=[], **kwargs)
+        return walker, [getPathInfo(emu, effs) for emu, effs in walker]
+
+    def test_symboliks_chaindict(self):
+        d1 = vsym_paths.ChainDict({'a': 1, 'b': 2})
+        d2 = d1.fork()
+        d2['a'] = 10
+        del d2['b']
+        d2['c'] = 3
+        d3 = d1.fork()
+
+        self.assertEqual(d1.flatten(), {'a': 1, 'b': 2})
+        self.assertEqual(d2.flatten(), {'a': 10, 'c': 3})
+        self.assertEqual(dict(d3), {'a': 1, 'b': 2})
+        self.assertNotIn('b', d2)
+        self.assertEqual(d2.get('b', 'nope'), 'nope')
+        self.assertRaises(Exception, d1.__setitem__, 'a', 0)
+
+        d = d2
+        for i in range(vsym_paths.CHAIN_MAXDEPTH * 3):
+            d = d.fork()
+            d[i] = i
+        self.assertLessEqual(d._cd_depth, vsym_paths.CHAIN_MAXDEPTH)
+        self.assertEqual(len(d), 2 + vsym_paths.CHAIN_MAXDEPTH * 3)
+        self.assertEqual(d2.flatten(), {'a': 10, 'c': 3})
+
+    def test_symboliks_paths_stream(self):
+        for loopcnt in (0, 1, 2):
+            walker, paths = self.streamSymbolikPaths(loopcnt=loopcnt)
+            self.assertEqual(paths, self.getSymbolikPaths(loopcnt=loopcnt))
+            self.assertEqual(len(paths), 2 * (loopcnt + 1))
+
+        walker, paths = self.streamSymbolikPaths()
+        opcodes, effects, symvars = paths[0]
+        self.assertEqual(''.join(opcodes), 'acde')
+        symvars = dict(symvars)
+        self.assertEqual(symvars.get('var_c'), '2')
+        self.assertNotIn('var_b', symvars)
+        self.assertEqual(symvars.get('count').count('+ 1'), 4)
+
+    def test_symboliks_paths_consolve(self):
+        self.symctx.consolve = True
+        walker, paths = self.streamSymbolikPaths()
+        self.assertEqual([''.join(p[0]) for p in paths], ['abde'])
+
+        walker, paths = self.streamSymbolikPaths(loopcnt=1)
+        self.assertEqual([''.join(p[0]) for p in paths], ['abdfde', 'abde'])
+
+    def test_symboliks_paths_maxstates(self):
+        walker, paths = self.streamSymbolikPaths(loopcnt=3, maxstates=6)
+        self.assertEqual(max(len(p[0]) for p in paths), 6)
+        self.assertGreater(walker.truncated, 0)
+
+    def test_symboliks_paths_checkpoint(self):
+        walker, allpaths = self.streamSymbolikPaths(loopcnt=2)
+
+        paths = []
+        ckpt = None
+        while True:
+            walker = self.symctx.streamSymbolikPaths(None, graph=self.graph, args=[], loopcnt=2,
+                                                     maxpath=1, checkpoint=ckpt)
+            newpaths = [getPathInfo(emu, effs) for emu, effs in walker]
+            if not newpaths:
+                break
+
+            paths.extend(newpaths)
+            ckpt = pickle.loads(pickle.dumps(walker.getCheckpoint()))
+
+        self.assertEqual(paths, allpaths)
+        self.assertEqual(ckpt['pathcnt'], len(allpaths))
@@ -0,0 +1,54 @@
+import unittest
+import multiprocessing
+
+import vivisect
+import vivisect.parallel as viv_parallel
+import vivisect.tests.samplecode as samplecode
+
+from vivisect.const import *
+
+
+def getTestWorkspace(procs):
+    vw = vivisect.VivWorkspace()
+    vw.config.viv.analysis.parallel.procs = procs
+    vw.config.viv.analysis.parallel.chunksize = 1
+    vw.setMeta('Architecture', 'i386')
+    vw.setMeta('Format', 'blob')
+    vw.addMemoryMap(0x41410000, 0xff, 'none', bytes(samplecode.func1) * 4)
+    vw.addFuncAnalysisModule('vivisect.analysis.generic.codeblocks')
+    vw.addFuncAnalysisModule('vivisect.analysis.i386.calling')
+    for i in range(4):
+        vw.addEntryPoint(0x41410000 + (i * len(samplecode.func1)))
+    return vw
+
+
+def getFuncSize(vw, fva):
+    return vw.getFunctionMeta(fva, 'Size')
+
+
+@unittest.skipIf('fork' not in multiprocessing.get_all_start_methods(), 'parallel analysis requires fork')
+class ParallelTest(unittest.TestCase):
+
+    def test_vivisect_parallel_map(self):
+        vw = getTestWorkspace(2)
+        vw.analyze()
+
+        fvas = sorted(vw.getFunctions())
+        sizes = viv_parallel.parallelMap(vw, getFuncSize, fvas)
+        self.assertEqual(sizes, [getFuncSize(vw, fva) for fva in fvas])
+
+    def test_vivisect_parallel_analyze(self):
+        vw1 = getTestWorkspace(0)
+        vw1.analyze()
+
+        vw2 = getTestWorkspace(2)
+        vw2.analyze()
+
+        self.assertEqual(len(vw2.getFunctions()), 4)
+        self.assertEqual(sorted(vw1.getFunctions()), sorted(vw2.getFunctions()))
+        for fva in vw1.getFunctions():
+            self.assertEqual(vw1.getFunctionMetaDict(fva), vw2.getFunctionMetaDict(fva))
+            self.assertEqual(vw1.getFunctionArgs(fva), vw2.getFunctionArgs(fva))
+
+        self.assertEqual(sorted(vw1.getLocations()), sorted(vw2.getLocations()))
+        self.assertEqual(sorted(vw1.getXrefs()), sorted(vw2.getXrefs()))
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import vivisect.remote.server as viv_server
+import vivisect.storage.basicfile as viv_basicfile
+
+from vivisect.const import *
+
+
+class VivServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.chunk_events = viv_server.chunk_events
+        viv_server.chunk_events = 2
+
+    def tearDown(self):
+        viv_server.chunk_events = self.chunk_events
+        shutil.rmtree(self.tmpdir)
+
+    def test_server_shared_event_log(self):
+        events = [(VWE_SETMETA, ('woot', i)) for i in range(5)]
+        fpath = os.path.join(self.tmpdir, 'test.viv')
+        viv_basicfile.vivEventsToFile(fpath, events)
+
+        srv = viv_server.VivServer(self.tmpdir)
+        self.assertEqual(srv.listWorkspaces(), ['test.viv'])
+        wsinfo = srv.wsdict.get('test.viv')
+        # Nothing is read until a client shows up
+        self.assertIsNone(wsinfo.events)
+
+        chan1 = srv.createEventChannel('test.viv')
+        log = wsinfo.events
+        chan2 = srv.createEventChannel('test.viv')
+        self.assertIs(wsinfo.events, log)
+
+        # Channels stream the shared log in chunks
+        self.assertEqual(srv.getNextEvents(chan1), events[:2])
+        self.assertEqual(srv.getNextEvents(chan1), events[2:4])
+        self.assertEqual(srv.getNextEvents(chan1), events[4:])
+        self.assertEqual(wsinfo.getNextEvents(chan1, timeout=0), [])
+
+        # chan1 already has the events it fired
+        newevt = (VWE_SETMETA, ('woot', 99))
+        srv._fireEvent('test.viv', newevt[0], newevt[1], skip=chan1)
+        srv._fireEvents('test.viv', [(VTE_FOLLOWME | VTE_MASK, 'x')], skip=chan2)
+        self.assertEqual(wsinfo.getNextEvents(chan1, timeout=0), [(VTE_FOLLOWME | VTE_MASK, 'x')])
+
+        chan3 = srv.createEventChannel('test.viv')
+        for chan in (chan2, chan3):
+            got = []
+            while True:
+                evts = wsinfo.getNextEvents(chan, timeout=0)
+                if not evts:
+                    break
+                got.extend(evts)
+            # Transient events are only for channels which were connected
+            self.assertEqual(got, events + [newevt])
+
+        # Once the firing channels have read past their events, no skips remain
+        self.assertEqual(wsinfo.skips, {})
+
+        # Saves only append what is new (and never transient events)
+        wsinfo.save()
+        self.assertEqual(viv_basicfile.vivEventsFromFile(fpath), events + [newevt])
+        wsinfo.save()
+        self.assertEqual(viv_basicfile.vivEventsFromFile(fpath), events + [newevt])
+
+        # Leaving channels cost nothing
+        wsinfo.delChannel(chan1)
+        self.assertTrue(wsinfo.abandoned(chan1, 10))
+        self.assertFalse(wsinfo.abandoned(chan2, 10))
@@ -0,0 +1,59 @@
+import time
+import unittest
+
+import cobra
+import vivisect
+import vivisect.remote.share as viv_share
+
+import vivisect.tests.samplecode as samplecode
+
+
+class CountingWorkspace(vivisect.VivWorkspace):
+
+    def __init__(self):
+        vivisect.VivWorkspace.__init__(self)
+        self.reads = 0
+
+    def readMemory(self, va, size):
+        self.reads += 1
+        return vivisect.VivWorkspace.readMemory(self, va, size)
+
+
+class VivShareTest(unittest.TestCase):
+
+    def test_viv_shared_workspace(self):
+        remote = CountingWorkspace()
+        remote.setMeta('Architecture', 'i386')
+        remote.addMemoryMap(0x41410000, 0xff, 'none', bytes(samplecode.func1))
+        remote.makeName(0x41410000, 'woot')
+
+        daemon = cobra.CobraDaemon(port=0)
+        objname = daemon.shareObject(remote)
+        daemon.fireThread()
+
+        vw = viv_share.getSharedWorkspace('cobra://localhost:%d/%s' % (daemon.port, objname))
+        self.assertEqual(vw.getName(0x41410000), 'woot')
+        self.assertEqual(vw.readMemory(0x41410000, 16), bytes(samplecode.func1[:16]))
+
+        # Analysis reads only the replica, and just the events go back
+        vw.makeFunction(0x41410000)
+        vw.server.flushEvents()
+        self.assertEqual(remote.reads, 0)
+        self.assertEqual(remote.getFunctions(), [0x41410000])
+        self.assertEqual(remote.getLocations(), vw.getLocations())
+        self.assertEqual(sorted(remote.getXrefs()), sorted(vw.getXrefs()))
+
+        # Changes to the shared workspace reach the replica
+        remote.makeName(0x41410010, 'remote')
+        for i in range(100):
+            if vw.getName(0x41410010) is not None:
+                break
+            time.sleep(0.1)
+        self.assertEqual(vw.getName(0x41410010), 'remote')
+
+        vw.server = None
+        daemon.stopServer()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import vivisect
+import vivisect.storage as viv_storage
+import vivisect.storage.binfile as viv_binfile
+import vivisect.tests.samplecode as samplecode
+
+from vivisect.const import *
+
+
+class StorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_vivisect_binfile_values(self):
+        vals = [
+            None, True, False, 0, 10, -10, 2 ** 70, 1.5,
+            'woot', b'\x00\x01', (1, 'a', None), [1, [2, 3]],
+            {'a': (1, 2), 3: {'b': None}}, set([1, 2]),
+        ]
+        for val in vals:
+            self.assertEqual(viv_binfile.decodeValue(viv_binfile.encodeValue(val)), val)
+
+    def test_vivisect_binfile_roundtrip(self):
+        vw = vivisect.VivWorkspace()
+        vw.setMeta('Architecture', 'i386')
+        vw.setMeta('Format', 'blob')
+        vw.addMemoryMap(0x41410000, 0xff, 'none', samplecode.func1)
+        vw.makeFunction(0x41410000)
+        vw.setComment(0x41410000, 'woot')
+
+        fpath = os.path.join(self.tmpdir, 'test.viv')
+        viv_binfile.saveWorkspace(vw, fpath)
+        self.assertEqual(viv_storage.guessStorageModule(fpath), 'vivisect.storage.binfile')
+
+        events = list(vw.exportWorkspace())
+        self.assertEqual(viv_binfile.vivEventsFromFile(fpath), events)
+
+        # incremental saves append a new indexed segment
+        vw._createSaveMark()
+        vw.setComment(0x41410000, 'woot2')
+        viv_binfile.saveWorkspaceChanges(vw, fpath)
+
+        comments = [einfo for event, einfo in viv_binfile.iterEventsByType(fpath, (VWE_COMMENT,))]
+        self.assertEqual(comments, [(0x41410000, 'woot'), (0x41410000, 'woot2')])
+
+        skipped = viv_binfile.vivEventsFromFile(fpath, skip=(VWE_COMMENT,))
+        self.assertEqual(skipped, [e for e in events if e[0] != VWE_COMMENT])
+
+        vw2 = vivisect.VivWorkspace()
+        vw2.loadWorkspace(fpath)
+        self.assertEqual(vw2.getComment(0x41410000), 'woot2')
+        self.assertTrue(vw2.isFunction(0x41410000))
+
+    def test_vivisect_binfile_checkpoint(self):
+        vw = vivisect.VivWorkspace()
+        vw.setMeta('Architecture', 'i386')
+        vw.setMeta('Format', 'blob')
+        vw.addMemoryMap(0x41410000, 0xff, 'none', samplecode.func1)
+        vw.makeFunction(0x41410000)
+        vw.makeName(0x41410000, 'woot_func')
+        vw.setComment(0x41410004, 'woot')
+
+        fpath = os.path.join(self.tmpdir, 'test.viv')
+        viv_binfile.saveWorkspaceCheckpoint(vw, fpath)
+
+        vw._createSaveMark()
+        vw.setComment(0x41410004, 'woot2')
+        viv_binfile.saveWorkspaceChanges(vw, fpath)
+
+        vw2 = vivisect.VivWorkspace()
+        vw2.loadWorkspace(fpath)
+
+        self.assertEqual(vw2.getComment(0x41410004), 'woot2')
+        self.assertEqual(vw2.getName(0x41410000), 'woot_func')
+        self.assertEqual(vw2.getFunctions(), vw.getFunctions())
+        self.assertEqual(sorted(vw2.getLocations()), sorted(vw.getLocations()))
+        self.assertEqual(sorted(vw2.getXrefs()), sorted(vw.getXrefs()))
+        self.assertEqual(sorted(vw2.getCodeBlocks()), sorted(vw.getCodeBlocks()))
+        self.assertEqual(vw2.getCodeBlock(0x41410004), vw.getCodeBlock(0x41410004))
+        self.assertEqual(vw2.getFunctionMetaDict(0x41410000), vw.getFunctionMetaDict(0x41410000))
+        self.assertEqual(vw2.readMemory(0x41410000, 0x10), vw.readMemory(0x41410000, 0x10))
+
+        # the compacted export of a checkpoint rebuilds the same workspace
+        vw3 = vivisect.VivWorkspace()
+        vw3.importWorkspace(vw2.exportWorkspace())
+        self.assertEqual(sorted(vw3.getLocations()), sorted(vw.getLocations()))
+        self.assertEqual(vw3.getComment(0x41410004), 'woot2')
@@ -10,6 +10,7 @@ import vivisect.tools.graphutil as viv_graph
 from vivisect.const import *
 
 import vivisect.tests.vivbins as vivbins
+import vivisect.tests.samplecode as samplecode
 from vivisect.tests.vivbins import getTestWorkspace, getAnsWorkspace
 
 
@@ -107,6 +108,97 @@ class VivisectTest(unittest.TestCase):
         self.assertEqual(vw.castPointer(0x22220000), 0x41424344)
         self.assertEqual(vw.parseNumber(0x22220000, 2), 0x4142)
 
+    def test_viv_opcode_cache(self):
+        vw = vivisect.VivWorkspace()
+        vw.setMeta('Architecture', 'i386')
+        vw.addMemoryMap(0x41410000, 0xff, 'none', bytes(samplecode.func1))
+
+        op = vw.parseOpcode(0x41410000)
+        self.assertEqual(op.mnem, 'push')
+        self.assertIs(vw.parseOpcode(0x41410000), op)
+
+        stats = vw.getOpcodeCacheStats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+
+        # Writes invalidate the cache (0x90 is a nop)
+        vw.writeMemory(0x41410000, b'\x90')
+        self.assertEqual(vw.parseOpcode(0x41410000).mnem, 'nop')
+
+        # The cache is bounded
+        vw.config.viv.opcache.size = 2
+        for va in (0x41410000, 0x41410001, 0x41410003):
+            vw.parseOpcode(va)
+        self.assertEqual(vw.getOpcodeCacheStats()['size'], 2)
+
+    def test_viv_event_batch(self):
+        def build(batch):
+            vw = vivisect.VivWorkspace()
+            vw.setMeta('Architecture', 'i386')
+            vw.addMemoryMap(0x41410000, 0xff, 'none', bytes(samplecode.func1))
+            chan = vw.createEventChannel()
+            start = len(vw.exportWorkspace())
+            if batch:
+                with vw.eventBatch():
+                    vw.makeFunction(0x41410000)
+                    vw.makeName(0x41410000, 'woot')
+                    # nothing reaches the channel until the batch is done
+                    self.assertEqual(vw.chan_lookup[chan].qsize(), 0)
+            else:
+                vw.makeFunction(0x41410000)
+                vw.makeName(0x41410000, 'woot')
+            return vw, chan, start
+
+        vw1, chan1, start1 = build(False)
+        vw2, chan2, start2 = build(True)
+        events = vw1.exportWorkspace()
+        self.assertEqual(vw2.exportWorkspace(), events)
+
+        # the whole batch is one queue entry, but events come back the same
+        self.assertEqual(vw2.chan_lookup[chan2].qsize(), 1)
+        self.assertEqual(vw2.waitForEvent(chan2), events[start2])
+        self.assertEqual(vw2.waitForEvent(chan2), events[start2 + 1])
+        self.assertEqual(vw2.waitForEvents(chan2), events[start2 + 2:])
+        self.assertEqual(vw1.waitForEvents(chan1), events[start1:])
+
+        # bulk import gives the same workspace
+        vw3 = vivisect.VivWorkspace()
+        count = len(vw3.exportWorkspace())
+        vw3.importWorkspace(iter(events))
+        self.assertEqual(vw3.exportWorkspace()[count:], events)
+        self.assertEqual(vw3.getLocations(), vw1.getLocations())
+        self.assertEqual(sorted(vw3.getXrefs()), sorted(vw1.getXrefs()))
+        self.assertEqual(vw3.getName(0x41410000), 'woot')
+
+    def test_viv_find_pointers(self):
+        vw = vivisect.VivWorkspace()
+        vw.setMeta('Architecture', 'i386')
+        vw.addMemoryMap(0x41410000, 0xff, 'none', b'\x00' * 0x100)
+        vw.addMemoryMap(0x41420000, 0xff, 'none', b'\x10\x00\x41\x41' * 0x40)
+        # Pointers inside/overlapping locations are skipped
+        vw.writeMemory(0x41410001, b'\x00\x00\x41\x41')
+        vw.writeMemory(0x41410021, b'\x00\x00\x42\x41' * 2)
+        vw.writeMemory(0x414100f0, b'\x00\x00\x42\x41')
+        vw.makeNumber(0x41420008, 4)
+        vw.makeNumber(0x41410024, 2)
+
+        ptrs = vw.findPointers(cache=False)
+        self.assertEqual(ptrs[0], (0x41410001, 0x41410000))
+        self.assertIn((0x41410021, 0x41420000), ptrs)
+        self.assertNotIn((0x41410025, 0x41420000), ptrs)
+        self.assertNotIn((0x41420008, 0x41410010), ptrs)
+        self.assertIn((0x4142000c, 0x41410010), ptrs)
+
+        slow = []
+        for mva, msize, mperm, mname in vw.getMemoryMaps():
+            slow.extend(vw._findMapPointers(mva, vw.readMemory(mva, msize)))
+        self.assertEqual(ptrs, slow)
+
+        if vivisect.numpy is not None:
+            fast = []
+            for mva, msize, mperm, mname in vw.getMemoryMaps():
+                fast.extend(vw._findMapPointersNumpy(mva, vw.readMemory(mva, msize)))
+            self.assertEqual(fast, slow)
+
         # def test_impapi_windows(self):
         # imp = viv_impapi.getImportApi('windows','i386')
         # self.assertEqual( imp.getImpApiCallConv('ntdll.RtlAllocateHeap'), 'stdcall')
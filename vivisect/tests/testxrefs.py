@@ -0,0 +1,54 @@
+import unittest
+
+import vivisect
+import vivisect.xrefs as viv_xrefs
+
+from vivisect.const import *
+
+
+class XrefStoreTest(unittest.TestCase):
+
+    def test_vivisect_xrefstore(self):
+        xrefs = viv_xrefs.XrefStore()
+
+        x1 = (0x1000, 0x2000, REF_CODE, 0)
+        x2 = (0x1004, 0x2000, REF_DATA, 0)
+        x3 = (0x1008, 0x3000, REF_PTR, None)
+
+        self.assertTrue(xrefs.addXref(x1))
+        self.assertTrue(xrefs.addXref(x2))
+        self.assertTrue(xrefs.addXref(x3))
+        self.assertFalse(xrefs.addXref(x1))
+        self.assertEqual(len(xrefs), 3)
+
+        self.assertEqual(xrefs.getXrefs(), [x1, x2, x3])
+        self.assertEqual(xrefs.getXrefs(rtype=REF_PTR), [x3])
+        self.assertEqual(xrefs.getXrefsTo(0x2000), [x1, x2])
+        self.assertEqual(xrefs.getXrefsTo(0x2000, rtype=REF_DATA), [x2])
+        self.assertEqual(xrefs.getXrefsFrom(0x1008), [x3])
+        self.assertEqual(xrefs.getXrefsTo(0x2001), [])
+
+        self.assertEqual(xrefs.getXrefsToRange(0x2000, 0x1000), [x1, x2])
+        self.assertEqual(xrefs.getXrefsToRange(0x2000, 0x1001), [x1, x2, x3])
+        self.assertEqual(xrefs.getXrefsFromRange(0x1002, 0x10), [x2, x3])
+
+        self.assertTrue(xrefs.delXref(x1))
+        self.assertFalse(xrefs.delXref(x1))
+        self.assertEqual(xrefs.getXrefs(), [x2, x3])
+        self.assertEqual(xrefs.getXrefsFrom(0x1000), [])
+        self.assertEqual(xrefs.getXrefsToRange(0, 0x10000), [x2, x3])
+
+    def test_vivisect_workspace_xrefs(self):
+        vw = vivisect.VivWorkspace()
+        vw.addMemoryMap(0x41410000, 0xff, 'none', b'A' * 0x1000)
+
+        vw.addXref(0x41410000, 0x41410100, REF_DATA)
+        vw.addXref(0x41410000, 0x41410100, REF_DATA)
+        vw.addXref(0x41410010, 0x41410100, REF_CODE, 1)
+
+        self.assertEqual(len(vw.getXrefsTo(0x41410100)), 2)
+        self.assertEqual(len(vw.getXrefs(rtype=REF_CODE)), 1)
+        self.assertEqual(vw.getXrefsToRange(0x41410000, 0x1000), vw.getXrefs())
+
+        vw.delXref((0x41410000, 0x41410100, REF_DATA, 0))
+        self.assertEqual(vw.getXrefs(), [(0x41410010, 0x41410100, REF_CODE, 1)])
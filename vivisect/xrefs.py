@@ -0,0 +1,229 @@
+"""
+Compact (array backed) storage for workspace xrefs.
+
+Each xref is a row in a set of typed columns (from, to, rtype, rflags)
+with per-address indexes of row numbers, rather than a tuple in several
+per-address python lists.  Duplicates are detected using the rows *from*
+an address (which is a handful of operands at most) so adding xrefs to
+heavily referenced addresses (imports etc) stays O(1).
+"""
+import array
+import bisect
+
+# rflags may be None (ie. REF_PTR from makeOpcode)
+RFLAGS_NONE = 0xffffffffffffffff
+
+
+class XrefStore:
+    """
+    Storage and indexes for (fromva, tova, rtype, rflags) xref tuples.
+
+    Example:
+        xrefs = XrefStore()
+        xrefs.addXref((0x41410000, 0x41420000, REF_CODE, 0))
+
+        for fromva, tova, rtype, rflags in xrefs.getXrefsToRange(0x41420000, 0x100):
+            dostuff()
+    """
+
+    def __init__(self):
+        self._xr_from = array.array('Q')
+        self._xr_to = array.array('Q')
+        self._xr_rtype = array.array('H')
+        self._xr_rflags = array.array('Q')
+
+        self._xr_dead = set()
+
+        # va -> array of row numbers
+        self._by_from = {}
+        self._by_to = {}
+
+        # sorted va keys for range queries (built on demand)
+        self._from_keys = None
+        self._to_keys = None
+
+    def __len__(self):
+        return len(self._xr_from) - len(self._xr_dead)
+
+    def _getRow(self, row):
+        rflags = self._xr_rflags[row]
+        if rflags == RFLAGS_NONE:
+            rflags = None
+        return (self._xr_from[row], self._xr_to[row], self._xr_rtype[row], rflags)
+
+    def _findRow(self, xref):
+        fromva, tova, rtype, rflags = xref
+        rows = self._by_from.get(fromva)
+        if rows is None:
+            return None
+
+        if rflags is None:
+            rflags = RFLAGS_NONE
+
+        xr_to = self._xr_to
+        xr_rtype = self._xr_rtype
+        xr_rflags = self._xr_rflags
+        for row in rows:
+            if xr_to[row] == tova and xr_rtype[row] == rtype and xr_rflags[row] == rflags:
+                return row
+
+        return None
+
+    def hasXref(self, xref):
+        """
+        Returns True if the given xref tuple is in the store.
+        """
+        return self._findRow(xref) is not None
+
+    def addXref(self, xref):
+        """
+        Add an xref tuple.  Returns False if it was already present.
+        """
+        if self._findRow(xref) is not None:
+            return False
+
+        fromva, tova, rtype, rflags = xref
+        if rflags is None:
+            rflags = RFLAGS_NONE
+
+        row = len(self._xr_from)
+        self._xr_from.append(fromva)
+        self._xr_to.append(tova)
+        self._xr_rtype.append(rtype)
+        self._xr_rflags.append(rflags)
+
+        rows = self._by_from.get(fromva)
+        if rows is None:
+            rows = array.array('I')
+            self._by_from[fromva] = rows
+            self._from_keys = None
+        rows.append(row)
+
+        rows = self._by_to.get(tova)
+        if rows is None:
+            rows = array.array('I')
+            self._by_to[tova] = rows
+            self._to_keys = None
+        rows.append(row)
+
+        return True
+
+    def addXrefs(self, xrefs):
+        """
+        Add a list of xref tuples (see addXref()).  Returns the list of
+        xrefs which were not already present.
+        """
+        added = []
+        findrow = self._findRow
+        xr_from = self._xr_from
+        xr_to = self._xr_to
+        xr_rtype = self._xr_rtype
+        xr_rflags = self._xr_rflags
+        by_from = self._by_from
+        by_to = self._by_to
+        for xref in xrefs:
+            if findrow(xref) is not None:
+                continue
+
+            fromva, tova, rtype, rflags = xref
+            if rflags is None:
+                rflags = RFLAGS_NONE
+
+            row = len(xr_from)
+            xr_from.append(fromva)
+            xr_to.append(tova)
+            xr_rtype.append(rtype)
+            xr_rflags.append(rflags)
+
+            rows = by_from.get(fromva)
+            if rows is None:
+                rows = array.array('I')
+                by_from[fromva] = rows
+                self._from_keys = None
+            rows.append(row)
+
+            rows = by_to.get(tova)
+            if rows is None:
+                rows = array.array('I')
+                by_to[tova] = rows
+                self._to_keys = None
+            rows.append(row)
+
+            added.append(xref)
+
+        return added
+
+    def delXref(self, xref):
+        """
+        Remove an xref tuple.  Returns False if it was not present.
+        """
+        row = self._findRow(xref)
+        if row is None:
+            return False
+
+        fromva, tova, rtype, rflags = xref
+        for index, va in ((self._by_from, fromva), (self._by_to, tova)):
+            rows = index[va]
+            rows.remove(row)
+            if not rows:
+                index.pop(va)
+                self._from_keys = None
+                self._to_keys = None
+
+        self._xr_dead.add(row)
+        return True
+
+    def _getRows(self, rows, rtype=None):
+        if rtype is None:
+            return [self._getRow(row) for row in rows]
+
+        xr_rtype = self._xr_rtype
+        return [self._getRow(row) for row in rows if xr_rtype[row] == rtype]
+
+    def getXrefs(self, rtype=None):
+        """
+        Return a list of all the xref tuples (in the order they were added).
+        """
+        dead = self._xr_dead
+        xr_rtype = self._xr_rtype
+        return [self._getRow(row) for row in range(len(self._xr_from))
+                if row not in dead and (rtype is None or xr_rtype[row] == rtype)]
+
+    def getXrefsFrom(self, va, rtype=None):
+        rows = self._by_from.get(va)
+        if rows is None:
+            return []
+        return self._getRows(rows, rtype=rtype)
+
+    def getXrefsTo(self, va, rtype=None):
+        rows = self._by_to.get(va)
+        if rows is None:
+            return []
+        return self._getRows(rows, rtype=rtype)
+
+    def _getRangeRows(self, index, keys, va, size):
+        start = bisect.bisect_left(keys, va)
+        end = bisect.bisect_left(keys, va + size)
+        rows = []
+        for key in keys[start:end]:
+            rows.extend(index[key])
+        rows.sort()
+        return rows
+
+    def getXrefsFromRange(self, va, size, rtype=None):
+        """
+        Return a list of the xref tuples from addresses in [va, va + size).
+        """
+        if self._from_keys is None:
+            self._from_keys = array.array('Q', sorted(self._by_from))
+        rows = self._getRangeRows(self._by_from, self._from_keys, va, size)
+        return self._getRows(rows, rtype=rtype)
+
+    def getXrefsToRange(self, va, size, rtype=None):
+        """
+        Return a list of the xref tuples to addresses in [va, va + size).
+        """
+        if self._to_keys is None:
+            self._to_keys = array.array('Q', sorted(self._by_to))
+        rows = self._getRangeRows(self._by_to, self._to_keys, va, size)
+        return self._getRows(rows, rtype=rtype)
@@ -10,10 +10,12 @@ for vivisect.  Each parser module must implement the following functions:
 """
 # Some parser utilities
 
+import os
 import sys
 import struct
 import hashlib
 
+import envi.memory as e_mem
 import vstruct.defs.macho as vs_macho
 
 
@@ -33,6 +35,24 @@ def md5Bytes(bytes):
     return d.hexdigest()
 
 
+def readMapBytes(vw, readfunc, filename, offset, size, padsize=0, fhash=None):
+    """
+    Return the bytes for a memory map of size bytes from offset in the
+    file (plus padsize zero bytes).  If the viv.parsers.mmap option is
+    set (and the file is there) the result is an mmap backed
+    envi.memory.FileBytes view which the workspace stores as a reference
+    to the file (and its hash) rather than copying.  Otherwise the bytes
+    are read using readfunc(offset, size).
+    """
+    if vw.config.viv.parsers.mmap and filename is not None and os.path.isfile(filename):
+        if offset + size <= os.path.getsize(filename):
+            return e_mem.FileBytes(os.path.abspath(filename), offset, size, padsize=padsize, md5sum=fhash)
+
+    bytez = readfunc(offset, size)
+    bytez += b"\x00" * padsize
+    return bytez
+
+
 macho_magics = (
     vs_macho.MH_MAGIC,
     vs_macho.MH_CIGAM,
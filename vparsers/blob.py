@@ -1,3 +1,5 @@
+import os
+
 import envi
 import vparsers as v_parsers
 
@@ -39,8 +41,11 @@ def parseFile(vw, filename):
 
     vw.setMeta('bigend', bigend)
 
-    fname = vw.addFile(filename, baseaddr, v_parsers.md5File(filename))
-    bytez = open(filename, "rb").read()
+    fhash = v_parsers.md5File(filename)
+    fname = vw.addFile(filename, baseaddr, fhash)
+    with open(filename, "rb") as fd:
+        bytez = v_parsers.readMapBytes(vw, lambda off, size: fd.read(), filename, 0,
+                                       os.path.getsize(filename), fhash=fhash)
     vw.addMemoryMap(baseaddr, 7, filename, bytez)
     vw.addSegment(baseaddr, len(bytez), '%.8x' % baseaddr, 'blob')
 
@@ -142,8 +142,8 @@ def loadElfIntoWorkspace(vw, elf, filename=None):
     for pgm in pgms:
         if pgm.p_type == Elf.PT_LOAD:
             if vw.verbose: vw.vprint('Loading: %s' % (repr(pgm)))
-            bytez = elf.readAtOffset(pgm.p_offset, pgm.p_filesz)
-            bytez += b"\x00" * (pgm.p_memsz - pgm.p_filesz)
+            bytez = v_parsers.readMapBytes(vw, elf.readAtOffset, filename, pgm.p_offset, pgm.p_filesz,
+                                           padsize=max(pgm.p_memsz - pgm.p_filesz, 0), fhash=fhash)
             pva = pgm.p_vaddr
             if addbase: pva += baseaddr
             vw.addMemoryMap(pva, pgm.p_flags & 0x7, fname, bytez)  # FIXME perms
@@ -168,7 +168,7 @@ def loadElfIntoWorkspace(vw, elf, filename=None):
 
         baseaddr = 0x05000000
         for offset, size in merged:
-            bytez = elf.readAtOffset(offset, size)
+            bytez = v_parsers.readMapBytes(vw, elf.readAtOffset, filename, offset, size, fhash=fhash)
             vw.addMemoryMap(baseaddr + offset, 0x7, fname, bytez)
 
         for sec in secs:
@@ -253,8 +253,8 @@ def loadPeIntoWorkspace(vw, pe, filename=None):
             plen = nbase - secbase
             readsize = sec.SizeOfRawData if sec.SizeOfRawData < sec.VirtualSize else sec.VirtualSize
             secoff = pe.rvaToOffset(secrva)
-            secbytes = pe.readAtOffset(secoff, readsize)
-            secbytes += b"\x00" * plen
+            secbytes = v_parsers.readMapBytes(vw, pe.readAtOffset, filename, secoff, readsize,
+                                              padsize=max(plen, 0), fhash=fhash)
             vw.addMemoryMap(secbase, mapflags, fname, secbytes)
             vw.addSegment(secbase, len(secbytes), secname, fname)
 
@@ -281,8 +281,8 @@ def loadPeIntoWorkspace(vw, pe, filename=None):
             readsize = sec.SizeOfRawData if sec.SizeOfRawData < sec.VirtualSize else sec.VirtualSize
 
             secoff = pe.rvaToOffset(secrva)
-            secbytes = pe.readAtOffset(secoff, readsize)
-            secbytes += b"\x00" * plen
+            secbytes = v_parsers.readMapBytes(vw, pe.readAtOffset, filename, secoff, readsize,
+                                              padsize=max(plen, 0), fhash=fhash)
             vw.addMemoryMap(secbase, mapflags, fname, secbytes)
             vw.addSegment(secbase, len(secbytes), secname, fname)
 
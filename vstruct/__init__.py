@@ -1,6 +1,6 @@
 import struct
 
-from copy import deepcopy
+from copy import copy, deepcopy
 from inspect import isclass
 from io import StringIO
 
@@ -31,6 +31,9 @@ class VStruct(vs_prims.v_base):
 
     """
 
+    # Set to False in a subclass to always use the field by field parser
+    _vs_compile = True
+
     def __init__(self):
         # A tiny bit of evil...
         object.__setattr__(self, '_vs_values', {})
@@ -132,6 +135,11 @@ class VStruct(vs_prims.v_base):
 
         the "fast" option enables fastparse which will *not* call any callbacks
         can may not be compatible with some structure defs.  ( eg mixed endian )
+
+        When parsing from bytes, runs of fixed size primitives (including
+        those in nested structures and arrays) are decoded with a single
+        compiled struct format rather than one field at a time.  Callbacks
+        are still fired in field order (see _vs_compile).
         """
         if fast:
             if self._vs_fastfields is None:
@@ -141,6 +149,12 @@ class VStruct(vs_prims.v_base):
             [self._vs_fastfields[i].vsSetValue(values[i]) for i in range(len(values))]
             return offset + self._vs_fastlen
 
+        if self._vs_compile and type(sbytes) is bytes:
+            run = _ParseRun(offset)
+            offset = _parseCompiled(self, sbytes, offset, run)
+            run.flush(sbytes)
+            return offset
+
         # In order for callbacks to change fields, we can't use vsGetFields()
         for fname in self._vs_fields:
             fobj = self._vs_values.get(fname)
@@ -148,6 +162,23 @@ class VStruct(vs_prims.v_base):
             self._vsFireCallbacks(fname)
         return offset
 
+    @classmethod
+    def vsView(cls, sbytes, offset=0):
+        """
+        Return a lazy VView of an instance of this class over the given
+        bytes.  Fields are only decoded when they are read.  The layout is
+        computed once per class (from an instance built with no arguments).
+
+        Example:
+            ehdr = Elf32.vsView(bytez)
+            print(ehdr.e_entry)
+        """
+        layout = _vs_viewlayouts.get(cls)
+        if layout is None:
+            layout = VViewLayout(cls())
+            _vs_viewlayouts[cls] = layout
+        return VView(layout, sbytes, offset)
+
     def vsGetFastParseFields(self):
         fields = []
         for fname in self._vs_fields:
@@ -515,6 +546,266 @@ class VUnion(VStruct):
         return ret
 
 
+# The primitive parsers which simply decode _vs_fmt (or a fixed length
+# slice of bytes) into _vs_value, and may be compiled into a larger format.
+_vs_numparsers = (vs_prims.v_number.vsParse, vs_prims.v_float.vsParse)
+_vs_byteparsers = (vs_prims.v_bytes.vsParse, vs_prims.v_str.vsParse, vs_prims.v_wstr.vsParse)
+# The primitive getters which return _vs_value unmodified
+_vs_rawgetters = (vs_prims.v_prim.vsGetValue, vs_prims.v_number.vsGetValue, vs_prims.v_float.vsGetValue)
+
+PRIM_OPAQUE = 0
+PRIM_NUMBER = 1
+PRIM_BYTES = 2
+PRIM_STRUCT = 3
+
+_vs_primkinds = {}
+_vs_cbnames = {}
+_vs_structs = {}
+_vs_viewlayouts = {}
+
+
+def _getFieldKind(cls):
+    """
+    Return (and cache per class) how the compiled parser treats fields
+    of the given class.
+    """
+    kind = _vs_primkinds.get(cls)
+    if kind is not None:
+        return kind
+
+    parser = getattr(cls, 'vsParse', None)
+    kind = PRIM_OPAQUE
+    if parser in _vs_numparsers:
+        kind = PRIM_NUMBER
+    elif parser in _vs_byteparsers:
+        kind = PRIM_BYTES
+    elif parser is VStruct.vsParse and cls._vs_compile:
+        kind = PRIM_STRUCT
+
+    _vs_primkinds[cls] = kind
+    return kind
+
+
+def _getCallbackNames(cls):
+    """
+    Return (and cache per class) the set of field names with a pcb_ method.
+    """
+    names = _vs_cbnames.get(cls)
+    if names is None:
+        names = frozenset([n[4:] for n in dir(cls) if n.startswith('pcb_')])
+        _vs_cbnames[cls] = names
+    return names
+
+
+def _getStruct(fmt):
+    s = _vs_structs.get(fmt)
+    if s is None:
+        s = struct.Struct(fmt)
+        _vs_structs[fmt] = s
+    return s
+
+
+class _ParseRun:
+    """
+    A run of contiguous fixed size primitives waiting to be decoded by
+    a single compiled struct format.
+    """
+    __slots__ = ('start', 'endian', 'codes', 'prims')
+
+    def __init__(self, start):
+        self.start = start
+        self.endian = None
+        self.codes = []
+        self.prims = []
+
+    def flush(self, sbytes, offset=None):
+        prims = self.prims
+        if prims:
+            fmt = _getStruct((self.endian or '<') + ''.join(self.codes))
+            start = self.start
+            if start >= 0 and start + fmt.size <= len(sbytes):
+                for prim, valu in zip(prims, fmt.unpack_from(sbytes, start)):
+                    prim._vs_value = valu
+            else:
+                # Let the primitives deal with short input themselves
+                for prim in prims:
+                    start = prim.vsParse(sbytes, offset=start)
+
+            self.endian = None
+            self.codes = []
+            self.prims = []
+
+        if offset is not None:
+            self.start = offset
+
+
+def _parseCompiled(vs, sbytes, offset, run):
+    """
+    Walk the fields of vs (recursing into plain nested structures) adding
+    fixed size primitives to the current run.  The run is decoded before
+    any callback fires or any other field type parses itself, so every
+    callback sees exactly the state the field by field parser would give.
+    """
+    cbnames = _getCallbackNames(vs.__class__)
+    pcallbacks = vs._vs_pcallbacks
+    values = vs._vs_values
+
+    # In order for callbacks to change fields, we can't use vsGetFields()
+    for fname in vs._vs_fields:
+        fobj = values.get(fname)
+        kind = _getFieldKind(fobj.__class__)
+
+        if kind == PRIM_NUMBER and fobj._vs_fmt is not None:
+            fmt = fobj._vs_fmt
+            endian = fmt[0]
+            if run.endian != endian:
+                if run.endian is not None:
+                    run.flush(sbytes, offset)
+                run.endian = endian
+            run.codes.append(fmt[1:])
+            run.prims.append(fobj)
+            offset += fobj._vs_length
+
+        elif kind == PRIM_BYTES:
+            run.codes.append('%ds' % fobj._vs_length)
+            run.prims.append(fobj)
+            offset += fobj._vs_length
+
+        elif kind == PRIM_STRUCT:
+            offset = _parseCompiled(fobj, sbytes, offset, run)
+
+        else:
+            run.flush(sbytes, offset)
+            offset = fobj.vsParse(sbytes, offset=offset)
+            run.start = offset
+
+        if fname in cbnames or fname in pcallbacks:
+            run.flush(sbytes, offset)
+            vs._vsFireCallbacks(fname)
+
+    return offset
+
+
+class VViewLayout:
+    """
+    The precomputed field offsets and formats used by VView to decode the
+    fields of a structure on access.  The layout is taken from a template
+    structure instance, which must have a fixed size (no callbacks and
+    only fixed size primitives).
+
+    Example:
+        layout = VViewLayout(IMAGE_SECTION_HEADER())
+        secs = [layout.view(bytez, off + (i * len(layout))) for i in range(count)]
+    """
+
+    def __init__(self, vs):
+        self.template = vs
+        self.fields = {}
+        self.names = []
+        self.size = 0
+
+        if _getCallbackNames(vs.__class__) or vs._vs_pcallbacks:
+            raise Exception('Structures with parse callbacks may not be viewed: %s' % vs._vs_name)
+
+        offset = 0
+        for fname in vs._vs_fields:
+            fobj = vs._vs_values.get(fname)
+            kind = _getFieldKind(fobj.__class__)
+            if kind == PRIM_NUMBER and fobj._vs_fmt is not None:
+                info = (offset, _getStruct(fobj._vs_fmt), fobj)
+            elif kind == PRIM_BYTES:
+                info = (offset, _getStruct('%ds' % fobj._vs_length), fobj)
+            elif kind == PRIM_STRUCT:
+                info = (offset, VViewLayout(fobj), None)
+            else:
+                raise Exception('Field %s (%s) may not be viewed' % (fname, fobj.__class__.__name__))
+
+            self.names.append(fname)
+            self.fields[fname] = info
+            offset += len(fobj)
+
+        self.size = offset
+
+    def __len__(self):
+        return self.size
+
+    def view(self, sbytes, offset=0):
+        """
+        Return a VView of this layout over the given bytes.
+        """
+        return VView(self, sbytes, offset)
+
+
+class VView:
+    """
+    A read-only view of a structure over a buffer.  Reading a primitive
+    field decodes it from the buffer (so the buffer may be updated in place
+    between reads), and reading a nested structure or array returns a VView
+    over the same buffer.  No field objects are built.
+
+    Example:
+        v = IMAGE_DOS_HEADER.vsView(bytez)
+        if v.e_magic == 0x5a4d:
+            nthdr = IMAGE_NT_HEADERS.vsView(bytez, v.e_lfanew)
+    """
+    __slots__ = ('_vv_layout', '_vv_bytes', '_vv_offset')
+
+    def __init__(self, layout, sbytes, offset=0):
+        self._vv_layout = layout
+        self._vv_bytes = sbytes
+        self._vv_offset = offset
+
+    def __getattr__(self, name):
+        info = self._vv_layout.fields.get(name)
+        if info is None:
+            raise AttributeError(name)
+
+        off, fmt, prim = info
+        offset = self._vv_offset + off
+        if prim is None:
+            return VView(fmt, self._vv_bytes, offset)
+
+        valu = fmt.unpack_from(self._vv_bytes, offset)[0]
+        if prim.__class__.vsGetValue in _vs_rawgetters:
+            return valu
+
+        # Let the primitive class decide what its value looks like
+        prim = copy(prim)
+        prim._vs_value = valu
+        return prim.vsGetValue()
+
+    def __getitem__(self, name):
+        if isinstance(name, int):
+            name = '%d' % name
+        return self.__getattr__(name)
+
+    def __len__(self):
+        return self._vv_layout.size
+
+    def __iter__(self):
+        # Our iteration returns name,value pairs
+        return iter([(name, self.__getattr__(name)) for name in self._vv_layout.names])
+
+    def __repr__(self):
+        return 'VView(%s)' % self._vv_layout.template._vs_name
+
+    def vsGetOffset(self, name=None):
+        """
+        Return the offset in the buffer of this view (or of the named field).
+        """
+        if name is None:
+            return self._vv_offset
+        return self._vv_offset + self._vv_layout.fields[name][0]
+
+    def vsGetStruct(self):
+        """
+        Parse a full structure instance from the bytes under this view.
+        """
+        vs = deepcopy(self._vv_layout.template)
+        vs.vsParse(self._vv_bytes, offset=self._vv_offset)
+        return vs
+
+
 def resolve(impmod, nameparts):
     """
     Resolve the given (potentially nested) object
@@ -1,3 +1,4 @@
+import struct
 import unittest
 
 import vstruct
@@ -79,6 +80,106 @@ class VStructTests(unittest.TestCase):
         self.assertIs(fobj, self.s.two.faz.vsGetField('alpha'))
 
 
+
+class LenStruct(vstruct.VStruct):
+    def __init__(self):
+        vstruct.VStruct.__init__(self)
+
+        self.magic = p.v_uint16(bigend=True)
+        self.size = p.v_uint8()
+        self.data = p.v_bytes(size=0)
+        self.name = p.v_zstr()
+        self.items = vstruct.VArray([p.v_uint32() for i in range(3)])
+        self.tail = p.v_uint64()
+
+    def pcb_size(self):
+        self.vsGetField('data').vsSetLength(self.size)
+
+
+class VStructCompiledTests(unittest.TestCase):
+
+    def getPrimValues(self, vs):
+        return [(off, name, f._vs_value) for off, indent, name, f in vs.vsGetPrintInfo() if f.vsIsPrim()]
+
+    def parseBoth(self, cls, bytez, offset=0):
+        comp = cls()
+        coff = comp.vsParse(bytez, offset=offset)
+
+        vstruct.VStruct._vs_compile = False
+        try:
+            interp = cls()
+            ioff = interp.vsParse(bytez, offset=offset)
+        finally:
+            vstruct.VStruct._vs_compile = True
+
+        self.assertEqual(coff, ioff)
+        self.assertEqual(self.getPrimValues(comp), self.getPrimValues(interp))
+        return comp
+
+    def test_vstruct_compiled_nested(self):
+        bytez = bytes(range(256)) * 2
+        s = self.parseBoth(TestStruct, bytez, offset=7)
+        self.assertEqual(s.one, 0x0a090807)
+        self.assertEqual(s.two.faz.alpha, 0x1918171615141312)
+        self.assertEqual(s.four, bytez[286:386])
+
+    def test_vstruct_compiled_callbacks(self):
+        bytez = b'\x12\x34\x05ABCDEfoo\x00' + bytes(range(20))
+        s = self.parseBoth(LenStruct, bytez)
+        self.assertEqual(s.magic, 0x1234)
+        self.assertEqual(s.data, b'ABCDE')
+        self.assertEqual(s.name, 'foo')
+        self.assertEqual(s.items[1].vsGetValue(), 0x07060504)
+        self.assertEqual(s.tail, 0x131211100f0e0d0c)
+
+        calls = []
+        s = LenStruct()
+        s.vsAddParseCallback('magic', lambda vs: calls.append(vs.size))
+        s.vsAddParseCallback('tail', lambda vs: calls.append(vs.tail))
+        s.vsParse(bytez)
+        self.assertEqual(calls, [0, 0x131211100f0e0d0c])
+
+    def test_vstruct_compiled_short(self):
+        # Short input must fail at the same field as the field by field parser
+        bytez = b'ABC\x01\x00\x00\x00' + b'Z' * 10
+        comp = NestedStruct()
+        self.assertRaises(struct.error, comp.vsParse, bytez)
+
+        vstruct.VStruct._vs_compile = False
+        try:
+            interp = NestedStruct()
+            self.assertRaises(struct.error, interp.vsParse, bytez)
+        finally:
+            vstruct.VStruct._vs_compile = True
+
+        self.assertEqual(self.getPrimValues(comp), self.getPrimValues(interp))
+        self.assertEqual(comp.bar, 1)
+        self.assertEqual(comp.baz, b'Z' * 10)
+
+    def test_vstruct_view(self):
+        bytez = bytearray(range(256)) * 2
+        s = TestStruct()
+        s.vsParse(bytes(bytez), offset=3)
+
+        v = TestStruct.vsView(bytez, 3)
+        self.assertEqual(len(v), len(s))
+        self.assertEqual(v.one, s.one)
+        self.assertEqual(v.two.baz, s.two.baz)
+        self.assertEqual(v.two.faz.alpha, s.two.faz.alpha)
+        self.assertEqual(v.vsGetOffset('two'), 7)
+        self.assertEqual(self.getPrimValues(v.vsGetStruct()), self.getPrimValues(s))
+
+        # views decode on access
+        bytez[3] = 0xff
+        self.assertEqual(v.one, 0x060504ff)
+
+        a = vstruct.VArray([p.v_uint16() for i in range(4)])
+        layout = vstruct.VViewLayout(a)
+        self.assertEqual(layout.view(bytez, 2)[3], 0x0908)
+
+        self.assertRaises(Exception, LenStruct.vsView, bytez)
+        self.assertRaises(AttributeError, getattr, v, 'nosuchfield')
+
 # TODO: could use envi.bits, but do we really want envi dep by default?
 blkup = {}
 bwidths = (8, 16, 24, 32, 64,)
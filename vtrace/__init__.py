@@ -141,6 +141,7 @@ class Trace(e_mem.IMemory, e_reg.RegisterContext, e_resolv.SymbolResolver, base.
         self.initMode("SingleStep", False,
                       "All calls to run() actually just step.  This allows RunForever + SingleStep to step forever ;)")
         self.initMode("FastStep", False, "All stepi() will NOT generate a step event")
+        self.initMode("CacheMemory", True, "Cache memory reads (by page) while the target is stopped")
 
     def execute(self, cmdline):
         """
@@ -240,6 +241,7 @@ class Trace(e_mem.IMemory, e_reg.RegisterContext, e_resolv.SymbolResolver, base.
         # code, we have a little house-keeping to do...
         self.curbp = None
 
+        self._flushMemCache()
         self._syncRegs()
         self.platformStepi()
         event = self.platformWait()
@@ -284,6 +286,7 @@ class Trace(e_mem.IMemory, e_reg.RegisterContext, e_resolv.SymbolResolver, base.
         """
         self.requireAttached()
         self.requireNotExited()
+        self._flushMemCache()
         self.platformKill()
         self.attached = False
 
@@ -298,6 +301,7 @@ class Trace(e_mem.IMemory, e_reg.RegisterContext, e_resolv.SymbolResolver, base.
         self.attached = False
         self.pid = 0
         self.mapcache = None
+        self.memcache = None
 
     def release(self):
         """
@@ -476,6 +480,7 @@ class Trace(e_mem.IMemory, e_reg.RegisterContext, e_resolv.SymbolResolver, base.
         """
         self.requireNotRunning()
         self.mapcache = None  # We may have a new memory map
+        self.memcache = None
         return self.platformAllocateMemory(size, perms=perms, suggestaddr=suggestaddr)
 
     def protectMemory(self, va, size, perms):
@@ -485,22 +490,29 @@ class Trace(e_mem.IMemory, e_reg.RegisterContext, e_resolv.SymbolResolver, base.
         """
         self.requireNotRunning()
         self.mapcache = None  # We may have new memory protections
+        self.memcache = None
         return self.platformProtectMemory(va, size, perms)
 
     def readMemory(self, address, size):
         """
         Read memory from address.  Areas that are NOT valid memory will be read
         back as \x00s (this probably goes in a mixin soon)
+
+        While the target is stopped, reads are cached by page (see the
+        mode "CacheMemory") until it is continued/stepped or written to.
         """
         self.requireNotRunning()
-        return self.platformReadMemory(int(address), int(size))
+        return self._readMemCache(int(address), int(size))
 
     def writeMemory(self, address, bytez):
         """
         Write the given bytes to the address in the current trace.
         """
         self.requireNotRunning()
-        self.platformWriteMemory(int(address), bytez)
+        try:
+            self.platformWriteMemory(int(address), bytez)
+        finally:
+            self._flushMemCache(int(address), len(bytez))
 
     def searchMemory(self, needle: bytes, regex: bool=False) -> list:
         """
@@ -21,6 +21,11 @@ import envi.symstore.resolver as e_sym_resolv
 
 import vstruct.builder as vs_builder
 
+# Trace.readMemory() caches target memory in pages of this size while
+# the target is stopped (reads larger than MEMCACHE_MAXREAD bypass it)
+MEMCACHE_PAGESIZE = 4096
+MEMCACHE_MAXREAD = 0x100000
+
 
 class PlatformMixinInterface:
     """
@@ -171,6 +176,14 @@ class PlatformMixinInterface:
     def platformWriteMemory(self, address, bytes):
         raise NotImplementedError
 
+    def platformReadMemoryBatch(self, ranges):
+        """
+        Read a list of (address, size) ranges and return a list of the
+        bytes for each.  Platforms which can read several ranges in one
+        request (or system call) should override this.
+        """
+        return [self.platformReadMemory(address, size) for address, size in ranges]
+
     def platformGetMemFault(self):
         """
         Return the addr of the current memory fault
@@ -266,6 +279,8 @@ class TracerBase(notifiers.Notifier, PlatformMixinInterface):
 
         # A cache for memory maps and fd listings
         self.mapcache = None
+        # page address -> bytes (only valid while stopped)
+        self.memcache = None
         self.fds = None
         self.deferred = []
         self.signal_ignores = []
@@ -481,6 +496,7 @@ class TracerBase(notifiers.Notifier, PlatformMixinInterface):
             self._activBreakpoints()
 
         self.runagain = False
+        self._flushMemCache()
         self._syncRegs()  # Must be basically last...
         self.platformContinue()
 
@@ -556,6 +572,63 @@ class TracerBase(notifiers.Notifier, PlatformMixinInterface):
             if bp.isEnabled():
                 bp.activate(self)
 
+    def _flushMemCache(self, address=None, size=0):
+        """
+        Drop the cached memory pages (or only the ones overlapping the
+        given range).  This must happen any time the target may have
+        changed its memory (continue, step, write, etc).
+        """
+        if self.memcache is None:
+            return
+
+        if address is None:
+            self.memcache = None
+            return
+
+        mask = ~(MEMCACHE_PAGESIZE - 1)
+        for page in range(address & mask, address + size, MEMCACHE_PAGESIZE):
+            self.memcache.pop(page, None)
+
+    def _readMemCache(self, address, size):
+        """
+        Read memory through the page cache, reading any missing pages
+        with one platformReadMemoryBatch() call (contiguous pages are
+        coalesced into one range).
+        """
+        if size <= 0 or size > MEMCACHE_MAXREAD or not self.getMode("CacheMemory", False):
+            return self.platformReadMemory(address, size)
+
+        if self.memcache is None:
+            self.memcache = {}
+
+        first = address & ~(MEMCACHE_PAGESIZE - 1)
+        pages = range(first, address + size, MEMCACHE_PAGESIZE)
+
+        ranges = []
+        for page in pages:
+            if page in self.memcache:
+                continue
+
+            if ranges and ranges[-1][0] + ranges[-1][1] == page:
+                ranges[-1][1] += MEMCACHE_PAGESIZE
+            else:
+                ranges.append([page, MEMCACHE_PAGESIZE])
+
+        if ranges:
+            try:
+                blobs = self.platformReadMemoryBatch([tuple(r) for r in ranges])
+            except Exception:
+                # Whole pages may not be readable where the requested range is
+                return self.platformReadMemory(address, size)
+
+            for (raddr, rsize), bytez in zip(ranges, blobs):
+                for offset in range(0, rsize, MEMCACHE_PAGESIZE):
+                    self.memcache[raddr + offset] = bytez[offset:offset + MEMCACHE_PAGESIZE]
+
+        offset = address - first
+        bytez = b''.join([self.memcache[page] for page in pages])
+        return bytez[offset:offset + size]
+
     def _syncRegs(self):
         """
         Sync the reg-cache into the target process
@@ -797,6 +870,7 @@ class TracerBase(notifiers.Notifier, PlatformMixinInterface):
         """
         self.threadcache = None
         self.mapcache = None
+        self.memcache = None
         self.fds = None
         self.running = False
 
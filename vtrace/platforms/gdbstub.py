@@ -122,6 +122,9 @@ class GdbStubMixin:
 
         self._gdb_filemagic = None  # Tracers may use this to trigger _findLibraryMaps
 
+        # Max bytes per "m" packet (raised if the stub tells us its PacketSize)
+        self._gdb_readsize = 256
+
         # These get set by _gdbSetRegisterInfo
         self._gdb_regfmt = ''
         self._gdb_regsize = 0
@@ -230,9 +233,22 @@ class GdbStubMixin:
             pkt = self._recvPkt()
         return resp
 
+    def _gdbQuerySupported(self):
+        """
+        Ask the stub for its PacketSize so memory reads can use
+        larger "m" packets.
+        """
+        pkt = self._cmdTransact('qSupported')
+        for feature in pkt.split(b';'):
+            if feature.startswith(b'PacketSize='):
+                pktsize = int(feature[11:], 16)
+                # Replies are hex (plus the $/#xx framing)
+                self._gdb_readsize = max(256, (pktsize - 4) // 2)
+
     def platformAttach(self, pid):
         self._connectSocket()
         self.attaching = True
+        self._gdbQuerySupported()
         # Wait for the debug stub to stop the target
         while True:
             pkt = self._cmdTransact('?')
@@ -481,31 +497,32 @@ class GdbStubMixin:
         return ret
 
     def _raiseIfError(self, msg):
-        if msg.startswith('E'):
-            raise Exception('Error: %s' % msg)
+        if msg.startswith(b'E'):
+            raise Exception('Error: %s' % msg.decode())
 
     def _runLengthDecode(self, buf):
         # GDB RSP implements some run-length encoding to save space
-        i = buf.find('*')
+        i = buf.find(b'*')
         while i != -1:
-            cnt = ord(buf[i + 1]) - 29  # Run-length encoding is minus 29...
-            pad = buf[i - 1] * cnt
+            cnt = buf[i + 1] - 29  # Run-length encoding is minus 29...
+            pad = buf[i - 1:i] * cnt
             buf = buf[:i] + pad + buf[i + 2:]
 
-            i = buf.find('*')
+            i = buf.find(b'*')
 
-        return buf.decode('hex')
+        return bytes.fromhex(buf.decode())
 
     def platformReadMemory(self, addr, size):
-        mbytes = ''
+        mbytes = b''
         offset = 0
         # print('READ: 0x%.8x (%d)' % (addr, size))
         while len(mbytes) < size:
-            # FIXME is this 256 problem just in the VMWare gdb stub?
-            cmd = 'm%x,%x' % (addr + offset, min(256, size - offset))
+            cmd = 'm%x,%x' % (addr + offset, min(self._gdb_readsize, size - offset))
             pkt = self._cmdTransact(cmd)
             self._raiseIfError(pkt)
             pbytes = self._runLengthDecode(pkt)
+            if not pbytes:
+                raise Exception('Error: empty read at 0x%.8x' % (addr + offset))
             offset += len(pbytes)
             mbytes += pbytes
         return mbytes
@@ -5,6 +5,7 @@ Linux Platform Module
 
 import os
 import sys
+import errno
 import time
 import stat
 import struct
@@ -57,6 +58,23 @@ libc.close.restype = c_int
 libc.perror.argtypes = [c_char_p]
 
 
+class iovec(Structure):
+    _fields_ = (
+        ("iov_base", c_void_p),
+        ("iov_len", c_size_t),
+    )
+
+
+# process_vm_readv() is linux 3.2+ (and glibc 2.15+)
+process_vm_readv = getattr(CDLL(libc._name, use_errno=True), 'process_vm_readv', None)
+if process_vm_readv is not None:
+    process_vm_readv.restype = c_ssize_t
+    process_vm_readv.argtypes = [c_int, POINTER(iovec), c_ulong, POINTER(iovec), c_ulong, c_ulong]
+
+# The kernel's limit on iovecs per call
+IOV_MAX = 1024
+
+
 O_RDONLY = 0
 O_WRONLY = 1
 O_RDWR = 2
@@ -313,6 +331,43 @@ class LinuxMixin(v_posix.PtraceMixin, v_posix.PosixMixin):
         # We have to slice cause ctypes "helps" us by adding a null byte...
         return buf.raw
 
+    @v_base.threadwrap
+    def platformReadMemoryBatch(self, ranges):
+        """
+        Read a list of (address, size) ranges using process_vm_readv()
+        scatter reads (falling back to /proc/<pid>/mem).
+        """
+        if process_vm_readv is None:
+            return [self.platformReadMemory(address, size) for address, size in ranges]
+
+        ret = []
+        for i in range(0, len(ranges), IOV_MAX):
+            chunk = ranges[i:i + IOV_MAX]
+            total = sum([size for address, size in chunk])
+
+            buf = create_string_buffer(total)
+            local = iovec(addressof(buf), total)
+            remote = (iovec * len(chunk))()
+            for j, (address, size) in enumerate(chunk):
+                remote[j].iov_base = address
+                remote[j].iov_len = size
+
+            x = process_vm_readv(self.pid, byref(local), 1, remote, len(chunk), 0)
+            if x < 0 and get_errno() in (errno.ENOSYS, errno.EPERM):
+                # Old kernels / restricted ptrace scope, use the memfile
+                return [self.platformReadMemory(address, size) for address, size in ranges]
+
+            if x != total:
+                raise Exception("reading from invalid memory (%d of %d returned)" % (x, total))
+
+            raw = buf.raw
+            offset = 0
+            for address, size in chunk:
+                ret.append(raw[offset:offset + size])
+                offset += size
+
+        return ret
+
     def _findExe(self, pid):
         exe = os.readlink("/proc/%d/exe" % pid)
         if "(deleted)" in exe:
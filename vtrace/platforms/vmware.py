@@ -90,7 +90,7 @@ class VMWare32WindowsTrace(vtrace.Trace,
             pe = PE.peFromMemoryObject(self, baseaddr)
             vhash = e_symcache.symCacheHashFromPe(pe)
 
-            symcache = self.symcache.getCacheSyms(vhash)
+            symcache = self.symcache.getCacheFile(vhash)
             if symcache is None:
                 # Symbol type 0 for now...
                 symcache = [(rva, 0, name, e_resolv.SYMSTOR_SYM_SYMBOL) for rva, ord, name in pe.getExports()]
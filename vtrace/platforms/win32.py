@@ -1723,7 +1723,7 @@ class WindowsMixin:
         symhash = e_symcache.symCacheHashFromPe(pe)
 
         if self.symcache:
-            symcache = self.symcache.getCacheSyms(symhash)
+            symcache = self.symcache.getCacheFile(symhash)
             if symcache != None:
                 self.impSymCache( symcache, symfname=normname, baseaddr=baseaddr)
                 return
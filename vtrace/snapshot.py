@@ -3,6 +3,9 @@ All the code related to vtrace process snapshots and TraceSnapshot classes.
 """
 import sys
 import copy
+import mmap
+import bisect
+import struct
 import pickle as pickle
 
 import envi
@@ -12,6 +15,90 @@ import envi.symstore.resolver as e_resolv
 import vtrace
 import vtrace.platforms.base as v_base
 
+# The mmap-able snapshot file format:
+#   <magic><header offset><header size> (padded to SNAP_PAGESIZE)
+#   page aligned memory chunks (all zero pages are optionally left out)
+#   <pickled header> (the snapshot dict with a chunk table instead of 'mem')
+SNAP_MAGIC = b'VSNAP\x00\x02\x00'
+SNAP_PREAMBLE = '<8sQQ'
+SNAP_PAGESIZE = 4096
+# How much of a map is read/written at once when saving
+SNAP_READSIZE = 0x1000000
+
+zero_page = b'\x00' * SNAP_PAGESIZE
+
+
+class SnapshotRegion:
+    """
+    The bytes of one memory map in an mmap'd snapshot file.  Slicing
+    reads straight out of the file mapping, and pages which were left out
+    of the file (all zeros) read back as zeros.
+    """
+
+    def __init__(self, fmap, size, chunks):
+        self.fmap = fmap
+        self.size = size
+        # (map offset, size, file offset) tuples sorted by map offset
+        self.chunks = chunks
+        self.starts = [chunk[0] for chunk in chunks]
+
+    def __len__(self):
+        return self.size
+
+    def _readBytes(self, offset, size):
+        ret = []
+        end = min(offset + size, self.size)
+        idx = bisect.bisect_right(self.starts, offset) - 1
+        while offset < end:
+            if idx >= 0:
+                coff, csize, foff = self.chunks[idx]
+                if offset < coff + csize:
+                    rend = min(end, coff + csize)
+                    ret.append(self.fmap[foff + offset - coff:foff + rend - coff])
+                    offset = rend
+
+            # Any gap of zero pages up to the next chunk
+            idx += 1
+            gapend = end
+            if idx < len(self.chunks):
+                gapend = min(end, self.chunks[idx][0])
+            if gapend > offset:
+                ret.append(b'\x00' * (gapend - offset))
+                offset = gapend
+
+        if len(ret) == 1:
+            return ret[0]
+        return b''.join(ret)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self.size)
+            if stop <= start:
+                return b''
+            ret = self._readBytes(start, stop - start)
+            if step != 1:
+                ret = ret[::step]
+            return ret
+
+        if idx < 0:
+            idx += self.size
+        if idx < 0 or idx >= self.size:
+            raise IndexError('SnapshotRegion index out of range')
+        return self._readBytes(idx, 1)[0]
+
+    def __bytes__(self):
+        return self._readBytes(0, self.size)
+
+    def __add__(self, other):
+        return bytes(self) + other
+
+    def __radd__(self, other):
+        return other + bytes(self)
+
+    def __reduce__(self):
+        # (pickling an in memory snapshot with saveToFd())
+        return (bytes, (bytes(self),))
+
 
 class TraceSnapshot(vtrace.Trace, v_base.TracerBase):
     """
@@ -52,15 +139,13 @@ class TraceSnapshot(vtrace.Trace, v_base.TracerBase):
         rinfo = list(self.s_regs.items())[0][1]
         self.setRegisterInfo(rinfo)
 
-        # FIXME hard-coded page size!
-        self.s_map_lookup = {}
-        for mmap in self.s_maps:
-            for i in range(mmap[0], mmap[0] + mmap[1], 4096):
-                self.s_map_lookup[i] = mmap
+        # A sorted map index for bisect lookups (rather than per page)
+        self.s_map_index = sorted(self.s_maps, key=lambda mmap: mmap[0])
+        self.s_map_starts = [mmap[0] for mmap in self.s_map_index]
 
-                # Lets get some symbol resolvers created for our libraries
-                # for fname in self.getNormalizedLibNames():
-                # subres = e_resolv.FileSymbol(fname,
+        # Lets get some symbol resolvers created for our libraries
+        # for fname in self.getNormalizedLibNames():
+        # subres = e_resolv.FileSymbol(fname,
 
         self.running = False
         self.attached = True
@@ -75,21 +160,28 @@ class TraceSnapshot(vtrace.Trace, v_base.TracerBase):
         """
         pickle.dump(self.s_snapdict, fd)
 
-    def saveToFile(self, filename):
+    def saveToFile(self, filename, dedup=True):
         """
-        Save a snapshot to file for later reading in...
+        Save a snapshot to file for later reading in (see loadSnapshot())
+        using the mmap-able snapshot format.  Specify dedup=False to store
+        the all zero pages as well.
         """
-        f = open(filename, 'wb')
-        self.saveToFd(f)
-        f.close()
+        def readmem(va, size):
+            return self.platformReadMemory(va, size)
+
+        snapdict = dict(self.s_snapdict)
+        snapdict.pop('mem', None)
+        writeSnapshotFile(filename, snapdict, self.s_maps, readmem, dedup=dedup)
 
     def getMemoryMap(self, addr):
-        if self.getMeta('Architecture') == 'amd64':
-            base = addr & 0xfffffffffffff000
-        else:
-            base = addr & 0xfffff000
+        idx = bisect.bisect_right(self.s_map_starts, addr) - 1
+        if idx < 0:
+            return None
 
-        return self.s_map_lookup.get(base, None)
+        mmap = self.s_map_index[idx]
+        if addr < mmap[0] + mmap[1]:
+            return mmap
+        return None
 
     def platformGetFds(self):
         return self.s_fds
@@ -159,22 +251,108 @@ class TraceSnapshot(vtrace.Trace, v_base.TracerBase):
         pass
 
 
-def loadSnapshot(filename):
+def writeSnapshotFile(filename, snapdict, maps, readmem, dedup=True):
     """
-    Load a vtrace process snapshot from a file
+    Write a snapshot file from the snapshot dict (without 'mem') and
+    the list of memory maps, whose bytes are read (a piece at a time)
+    using readmem(va, size).  Maps which can't be read are left out.
     """
-    sfile = open(filename, "rb")
-    snapdict = pickle.load(sfile)
-    return TraceSnapshot(snapdict)
+    with open(filename, 'wb') as fd:
+        fd.write(b'\x00' * SNAP_PAGESIZE)
+
+        smaps = []
+        chunks = {}
+        for base, size, perms, fname in maps:
+            mapoff = fd.tell()
+            mchunks = []
+            try:
+                for offset in range(0, size, SNAP_READSIZE):
+                    bytez = readmem(base + offset, min(SNAP_READSIZE, size - offset))
+                    _writeSnapshotPages(fd, bytez, offset, mchunks, dedup)
+
+            except Exception as msg:
+                print("WARNING: Can't snapshot memmap at 0x%.8x (%s)" % (base, msg), file=sys.stderr)
+                fd.seek(mapoff)
+                fd.truncate()
+                continue
+
+            smaps.append((base, size, perms, fname))
+            chunks[base] = mchunks
+
+        snapdict = dict(snapdict)
+        snapdict['maps'] = smaps
+        snapdict['chunks'] = chunks
+
+        hdroff = fd.tell()
+        pickle.dump(snapdict, fd)
+        hdrsize = fd.tell() - hdroff
+
+        fd.seek(0)
+        fd.write(struct.pack(SNAP_PREAMBLE, SNAP_MAGIC, hdroff, hdrsize))
+
+
+def _writeSnapshotPages(fd, bytez, offset, chunks, dedup):
+    # Write the (page aligned) bytes for map offset, extending the
+    # chunk list with runs of non-zero pages.
+    for poff in range(0, len(bytez), SNAP_PAGESIZE):
+        page = bytez[poff:poff + SNAP_PAGESIZE]
+        if dedup and page == zero_page[:len(page)]:
+            continue
+
+        mapoff = offset + poff
+        if chunks and chunks[-1][0] + chunks[-1][1] == mapoff:
+            coff, csize, foff = chunks[-1]
+            chunks[-1] = (coff, csize + len(page), foff)
+        else:
+            chunks.append((mapoff, len(page), fd.tell()))
 
+        fd.write(page)
+        if len(page) < SNAP_PAGESIZE:
+            fd.write(zero_page[len(page):])
 
-def takeSnapshot(trace):
+
+def saveSnapshot(trace, filename, dedup=True):
     """
-    Take a snapshot of the process from the current state and return
-    a reference to a tracer which wraps a "snapshot" or "core file".
+    Save a snapshot of the process from the current state directly to a
+    file (without holding the whole address space in memory like
+    takeSnapshot().saveToFile() must).
+    """
+    sd = _getSnapshotInfo(trace)
+    writeSnapshotFile(filename, sd, trace.getMemoryMaps(), trace.readMemory, dedup=dedup)
+
+
+def loadSnapshot(filename):
+    """
+    Load a vtrace process snapshot from a file.  Files in the mmap-able
+    format are mapped (rather than read) so memory is only paged in
+    as it is used.
     """
+    with open(filename, 'rb') as sfile:
+        magic = sfile.read(len(SNAP_MAGIC))
+        sfile.seek(0)
+
+        if magic != SNAP_MAGIC:
+            snapdict = pickle.load(sfile)
+            return TraceSnapshot(snapdict)
+
+        # The mapping stays valid after the file is closed
+        fmap = mmap.mmap(sfile.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, hdroff, hdrsize = struct.unpack_from(SNAP_PREAMBLE, fmap, 0)
+    snapdict = pickle.loads(fmap[hdroff:hdroff + hdrsize])
+
+    chunks = snapdict.pop('chunks')
+    mem = {}
+    for base, size, perms, fname in snapdict['maps']:
+        mem[base] = SnapshotRegion(fmap, size, chunks[base])
+    snapdict['mem'] = mem
+
+    return TraceSnapshot(snapdict)
+
+
+def _getSnapshotInfo(trace):
+    # Everything but the memory maps/bytes
     sd = dict()
-    orig_thread = trace.getMeta("ThreadId")
 
     regs = dict()
     stacktrace = dict()
@@ -188,6 +366,26 @@ def takeSnapshot(trace):
         except Exception as msg:
             print("WARNING: Failed to get stack trace for thread 0x%.8x" % thrid, file=sys.stderr)
 
+    # If the contents here change, change the version...
+    sd['version'] = 1
+    sd['threads'] = trace.getThreads()
+    sd['regs'] = regs
+    sd['meta'] = copy.deepcopy(trace.metadata)
+    sd['stacktrace'] = stacktrace
+    sd['exe'] = trace.getExe()
+    sd['fds'] = trace.getFds()
+    sd['vars'] = trace.localvars
+
+    return sd
+
+
+def takeSnapshot(trace):
+    """
+    Take a snapshot of the process from the current state and return
+    a reference to a tracer which wraps a "snapshot" or "core file".
+    """
+    sd = _getSnapshotInfo(trace)
+
     mem = dict()
     maps = []
     for base, size, perms, fname in trace.getMemoryMaps():
@@ -197,16 +395,7 @@ def takeSnapshot(trace):
         except Exception as msg:
             print("WARNING: Can't snapshot memmap at 0x%.8x (%s)" % (base, msg), file=sys.stderr)
 
-    # If the contents here change, change the version...
-    sd['version'] = 1
-    sd['threads'] = trace.getThreads()
-    sd['regs'] = regs
     sd['maps'] = maps
     sd['mem'] = mem
-    sd['meta'] = copy.deepcopy(trace.metadata)
-    sd['stacktrace'] = stacktrace
-    sd['exe'] = trace.getExe()
-    sd['fds'] = trace.getFds()
-    sd['vars'] = trace.localvars
 
     return TraceSnapshot(snapdict=sd)
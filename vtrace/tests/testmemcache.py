@@ -0,0 +1,58 @@
+import unittest
+
+import vivisect
+import vtrace.envitools as v_envitools
+import vtrace.platforms.base as v_base
+
+
+class CountingTraceEmulator(v_envitools.TraceEmulator):
+
+    def __init__(self, emu):
+        v_envitools.TraceEmulator.__init__(self, emu)
+        self.batches = []
+
+    def platformReadMemoryBatch(self, ranges):
+        self.batches.append(ranges)
+        return v_envitools.TraceEmulator.platformReadMemoryBatch(self, ranges)
+
+
+class VtraceMemCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        vw = vivisect.VivWorkspace()
+        vw.setMeta('Architecture', 'i386')
+        vw.addMemoryMap(0x41410000, 7, 'test', b'A' * 0x4000)
+        self.trace = CountingTraceEmulator(vw.getEmulator())
+        self.trace.setMode('CacheMemory', True)
+
+    def tearDown(self):
+        self.trace.release()
+
+    def test_vtrace_memcache(self):
+        trace = self.trace
+        pagesize = v_base.MEMCACHE_PAGESIZE
+
+        self.assertEqual(trace.readMemory(0x41410010, 4), b'AAAA')
+        self.assertEqual(trace.readMemory(0x41410020, 4), b'AAAA')
+        self.assertEqual(trace.batches, [[(0x41410000, pagesize)]])
+
+        # Missing pages are read in one (coalesced) batch
+        self.assertEqual(trace.readMemory(0x41410ffe, pagesize + 4), b'A' * (pagesize + 4))
+        self.assertEqual(trace.batches[-1], [(0x41410000 + pagesize, pagesize * 2)])
+
+        # Writes update the cache
+        trace.writeMemory(0x41410020, b'BB')
+        self.assertEqual(trace.readMemory(0x4141001f, 4), b'ABBA')
+
+        # Continue/step drop the cache
+        nbatches = len(trace.batches)
+        trace._flushMemCache()
+        self.assertEqual(trace.readMemory(0x41410010, 4), b'AAAA')
+        self.assertEqual(len(trace.batches), nbatches + 1)
+
+    def test_vtrace_memcache_disabled(self):
+        trace = self.trace
+        trace.setMode('CacheMemory', False)
+        self.assertEqual(trace.readMemory(0x41410010, 4), b'AAAA')
+        self.assertEqual(trace.batches, [])
+        self.assertIsNone(trace.memcache)
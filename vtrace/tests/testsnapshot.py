@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+import envi
+import vtrace.snapshot as vs_snap
+
+
+def getTestSnapshot():
+    reginfo = envi.getArchModule('i386').archGetRegCtx().getRegisterInfo()
+    mem = {
+        0x41410000: b'A' * 0x1800 + b'\x00' * 0x3000 + b'B' * 0x10,
+        0x42420000: b'\x00' * 0x2000,
+    }
+    sd = {
+        'version': 1,
+        'threads': {1: 0},
+        'regs': {1: reginfo},
+        'maps': [(0x41410000, len(mem[0x41410000]), 7, 'test'), (0x42420000, 0x2000, 6, 'zero')],
+        'mem': mem,
+        'meta': {'Architecture': 'i386', 'Platform': 'linux', 'ThreadId': 1},
+        'stacktrace': {},
+        'exe': 'test',
+        'fds': [],
+    }
+    return vs_snap.TraceSnapshot(sd)
+
+
+class VtraceSnapshotTest(unittest.TestCase):
+
+    def test_vtrace_snapshot_file(self):
+        snap = getTestSnapshot()
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            snap.saveToFile(filename, dedup=False)
+            fullsize = os.path.getsize(filename)
+
+            # The all zero pages are not stored
+            snap.saveToFile(filename)
+            self.assertGreater(fullsize - os.path.getsize(filename), 0x3f00)
+
+            snap2 = vs_snap.loadSnapshot(filename)
+            self.assertEqual(snap2.getMemoryMaps(), snap.getMemoryMaps())
+            for va, size, perms, fname in snap.getMemoryMaps():
+                self.assertEqual(snap2.readMemory(va, size), snap.readMemory(va, size))
+
+            self.assertEqual(snap2.readMemory(0x414117fe, 4), b'AA\x00\x00')
+            self.assertEqual(snap2.readMemory(0x41414800, 0x10), b'B' * 0x10)
+            self.assertEqual(snap2.readMemory(0x42420ffe, 4), b'\x00' * 4)
+
+            snap2.writeMemory(0x414117fe, b'CC')
+            self.assertEqual(snap2.readMemory(0x414117fc, 6), b'AACC\x00\x00')
+
+            snap2.release()
+
+        finally:
+            os.unlink(filename)
+
+        snap.release()
+
+    def test_vtrace_snapshot_pickle(self):
+        snap = getTestSnapshot()
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            with open(filename, 'wb') as f:
+                snap.saveToFd(f)
+
+            snap2 = vs_snap.loadSnapshot(filename)
+            self.assertEqual(snap2.readMemory(0x41410000, 0x10), b'A' * 0x10)
+            snap2.release()
+
+        finally:
+            os.unlink(filename)
+
+        snap.release()